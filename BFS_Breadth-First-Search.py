@@ -31,42 +31,371 @@ Direction vectors
 so, establish vectors, then constraints (ie don't exit screen)
 find shortest path between 2 cells.
 https://www.youtube.com/watch?v=09_LlHjoEiY ~50 minutes in
+
+adj can be any adjacency mapping, including a CSRGraph (see CSR_Graph.py)
+
+Engine:
+nodes are the dense ids of a CSRGraph (a dict adj gets converted once)
+visited is a bytearray, one byte per node, so the check is O(1) instead of
+    scanning a list
+the queue is a preallocated array of size V with head/tail indexes: every node
+    is enqueued at most once so it never grows and popping is O(1)
+    when done, the queue holds the BFS order
+returns dist[v] (edges from the source, -1 if unreachable) and parent[v]
+    (node v was discovered from, -1 for sources and unreachable nodes)
+
+level-synchronous mode: expands a whole frontier at once with numpy, so there is
+one python iteration per level instead of one per node
+
+grid engine (grid_bfs / grid_shortest_path):
+works straight on a 2D numpy occupancy array (0 = free, anything else = wall),
+adjacency is never built. cells are flat indexes of the grid padded with a ring
+of walls, so moving in a direction is just adding an offset (dr*(cols+2) + dc)
+and the boundary constraint is handled by the padding instead of bound checks.
+each level moves the whole frontier in every direction at once with numpy
+4-connectivity: up/down/left/right, 8-connectivity adds diagonals
+bidirectional mode grows one frontier from each end (always the smaller one)
+and stops as soon as they meet
+
+direction-optimizing mode (Beamer et al.):
+on low-diameter graphs (social networks, web graphs) one or two levels hold most
+of the graph. top-down then wastes nearly all its edge checks on neighbors that are
+already visited. bottom-up flips the question: every unvisited node scans its
+in-edges for ANY parent in the frontier and stops at the first hit.
+    top-down -> bottom-up once the frontier's edges pass edge_fraction of the
+                edges still unexplored
+    bottom-up -> top-down once the frontier is below node_fraction of the nodes
+                 and shrinking
+bottom-up needs the in-edges: the transposed CSR, built on the first call and
+kept (a full transpose, about as slow as a traversal). BFS(adj, symmetric=True)
+says the graph is undirected (every edge stored both ways, eg directed=False),
+then the graph itself is used and nothing is built
 """
+from array import array
+import numpy as np
+from CSR_Graph import CSRGraph, row_positions
 
 class BFS():
-    def __init__(self, adj):
-        self.adj = adj
-        self.visited = []
-        self.queue = []
+    def __init__(self, adj, symmetric=False):
+        self.graph = adj if isinstance(adj, CSRGraph) else CSRGraph.from_adjacency(adj)
+        self.order = None # ids in the order they were visited
+        self._reverse = self.graph if symmetric else None
 
     def bfs(self, node):
-        self.visited.append(node)
-        self.queue.append(node)
-        
-        while self.queue:
-            v = self.queue.pop(0)
-            print(v, end=' ')
-            
-            for neighbor in self.adj[v]:
-                if neighbor not in self.visited:
-                    self.visited.append(neighbor)
-                    self.queue.append(neighbor)
-
-'''
-graph:
-    A
-   BC
-  DEF
-'''
-adj = {
-    'A' : ['B','C'],
-    'B' : ['D', 'E'],
-    'C' : ['F'],
-    'D' : [],
-    'E' : ['F'],
-    'F' : [],
-    'G': []
-}
-
-breadth_first_search = BFS(adj)
-breadth_first_search.bfs('A')
\ No newline at end of file
+        return self.bfs_multi([node])
+
+    # several sources at distance 0, e.g. nearest of many starting points
+    def bfs_multi(self, nodes):
+        g = self.graph
+        indptr, indices = g.indptr, g.indices
+        visited = bytearray(g.num_v)
+        dist = array('q', [-1]) * g.num_v
+        parent = array('q', [-1]) * g.num_v
+        queue = array('q', [0]) * g.num_v
+        head = tail = 0
+        for node in nodes:
+            v = g.id_of(node)
+            if not visited[v]:
+                visited[v] = 1
+                dist[v] = 0
+                queue[tail] = v
+                tail += 1
+
+        while head < tail:
+            v = queue[head]
+            head += 1
+            d = dist[v] + 1
+            for neighbor in indices[indptr[v]:indptr[v + 1]].tolist():
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    dist[neighbor] = d
+                    parent[neighbor] = v
+                    queue[tail] = neighbor
+                    tail += 1
+
+        self.order = np.frombuffer(queue, dtype=np.int64)[:tail]
+        return np.frombuffer(dist, dtype=np.int64), np.frombuffer(parent, dtype=np.int64)
+
+    # level-synchronous BFS, same dist as bfs()
+    # parent is a valid BFS parent but ties may go to a different frontier node
+    def bfs_levels(self, nodes):
+        g = self.graph
+        dist = np.full(g.num_v, -1, dtype=np.int64)
+        parent = np.full(g.num_v, -1, dtype=np.int64)
+        frontier = np.unique(np.fromiter((g.id_of(n) for n in nodes), dtype=np.int64))
+        dist[frontier] = 0
+        order = [frontier]
+        level = 0
+        while len(frontier):
+            level += 1
+            neighbors, parents = expand(g, frontier)
+            fresh = dist[neighbors] == -1
+            neighbors, parents = neighbors[fresh], parents[fresh]
+            parent[neighbors] = parents
+            dist[neighbors] = level
+            frontier = np.unique(neighbors)
+            order.append(frontier)
+        self.order = np.concatenate(order)
+        return dist, parent
+
+    # same dist/parent output as bfs_levels, self.edge_checks counts edges examined
+    def bfs_direction_optimizing(self, nodes, edge_fraction=1/14, node_fraction=1/24):
+        g = self.graph
+        reverse = self._reverse_graph()
+        out_degree = np.diff(g.indptr)
+        dist = np.full(g.num_v, -1, dtype=np.int64)
+        parent = np.full(g.num_v, -1, dtype=np.int64)
+        frontier = np.unique(np.fromiter((g.id_of(n) for n in nodes), dtype=np.int64))
+        dist[frontier] = 0
+        unexplored_edges = g.num_e - int(out_degree[frontier].sum())
+        order = [frontier]
+        self.edge_checks = 0
+        bottom_up = False
+        level = 0
+        while len(frontier):
+            level += 1
+            frontier_edges = int(out_degree[frontier].sum())
+            if not bottom_up and frontier_edges > edge_fraction * unexplored_edges:
+                bottom_up = True
+            elif bottom_up and len(frontier) < node_fraction * g.num_v and len(frontier) < len(order[-2]):
+                bottom_up = False
+
+            if bottom_up:
+                nxt, parents, checks = bottom_up_step(reverse, dist, frontier)
+            else:
+                nxt, parents = expand(g, frontier)
+                checks = len(nxt)
+                fresh = dist[nxt] == -1
+                nxt, parents = nxt[fresh], parents[fresh]
+            self.edge_checks += checks
+            parent[nxt] = parents
+            dist[nxt] = level
+            frontier = np.unique(nxt)
+            unexplored_edges -= int(out_degree[frontier].sum())
+            order.append(frontier)
+        self.order = np.concatenate(order)
+        return dist, parent
+
+    # in-edges for the bottom-up steps, an undirected graph (symmetric=True) is
+    # its own reverse
+    def _reverse_graph(self):
+        if self._reverse is None:
+            self._reverse = self.graph.reverse()
+        return self._reverse
+
+    # unweighted shortest path between two nodes, [] if not connected
+    def shortest_path(self, start, end, level_synchronous=False):
+        if level_synchronous:
+            dist, parent = self.bfs_levels([start])
+        else:
+            dist, parent = self.bfs(start)
+        return walk_parents(self.graph, dist, parent, self.graph.id_of(end))
+
+
+# all out-edges of a frontier at once: (neighbor ids, frontier node each came from)
+def expand(g, frontier):
+    positions, lens = row_positions(g.indptr, frontier)
+    return g.indices[positions].astype(np.int64), np.repeat(frontier, lens)
+
+# every unvisited node looks for a parent in the frontier, checking its k-th
+# in-edge in round k. nodes drop out at their first hit (or when out of edges),
+# so edges past the first hit are never looked at
+# returns (found nodes, their parents, number of edges checked)
+def bottom_up_step(reverse, dist, frontier):
+    in_frontier = np.zeros(len(dist), dtype=bool)
+    in_frontier[frontier] = True
+    nodes = np.flatnonzero(dist == -1)
+    starts = reverse.indptr[nodes]
+    degrees = reverse.indptr[nodes + 1] - starts
+    alive = degrees > 0
+    nodes, starts, degrees = nodes[alive], starts[alive], degrees[alive]
+    found, parents = [], []
+    checks = 0
+    k = 0
+    while len(nodes):
+        candidates = reverse.indices[starts + k]
+        checks += len(nodes)
+        hit = in_frontier[candidates]
+        found.append(nodes[hit])
+        parents.append(candidates[hit].astype(np.int64))
+        k += 1
+        alive = ~hit & (degrees > k)
+        nodes, starts, degrees = nodes[alive], starts[alive], degrees[alive]
+    if not found:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), 0
+    return np.concatenate(found), np.concatenate(parents), checks
+
+# power-law (Chung-Lu) undirected graph: node i gets expected degree ~ (i+1)^(-1/(gamma-1))
+def power_law_graph(num_v, num_e, gamma=2.3, seed=0):
+    rng = np.random.default_rng(seed)
+    w = (np.arange(num_v) + 1.0) ** (-1.0 / (gamma - 1))
+    w /= w.sum()
+    src = rng.choice(num_v, num_e, p=w)
+    dst = rng.choice(num_v, num_e, p=w)
+    return CSRGraph.from_arrays(src, dst, num_v=num_v, directed=False)
+
+# edge checks and time of top-down (bfs_levels) vs direction-optimizing on a power-law graph
+# symmetric=False transposes the (undirected) graph anyway, timed as setup on its own
+def benchmark_direction_optimizing(num_v=200000, num_e=2000000, seed=0, symmetric=True):
+    import time
+    engine = BFS(power_law_graph(num_v, num_e, seed=seed), symmetric=symmetric)
+    source = 0 # the biggest hub, so the giant component
+    t = time.perf_counter()
+    engine._reverse_graph()
+    t_setup = time.perf_counter() - t
+    t = time.perf_counter()
+    dist_td, _ = engine.bfs_levels([source])
+    t_td = time.perf_counter() - t
+    reached = np.flatnonzero(dist_td >= 0)
+    checks_td = int(np.diff(engine.graph.indptr)[reached].sum())
+    t = time.perf_counter()
+    dist_do, _ = engine.bfs_direction_optimizing([source])
+    t_do = time.perf_counter() - t
+    assert (dist_td == dist_do).all()
+    print("top-down:             %10d edge checks  %.3fs" % (checks_td, t_td))
+    print("direction-optimizing: %10d edge checks  %.3fs (%.1fx fewer checks, %.1fx faster)"
+          % (engine.edge_checks, t_do, checks_td / max(engine.edge_checks, 1), t_td / t_do))
+    print("  + reverse graph setup %.3fs (%s)" % (t_setup, 'symmetric, none' if symmetric else 'transpose'))
+
+FOUR = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+EIGHT = FOUR + [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# padded grid state shared by the grid functions:
+# (open cells as flat bool array, flat offsets of the moves, padded width)
+def _grid_setup(grid, connectivity):
+    grid = np.asarray(grid)
+    if grid.ndim != 2:
+        raise ValueError("grid must be 2D")
+    if connectivity not in (4, 8):
+        raise ValueError("connectivity must be 4 or 8")
+    rows, cols = grid.shape
+    open_ = np.zeros((rows + 2, cols + 2), dtype=bool)
+    open_[1:-1, 1:-1] = grid == 0
+    width = cols + 2
+    moves = FOUR if connectivity == 4 else EIGHT
+    offsets = np.array([dr * width + dc for dr, dc in moves], dtype=np.int64)
+    return open_.ravel(), offsets, width
+
+# flat index of (row, col) in the padded grid of _grid_setup
+def _cell_index(cell, open_, width):
+    r, c = cell
+    if not (0 <= r < len(open_) // width - 2 and 0 <= c < width - 2):
+        raise ValueError("cell %s is outside the grid" % (tuple(cell),))
+    return (r + 1) * width + c + 1
+
+def _cell_of(index, width):
+    return (int(index) // width - 1, int(index) % width - 1)
+
+# one level: every frontier cell moved in every direction, keeps open unvisited cells
+# returns (new cells, the frontier cell each came from)
+def _grid_step(open_, offsets, dist, frontier):
+    cand = (frontier[None, :] + offsets[:, None]).ravel()
+    src = np.tile(frontier, len(offsets))
+    keep = open_[cand] & (dist[cand] == -1)
+    cand, src = cand[keep], src[keep]
+    cand, first = np.unique(cand, return_index=True)
+    return cand, src[first]
+
+# multi-source BFS over a grid, dist has the grid's shape (-1 = wall or unreachable)
+def grid_bfs(grid, sources, connectivity=4):
+    open_, offsets, width = _grid_setup(grid, connectivity)
+    dist = np.full(len(open_), -1, dtype=np.int64)
+    frontier = np.unique([_cell_index(c, open_, width) for c in sources]).astype(np.int64)
+    frontier = frontier[open_[frontier]]
+    dist[frontier] = 0
+    level = 0
+    while len(frontier):
+        level += 1
+        frontier, _ = _grid_step(open_, offsets, dist, frontier)
+        dist[frontier] = level
+    rows, cols = np.shape(grid)
+    return dist.reshape(rows + 2, cols + 2)[1:-1, 1:-1].copy()
+
+# bidirectional point-to-point query: (length, [cells start -> end]), (-1, []) if none
+def grid_shortest_path(grid, start, end, connectivity=4):
+    open_, offsets, width = _grid_setup(grid, connectivity)
+    s, t = _cell_index(start, open_, width), _cell_index(end, open_, width)
+    if not (open_[s] and open_[t]):
+        return -1, []
+    if s == t:
+        return 0, [tuple(start)]
+    dist = [np.full(len(open_), -1, dtype=np.int64) for _ in range(2)]
+    parent = [np.full(len(open_), -1, dtype=np.int64) for _ in range(2)]
+    frontier = [np.array([s], dtype=np.int64), np.array([t], dtype=np.int64)]
+    dist[0][s] = dist[1][t] = 0
+    level = [0, 0]
+    while len(frontier[0]) and len(frontier[1]):
+        side = 0 if len(frontier[0]) <= len(frontier[1]) else 1 # grow the smaller one
+        level[side] += 1
+        cells, parents = _grid_step(open_, offsets, dist[side], frontier[side])
+        dist[side][cells] = level[side]
+        parent[side][cells] = parents
+        frontier[side] = cells
+        met = cells[dist[1 - side][cells] != -1]
+        if len(met):
+            # whole level expanded, so the best meeting cell is among these
+            total = dist[0][met] + dist[1][met]
+            meet = met[np.argmin(total)]
+            path = []
+            v = meet
+            while v != -1:
+                path.append(_cell_of(v, width))
+                v = parent[0][v]
+            path.reverse()
+            v = parent[1][meet]
+            while v != -1:
+                path.append(_cell_of(v, width))
+                v = parent[1][v]
+            return int(total.min()), path
+    return -1, []
+
+# follow parent back from v to its source, returns labels source -> v
+def walk_parents(g, dist, parent, v):
+    if dist[v] == -1:
+        return []
+    path = []
+    while v != -1:
+        path.append(g.label_of(int(v)))
+        v = parent[v]
+    return path[::-1]
+
+
+if __name__ == '__main__':
+    '''
+    graph:
+        A
+       BC
+      DEF
+    '''
+    adj = {
+        'A' : ['B','C'],
+        'B' : ['D', 'E'],
+        'C' : ['F'],
+        'D' : [],
+        'E' : ['F'],
+        'F' : [],
+        'G': []
+    }
+
+    breadth_first_search = BFS(adj)
+    dist, parent = breadth_first_search.bfs('A')
+    print(*[breadth_first_search.graph.label_of(v) for v in breadth_first_search.order.tolist()])
+    print(breadth_first_search.shortest_path('A', 'F'))
+    print(breadth_first_search.shortest_path('A', 'F', level_synchronous=True))
+    dist, parent = breadth_first_search.bfs_direction_optimizing(['A'])
+    print(dist)
+
+    '''
+    grid, 1 = wall:
+        S . . #
+        # # . #
+        . . . E
+    '''
+    grid = np.array([[0, 0, 0, 1],
+                     [1, 1, 0, 1],
+                     [0, 0, 0, 0]])
+    print(grid_bfs(grid, [(0, 0)]))
+    print(grid_shortest_path(grid, (0, 0), (2, 3)))
+    print(grid_shortest_path(grid, (0, 0), (2, 3), connectivity=8))
+
+    benchmark_direction_optimizing(20000, 200000)
@@ -29,45 +29,107 @@ Then it examines for negative cycles by repeating the each edge performing
 Further, nodes reachable by negative cycle are marked down as well, since they
 would not be reached otherwise (obviously as those in the negative cycle)
 Repeat V-2 times to ensure propogation
+
+Implementation:
+the edges are kept as columns (numpy arrays of sources, targets and weights),
+grouped by source like a CSR (see CSR_Graph.py)
+relaxing is done in rounds over an ACTIVE SET: only vertices whose distance changed
+in the last round can improve anyone, so a round only relaxes their out-edges.
+one round = gather those edges, compute dist[v1] + weight for all of them at once
+and keep the minimum per target with np.minimum.at. no change in a round means
+everything has converged, stop right there instead of always doing V-1 passes.
+after k rounds every shortest path with <= k edges is found, so a change in
+round V means a negative cycle.
+graphs with a few negative edges usually settle in a handful of rounds
+mode='spfa': same idea with a FIFO queue of changed vertices (Shortest Path Faster
+Algorithm), one vertex at a time in python. better when only a few vertices
+change per round; a best path with V edges means a negative cycle
+
+Negative cycles:
+every round, some vertex on each reachable negative cycle changes (if none did,
+summing dist[v2] <= dist[v1] + weight around the cycle gives 0 <= its weight).
+so the vertices that still change in round V touch every negative cycle, and
+whatever is reachable from them has no shortest path: BF marks it -inf.
+the cycle itself comes from prev: walking back V steps from a vertex that
+changed in round V always ends up on a cycle of prev pointers, and every such
+cycle is negative. BF keeps it in self.negative_cycle (None if there is none)
+(in spfa mode a negative cycle is handed over to the vectorized rounds)
+
+Arbitrage:
+rates[i][j] = units of currency j one unit of i buys. a loop of trades is a
+profit when the product of its rates is > 1, ie when the sum of -log(rate) is
+< 0, so with weights -log(rate) an arbitrage is a negative cycle.
+every currency starts at distance 0 (a virtual source with a 0 edge to each of
+them), so cycles anywhere are found.
+warm start: once a run converges, dist is a set of potentials every edge agrees
+with (dist[j] <= dist[i] + weight). after a few rates change only the edges out
+of those currencies can disagree, so the next run starts from the previous dist
+with just them active, a handful of rounds instead of a cold start.
+a profitable loop keeps dist falling forever, so instead of waiting V rounds
+the prev pointers are checked for a cycle after every round (pointer jumping,
+O(V log V)), and the first one found is returned
 '''
 
 #iterates over each edge, so here it is simpler to use an edge list
 #since I will be using an edge list, it is simpler to have a graph class where
 #number of vertices is known
+from array import array
+from collections import deque
+import math
+import numpy as np
+from CSR_Graph import CSRGraph, row_positions
+
+INF = float('infinity')
 
 class Graph:
     def __init__(self, num_v):
         self.num_v = num_v
         self.edges = [] #arr edges
+        self.csr = None # edges as columns grouped by source, built when needed
+        self.negative_cycle = None # vertices of a negative cycle found by the last BF
     
     def add_edge(self, v1, v2, weight):
         self.edges.append([v1,v2,weight])
+        self.csr = None
+
+    # build from a CSRGraph (see CSR_Graph.py) without a python list per edge
+    @classmethod
+    def from_csr(cls, csr):
+        g = cls(csr.num_v)
+        g.edges = _CSREdges(csr)
+        g.csr = csr
+        return g
+
+    def _csr(self):
+        if self.csr is None:
+            cols = np.array(self.edges, dtype=np.float64).reshape(-1, 3)
+            self.csr = CSRGraph.from_arrays(cols[:, 0].astype(np.int64), cols[:, 1].astype(np.int64),
+                                            cols[:, 2], self.num_v)
+        return self.csr
     
-    def BF(self, node):
-        dist = [float('Infinity')] * self.num_v
-        dist[node] = 0 #dist node to itself is clearly 0
-        prev = [None] * self.num_v      
-        #relaxation operations num_v - 1 times
-        for _ in range(self.num_v -1):
-            #iterate over each edge
-            for v1,v2,weight in self.edges:
-                if dist[v1] != float('infinity') and dist[v1] + weight < dist[v2]:
-                    #if the distance of a node to another node is defined, and dsistance + weight
-                    #is less than distance of second node to first node, then distance of second
-                    #node to first node is first node + weight.
-                    dist[v2] = dist[v1] + weight
-                    prev[v2] = v1
-                    
-        # iterate over each edge again,
-        # if value changes then we have a negative cycle in the graph
-        # and we cannot find the shortest distances
-        for v1,v2,weight in self.edges:
-            if dist[v1] != float('infinity') and dist[v1] + weight < dist[v2]: 
-                print('Negative cycle, cannot compute distances')
-                return
-        #no negative cycle
+    # returns dist (inf = unreachable, -inf = reachable from a negative cycle)
+    # and prev (-1 = no parent) arrays
+    def BF(self, node, mode='vectorized'):
+        g = self._csr()
+        if mode not in ('vectorized', 'spfa'):
+            raise ValueError("mode must be 'vectorized' or 'spfa'")
+        self.negative_cycle = None
+        if mode == 'spfa':
+            dist, prev, converged = _spfa(g, node)
+            if converged:
+                return dist, prev
+        dist, prev, changed = _active_set_rounds(g, node)
+        if len(changed):
+            # still changing after V rounds, negative cycle
+            self.negative_cycle = _find_cycle(prev, changed)
+            dist[_reachable(g, changed)] = -INF
         #self.print_solution(dist)  
         return dist, prev
+
+    # vertices of a negative cycle reachable from node, in edge order, or None
+    def find_negative_cycle(self, node):
+        self.BF(node)
+        return self.negative_cycle
     
     def print_solution(self, dist):
         print("Distance of vertexes from source:")
@@ -80,29 +142,220 @@ class Graph:
         #base case
         if dist[end_node] == float('infinity'): #means not connected t0 start_node
             return path
+        if dist[end_node] == -INF: #a negative cycle on the way, no shortest path
+            return path
         # start at end_node and go backwards
         # prev[end_node] = temp
         # prev[temp] = temp2 
         # prev[temp2] = temp3    and so on and so forth
-        #so, find 'parent' of node, then find 'parent' of parent and so on. Recursion!
+        #so, find 'parent' of node, then find 'parent' of parent and so on
         return_path(prev, path, start_node, end_node)
         path = path[::-1] # reverse the list
         return path
+
+# rounds of vectorized relaxation over the out-edges of the vertices that changed
+# returns (dist, prev, changed), changed = vertices that changed in round V
+# (empty = converged, no negative cycle)
+def _active_set_rounds(g, node):
+    n = g.num_v
+    dist = np.full(n, np.inf)
+    prev = np.full(n, -1, dtype=np.int64)
+    dist[node] = 0 #dist node to itself is clearly 0
+    active = np.array([node], dtype=np.int64)
+    for _ in range(n):
+        if not len(active):
+            break
+        v1, v2, weight = _out_edges(g, active)
+        candidate = dist[v1] + weight
+        better = candidate < dist[v2]
+        v1, v2, candidate = v1[better], v2[better], candidate[better]
+        np.minimum.at(dist, v2, candidate) # keeps the best candidate per target
+        won = candidate == dist[v2]
+        prev[v2[won]] = v1[won]
+        active = np.unique(v2)
+    return dist, prev, active
+
+# SPFA: FIFO queue of vertices whose distance changed
+def _spfa(g, node):
+    n = g.num_v
+    indptr = memoryview(g.indptr)
+    indices = memoryview(g.indices)
+    weights = memoryview(g.weights)
+    dist = array('d', [float('infinity')]) * n
+    prev = array('q', [-1]) * n
+    hops = array('q', [0]) * n # edges on the current best path to each vertex
+    in_queue = bytearray(n)
+    dist[node] = 0
+    queue = deque([node])
+    in_queue[node] = 1
+    while queue:
+        v1 = queue.popleft()
+        in_queue[v1] = 0
+        d = dist[v1]
+        for i in range(indptr[v1], indptr[v1 + 1]):
+            v2 = indices[i]
+            if d + weights[i] < dist[v2]:
+                dist[v2] = d + weights[i]
+                prev[v2] = v1
+                hops[v2] = hops[v1] + 1
+                if hops[v2] >= n: # a best path with V edges repeats a vertex
+                    return np.frombuffer(dist, dtype=np.float64), np.frombuffer(prev, dtype=np.int64), False
+                if not in_queue[v2]:
+                    in_queue[v2] = 1
+                    queue.append(v2)
+    return np.frombuffer(dist, dtype=np.float64), np.frombuffer(prev, dtype=np.int64), True
+
+# a cycle of prev pointers, walked back from the first of starts that leads to one
+# returned in edge order: cycle[i] -> cycle[i + 1] -> ... -> cycle[0]
+def _find_cycle(prev, starts):
+    n = len(prev)
+    for v in starts:
+        v = int(v)
+        for _ in range(n): # after V steps back we are on the cycle (if there is one)
+            if v == -1:
+                break
+            v = int(prev[v])
+        if v == -1:
+            continue
+        cycle = [v]
+        u = int(prev[v])
+        while u != v:
+            cycle.append(u)
+            u = int(prev[u])
+        return cycle[::-1]
+    return None
+
+# a vertex on some cycle of prev pointers, -1 if they form a forest
+# pointer jumping: after log2(V) squarings jump[v] = V steps back from v
+def _pointer_cycle(prev):
+    n = len(prev)
+    jump = np.append(prev, n) # n = sentinel for 'no parent', points to itself
+    jump[jump == -1] = n
+    steps = 1
+    while steps < n:
+        jump = jump[jump]
+        steps *= 2
+    found = np.nonzero(jump[:n] != n)[0]
+    return int(jump[found[0]]) if len(found) else -1
+
+# mask of the vertices reachable from sources (sources included), level by level
+def _reachable(g, sources):
+    seen = np.zeros(g.num_v, dtype=bool)
+    frontier = np.unique(np.asarray(sources, dtype=np.int64))
+    seen[frontier] = True
+    while len(frontier):
+        _, targets, _ = _out_edges(g, frontier)
+        frontier = np.unique(targets[~seen[targets]])
+        seen[frontier] = True
+    return seen
+
+# out-edges of a set of vertices as columns (sources, targets, weights)
+def _out_edges(g, vertices):
+    positions, lens = row_positions(g.indptr, vertices)
+    return np.repeat(vertices, lens), g.indices[positions].astype(np.int64), g.weights[positions]
     
+class _CSREdges:
+    # re-iterable [v1, v2, weight] view over the csr edge columns
+    def __init__(self, csr):
+        self.csr = csr
+
+    def __len__(self):
+        return self.csr.num_e
+
+    def __iter__(self):
+        src, dst, weights = self.csr.edge_arrays()
+        return zip(src.tolist(), dst.tolist(), weights.tolist())
+
+class Arbitrage:
+    '''
+    rates  -> V x V matrix (nested lists or ndarray), rates[i][j] = units of j per
+              unit of i, 0 (or nan) = no market. the diagonal is ignored
+    labels -> currency names, default 0..V-1
+    tolerance -> a relaxation has to gain more than this, so rounding in -log
+                 doesn't turn a loop with a product of exactly 1 into a profit
+    the matrix stays dense: with a few thousand currencies nearly every pair has
+    a rate, so a round is one (active x V) numpy block instead of an edge list
+    '''
+    def __init__(self, rates, labels=None, tolerance=1e-12):
+        rates = np.array(rates, dtype=np.float64)
+        n = len(rates)
+        self.labels = list(labels) if labels is not None else list(range(n))
+        self.index = {l: i for i, l in enumerate(self.labels)}  # noqa: E741
+        self.tolerance = tolerance
+        self.weights = np.full((n, n), np.inf)
+        market = np.isfinite(rates) & (rates > 0)
+        np.fill_diagonal(market, False)
+        self.weights[market] = -np.log(rates[market])
+        self.dist = None # potentials from the last converged run, None = cold start
+        self.active = set()
+        self.rounds = 0 # rounds done by the last find
+
+    # changes -> iterable of (from, to, rate), rate 0 removes the market
+    def update(self, changes):
+        for a, b, rate in changes:
+            i, j = self.index[a], self.index[b]
+            self.weights[i, j] = -math.log(rate) if rate > 0 and i != j else np.inf
+            self.active.add(i) # only edges out of i can disagree with dist now
+        return self
+
+    # returns (cycle of labels, first one repeated at the end, profit factor),
+    # None if there is no arbitrage
+    def find(self):
+        W = self.weights
+        n = len(W)
+        if self.dist is None:
+            dist = np.zeros(n)
+            active = np.arange(n)
+        else:
+            dist = self.dist
+            active = np.array(sorted(self.active), dtype=np.int64)
+        self.active = set()
+        prev = np.full(n, -1, dtype=np.int64) # old pointers don't match the new rates
+        columns = np.arange(n)
+        self.rounds = 0
+        for _ in range(n):
+            if not len(active):
+                break
+            self.rounds += 1
+            candidate = dist[active, None] + W[active] # (active x V) block
+            best = candidate.argmin(axis=0)
+            value = candidate[best, columns]
+            better = value < dist - self.tolerance
+            dist[better] = value[better]
+            prev[better] = active[best[better]]
+            active = np.nonzero(better)[0]
+            on_cycle = _pointer_cycle(prev)
+            if on_cycle != -1: # a loop of prev pointers is already a profitable one
+                break
+        if not len(active):
+            self.dist = dist
+            return None
+        # dist never settles while there is a profitable loop, start cold next time
+        self.dist = None
+        cycle = _find_cycle(prev, [on_cycle] if on_cycle != -1 else active)
+        weight = sum(W[cycle[i], cycle[(i + 1) % len(cycle)]] for i in range(len(cycle)))
+        return [self.labels[v] for v in cycle + cycle[:1]], math.exp(-weight)
+
+# walks prev back from end_node (-1 = reached the source), no recursion
 def return_path(prev, path, start_node, end_node):
-        #if node is source aka base case
-        #following if statement includes the start and end nodes
-        if end_node == None:
-            return
-        path.append(end_node)
-        #print(path)
-        return_path(prev, path, end_node, prev[end_node])
-         
-g = Graph(5)
-g.add_edge(0, 1, 1)
-g.add_edge(0, 2, 7)
-g.add_edge(1, 3, 3)
-g.add_edge(2, 1, 6)
-g.add_edge(3, 2, 2)
-
-print(g.find_shortest_path(0, 2))
\ No newline at end of file
+        #following loop includes the start and end nodes
+        while end_node != -1:
+            path.append(end_node)
+            end_node = int(prev[end_node])
+
+
+if __name__ == '__main__':
+    g = Graph(5)
+    g.add_edge(0, 1, 1)
+    g.add_edge(0, 2, 7)
+    g.add_edge(1, 3, 3)
+    g.add_edge(2, 1, 6)
+    g.add_edge(3, 2, 2)
+
+    print(g.find_shortest_path(0, 2))
+    rates = [[1, 0.9, 0.8],
+             [1.1, 1, 0.9],
+             [1.2, 1.1, 1]]
+    arb = Arbitrage(rates, ['USD', 'EUR', 'GBP'])
+    print(arb.find())
+    print(arb.update([('GBP', 'USD', 1.3)]).find())
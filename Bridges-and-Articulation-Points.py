@@ -44,121 +44,110 @@ recall: u is an articulation point in following cases
 #it always seems better to initialize graph and add edges
 #then, either use edge list or adjacency matrix
 from collections import defaultdict
+from array import array
+from CSR_Graph import CSRGraph
+from DFS_Iterative import IterativeDFS, BACK
 
 class Graph:
     def __init__(self, num_v):
         self.V = num_v
         self.adj = defaultdict(list)
-        self.id = 0
+        self.csr = None
         self.bridges = []
         self.ap = []
     
     def add_edge(self, a, b):
         self.bridges = []
         self.ap = []
+        self.csr = None
         self.adj[a].append(b)
         self.adj[b].append(a)
+
+    # run straight on a CSRGraph (see CSR_Graph.py), node ids are the csr's dense ids
+    # the csr has to hold both directions of every edge (directed=False)
+    @classmethod
+    def from_csr(cls, csr):
+        g = cls(csr.num_v)
+        g.csr = csr
+        g.adj = csr.rows
+        return g
+
+    def _csr(self):
+        if self.csr is None:
+            self.csr = CSRGraph.from_adjacency(self.adj, num_v=self.V)
+        return self.csr
     
     '''
-    node: to be visited
-    visited: array of visited nodes
-    parent: array of DFS trees
-    disc: array of discovery id's of visited vertices
+    both searches run on the iterative DFS engine (DFS_Iterative.py) in undirected
+    mode, so the edge back to the DFS parent is already skipped and only tree and
+    back edges are reported. the recursive dfs_b/dfs_a become hooks:
+    pre  -> initialize low value as the discovery id
+    edge -> back edge to an ancestor: update low-value
+    post -> the 'callback' from child node to parent: hand low value up and test
+            the bridge/articulation condition
+    disc: array of discovery id's of visited vertices (engine.disc)
+    parent: array of DFS trees (engine.parent)
     '''
-    def dfs_b(self,node,visited,parent,low,disc):
-        #current node is visited
-        visited[node] = True
-        #initialize discovery id and low value
-        disc[node] = self.id
-        low[node] = self.id
-        self.id += 1
-        #iterate over all neighbors to node
-        for neighbor in self.adj[node]:
-            #if it's not visited, make it a child of node in a DFS tree and iterate for it
-            if visited[neighbor] == False:
-                parent[neighbor] = node
-                self.dfs_b(neighbor, visited, parent, low, disc)
-                #check if subtree with neighbor as root has a connection to a parent of node
-                #if so, then match low-link value
-                low[node] = min(low[node], low[neighbor])
-                '''
-                if the lowest vertex reachable from subtree under neighbor is below node, then
-                node-neighbor is a bridge
-                ie
-                if the low-link of neighbor is greater than the id of node, bridge
-                ie
-                there was no edge connecting neighbor to an ancestor of node (somewhere in the
-                                                                              CC)
-                '''
-                if low[neighbor] > disc[node]:
-                    self.bridges.append(node)
-                    self.bridges.append(neighbor)
-                    print("%d %d"%(node,neighbor))
-            
-            elif neighbor != parent[node]: #update low-value
-                low[node] = min(low[node], disc[neighbor])
-        
+    def _low_link_search(self, on_child_done):
+        engine = IterativeDFS(self._csr(), undirected=True)
+        disc = engine.disc
+        low = array('q', [-1]) * self.V
+
+        def pre(node):
+            low[node] = disc[node]
+
+        def edge(node, neighbor, kind):
+            if kind == BACK and disc[neighbor] < low[node]: #update low-value
+                low[node] = disc[neighbor]
+
+        def post(neighbor, node):
+            if node == -1:
+                return
+            #check if subtree with neighbor as root has a connection to a parent of node
+            #if so, then match low-link value
+            if low[neighbor] < low[node]:
+                low[node] = low[neighbor]
+            on_child_done(node, neighbor, low, disc, engine.parent)
+
+        engine.run(pre=pre, post=post, edge=edge)
+
     def find_bridges(self):
-        self.id = 0
         self.bridges = []
-        #initialize vertices to not visited
-        #           and all arrays
-        visited = [False] * self.V
-        disc = [float("Infinity")] * (self.V)
-        low = [float("Infinity")] * (self.V)
-        parent = [-1] * (self.V)
-        #call the recursive dfs to find bridges
-        for i in range(self.V):
-            if visited[i] == False:
-                self.dfs_b(i, visited, parent, low, disc)
-
+        def on_child_done(node, neighbor, low, disc, parent):
+            '''
+            if the lowest vertex reachable from subtree under neighbor is below node, then
+            node-neighbor is a bridge
+            ie
+            if the low-link of neighbor is greater than the id of node, bridge
+            ie
+            there was no edge connecting neighbor to an ancestor of node (somewhere in the
+                                                                          CC)
+            '''
+            if low[neighbor] > disc[node]:
+                self.bridges.append(node)
+                self.bridges.append(neighbor)
+        self._low_link_search(on_child_done)
+        return list(zip(self.bridges[::2], self.bridges[1::2]))
 
     #ap[] articulation poitns
-    def dfs_a(self,node,visited,parent,low,disc):
-        #the only difference here is the 'child' variable
-        out_edge = 0
-        visited[node] = True
-        disc[node] = self.id
-        low[node] = self.id
-        self.id += 1
-        #iterate for all neighbors of node
-        for neighbor in self.adj[node]:
-            #if neighbor isn't visited yet, make it a child of node, and increase node's
-            #out_edges aka child count
-            if visited[neighbor] == False:
-                parent[neighbor] = node
-                out_edge += 1
-                self.dfs_a(neighbor, visited, parent, low, disc)
-                low[node] = min(low[node], low[neighbor])
-                
-                #node is an articulation point if
-                #(1) node is root of dfs tree and had >= 2 children
-                if parent[node] == -1 and out_edge >= 2:
-                    self.ap.append(node)
-                    print("%d"%(node))
-                
-                #(2) If node isn't a root and low value of one of its child is more
-                # than discovery value of u.
-                if parent[node] != -1 and low[neighbor] >= disc[node]:
-                    self.ap.append(node)
-                    print("%d"%(node))
-
-            elif neighbor != parent[node]: #update low-value
-                low[node] = min(low[node], disc[neighbor])
-                
-                
     def find_articulation_points(self):
-        self.id = 0
         self.ap = []
-        visited = [False] * self.V
-        disc = [float("Infinity")] * (self.V)
-        low = [float("Infinity")] * (self.V)
-        parent = [-1] * (self.V)
-        
-        #call the recursive dfs to find bridges
-        for i in range(self.V):
-            if visited[i] == False:
-                self.dfs_a(i, visited, parent, low, disc)
+        #the only difference here is the 'child' variable
+        out_edge = array('q', [0]) * self.V
+        is_ap = bytearray(self.V)
+        def on_child_done(node, neighbor, low, disc, parent):
+            out_edge[node] += 1
+            #node is an articulation point if
+            #(1) node is root of dfs tree and had >= 2 children
+            #(2) If node isn't a root and low value of one of its child is more
+            # than discovery value of u.
+            if (parent[node] == -1 and out_edge[node] >= 2) or \
+               (parent[node] != -1 and low[neighbor] >= disc[node]):
+                if not is_ap[node]:
+                    is_ap[node] = 1
+                    self.ap.append(node)
+        self._low_link_search(on_child_done)
+        return self.ap
 
 
 
@@ -172,7 +161,8 @@ g1.add_edge(3, 4)
   
    
 print("Bridges in graph ")
-g1.find_bridges()
+for a, b in g1.find_bridges():
+    print("%d %d"%(a,b))
 print("Articulation points in graph ")
-g1.find_articulation_points()
-        
\ No newline at end of file
+for node in g1.find_articulation_points():
+    print("%d"%(node))
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+CSR (Compressed Sparse Row) graph:
+one immutable container that every algorithm here can consume instead of each
+script building its own dict of lists / dict of dicts / edge list / matrix
+
+motivation:
+a dict of lists stores every edge as a python object (a list slot pointing to a
+boxed int, plus the weight as another boxed object). with tens of millions of
+edges this is gigabytes. CSR stores the whole graph in three flat arrays:
+
+    indptr  (V+1)  -> row offsets, the neighbors of node u live in
+                      indices[indptr[u]:indptr[u+1]]
+    indices (E)    -> neighbor ids, grouped by source node
+    weights (E)    -> weight of each edge, lined up with indices
+
+so an edge costs 4 (or 8) bytes for the neighbor + 8 bytes for the weight
+
+labels:
+the algorithms work on dense int ids [0, V). arbitrary node labels ('A', 'U',
+(3,4), ...) are mapped to ids once when the graph is built. labels[i] gives the
+label of id i and index[label] gives the id. if the labels are already
+0..V-1 no mapping is stored (labels is None)
+
+how the scripts consume it:
+- as a mapping of label -> row, like the adj dicts in BFS/DFS/Dijkstra/
+  Topological-Sort: iter(g) gives labels, g[label] gives a row that iterates
+  over neighbor labels and has .items() for (neighbor, weight) pairs
+- by dense id, like the Graph classes in Tarjan/Bridges/Prim: g.rows[u] is a
+  list of neighbor ids, g.weighted_rows[u] a list of (neighbor id, weight)
+- as edge columns, like Bellman-Ford: g.edge_arrays() -> (src, dst, weight)
+- a whole frontier at a time, like the numpy BFS levels:
+  row_positions(g.indptr, frontier) -> positions into indices/weights
+
+build once, run every algorithm on it
+"""
+import os
+import pickle
+import numpy as np
+
+
+class CSRGraph:
+    __slots__ = ('_indptr', '_indices', '_weights', '_labels', '_index')
+
+    def __init__(self, indptr, indices, weights, labels=None):
+        indptr = np.ascontiguousarray(indptr, dtype=np.int64)
+        indices = np.ascontiguousarray(indices, dtype=_id_dtype(len(indptr) - 1))
+        weights = np.ascontiguousarray(weights, dtype=np.float64)
+        if len(indices) != indptr[-1] or len(weights) != len(indices):
+            raise ValueError("indptr, indices and weights do not line up")
+        # immutable: nobody gets to change the arrays under another algorithm
+        for arr in (indptr, indices, weights):
+            arr.flags.writeable = False
+        self._indptr = indptr
+        self._indices = indices
+        self._weights = weights
+        self._labels = None if labels is None else list(labels)
+        self._index = None if labels is None else {l: i for i, l in enumerate(self._labels)}  # noqa: E741
+        if self._labels is not None and len(self._labels) != len(indptr) - 1:
+            raise ValueError("need exactly one label per node")
+
+    # ---------------------------------------------------------------- builders
+    @classmethod
+    def from_arrays(cls, src, dst, weights=None, num_v=None, labels=None, directed=True):
+        '''
+        the scalable constructor, everything else ends up here
+        src, dst -> int arrays of dense ids, weights -> floats (default 1)
+        sorting by source is a counting sort: bincount for the row sizes,
+        cumsum for the offsets, then a stable argsort to group the edges
+        '''
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        if weights is None:
+            weights = np.ones(len(src), dtype=np.float64)
+        else:
+            weights = np.asarray(weights, dtype=np.float64)
+        if not directed:
+            # undirected edge = two directed edges, like add_edge in the scripts
+            src, dst = np.concatenate((src, dst)), np.concatenate((dst, src))
+            weights = np.concatenate((weights, weights))
+        if num_v is None:
+            num_v = len(labels) if labels is not None else (
+                int(max(src.max(), dst.max())) + 1 if len(src) else 0)
+        if len(src) and (src.min() < 0 or dst.min() < 0 or src.max() >= num_v or dst.max() >= num_v):
+            raise ValueError("edge endpoint outside [0, num_v)")
+
+        indptr = np.zeros(num_v + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_v), out=indptr[1:])
+        order = np.argsort(src, kind='stable') # stable keeps insertion order per row
+        return cls(indptr, dst[order], weights[order], labels)
+
+    @classmethod
+    def from_edges(cls, edges, num_v=None, directed=True):
+        '''
+        edges -> iterable of (a, b) or (a, b, weight), e.g. Bellman-Ford's [v1, v2, weight]
+        if num_v is given the endpoints are taken to already be ids 0..num_v-1,
+        otherwise any hashable labels work and are numbered in order of appearance
+        '''
+        index = None if num_v is not None else {}
+        src, dst, weights = [], [], []
+        for edge in edges:
+            a, b = edge[0], edge[1]
+            if index is not None:
+                a = index.setdefault(a, len(index))
+                b = index.setdefault(b, len(index))
+            src.append(a)
+            dst.append(b)
+            weights.append(edge[2] if len(edge) > 2 else 1)
+        labels = None
+        if index is not None:
+            labels = list(index)
+            if labels == list(range(len(labels))):
+                labels = None
+            num_v = len(index)
+        return cls.from_arrays(src, dst, weights, num_v, labels, directed)
+
+    @classmethod
+    def from_adjacency(cls, adj, directed=True, num_v=None, weighted=None):
+        '''
+        adj -> the dict shapes used around the repo:
+            {'A': ['B', 'C'], ...}             BFS/DFS/Topological-Sort (weight 1)
+            {'U': {'V': 2, 'W': 5}, ...}       Dijkstra
+            {0: [(1, 4), (7, 8)], ...}         Prim (defaultdict(list) works too)
+        keys come first in the id order, then neighbors that only appear as targets
+        if num_v is given the nodes are taken to already be ids 0..num_v-1, like
+        the Graph(num_v) classes
+        weighted -> how the entries of a list row are read:
+            True  -> every entry is a (neighbor, weight) pair
+            False -> every entry is a neighbor label (weight 1), tuples included
+            None  -> a (neighbor, weight) pair if it is a 2-tuple with a number
+                     second that isn't itself a node, else a label. so grid cells
+                     {(0, 0): [(0, 1), (1, 0)], ...} stay labels as long as every
+                     cell has a row; pass weighted=False if some don't
+        '''
+        index = {i: i for i in range(num_v)} if num_v is not None else {}
+        for node in adj:
+            index.setdefault(node, len(index))
+        nodes = set(index) if weighted is None else None
+        src, dst, weights = [], [], []
+        for node in list(adj):
+            row = adj[node]
+            if hasattr(row, 'items'):
+                pairs = row.items()
+            elif weighted:
+                pairs = row
+            elif weighted is None:
+                pairs = (n if _is_pair(n, nodes) else (n, 1) for n in row)
+            else:
+                pairs = ((n, 1) for n in row)
+            u = index[node]
+            for neighbor, weight in pairs:
+                src.append(u)
+                dst.append(index.setdefault(neighbor, len(index)))
+                weights.append(weight)
+        labels = list(index)
+        if labels == list(range(len(labels))):
+            labels = None
+        return cls.from_arrays(src, dst, weights, len(index), labels, directed)
+
+    @classmethod
+    def from_matrix(cls, matrix, missing=(0,)):
+        '''
+        matrix -> dense V x V nested lists or ndarray, like Floyd-Warshall's graph or
+        FlowNetwork's capacities. entries in missing (0, INF, ...) are not edges,
+        the diagonal is always skipped
+        '''
+        mat = np.asarray(matrix, dtype=np.float64)
+        mask = ~np.isin(mat, np.asarray(missing, dtype=np.float64))
+        np.fill_diagonal(mask, False)
+        src, dst = np.nonzero(mask) # row-major, so already grouped by source
+        return cls.from_arrays(src, dst, mat[src, dst], mat.shape[0])
+
+    # --------------------------------------------------------------- raw access
+    @property
+    def indptr(self):
+        return self._indptr
+
+    @property
+    def indices(self):
+        return self._indices
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @property
+    def labels(self):
+        return self._labels
+
+    @property
+    def num_v(self):
+        return len(self._indptr) - 1
+
+    @property
+    def num_e(self):
+        return len(self._indices)
+
+    def id_of(self, label):
+        return label if self._index is None else self._index[label]
+
+    def label_of(self, node):
+        return node if self._labels is None else self._labels[node]
+
+    def degree(self, node):
+        return int(self._indptr[node + 1] - self._indptr[node])
+
+    def neighbors(self, node):
+        # read-only view, no copy
+        return self._indices[self._indptr[node]:self._indptr[node + 1]]
+
+    def neighbor_weights(self, node):
+        return self._weights[self._indptr[node]:self._indptr[node + 1]]
+
+    def edge_arrays(self):
+        # columnar edge list: (src, dst, weight), src expanded from indptr
+        src = np.repeat(np.arange(self.num_v, dtype=self._indices.dtype), np.diff(self._indptr))
+        return src, self._indices, self._weights
+
+    def reverse(self):
+        # transpose, ie every edge a -> b becomes b -> a
+        src, dst, weights = self.edge_arrays()
+        return CSRGraph.from_arrays(dst, src, weights, self.num_v, self._labels)
+
+    # on-disk format: one .npy per array (+ labels.pkl if there are labels),
+    # load with mmap_mode='r' maps the arrays instead of reading them, so many
+    # processes can share one copy of a big graph through the page cache
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ('indptr', 'indices', 'weights'):
+            np.save(os.path.join(directory, name + '.npy'), getattr(self, name))
+        if self._labels is not None:
+            with open(os.path.join(directory, 'labels.pkl'), 'wb') as f:
+                pickle.dump(self._labels, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        arrays = [np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode)
+                  for name in ('indptr', 'indices', 'weights')]
+        labels = None
+        if os.path.exists(os.path.join(directory, 'labels.pkl')):
+            with open(os.path.join(directory, 'labels.pkl'), 'rb') as f:
+                labels = pickle.load(f)
+        return cls(*arrays, labels)
+
+    @property
+    def rows(self):
+        return _Rows(self, False)
+
+    @property
+    def weighted_rows(self):
+        return _Rows(self, True)
+
+    # ------------------------------------------ mapping protocol (label -> row)
+    def __len__(self):
+        return self.num_v
+
+    def __iter__(self):
+        return iter(range(self.num_v) if self._labels is None else self._labels)
+
+    def __contains__(self, label):
+        if self._index is None:
+            return isinstance(label, (int, np.integer)) and 0 <= label < self.num_v
+        return label in self._index
+
+    def __getitem__(self, label):
+        return _Row(self, self.id_of(label))
+
+    def __repr__(self):
+        return 'CSRGraph(num_v=%d, num_e=%d)' % (self.num_v, self.num_e)
+
+
+class _Row:
+    '''
+    neighbors of one node in label space, stands in for adj[node] of a dict graph
+    iterating gives neighbor labels, .items() gives (neighbor label, weight)
+    '''
+    __slots__ = ('graph', 'node')
+
+    def __init__(self, graph, node):
+        self.graph = graph
+        self.node = node
+
+    def __len__(self):
+        return self.graph.degree(self.node)
+
+    def __iter__(self):
+        ids = self.graph.neighbors(self.node).tolist()
+        labels = self.graph.labels
+        return iter(ids if labels is None else [labels[i] for i in ids])
+
+    def items(self):
+        return zip(iter(self), self.graph.neighbor_weights(self.node).tolist())
+
+
+class _Rows:
+    '''
+    id-indexed view: rows[u] -> list of neighbor ids (or (id, weight) pairs)
+    stands in for the defaultdict(list) adj of the Graph classes
+    '''
+    __slots__ = ('graph', 'weighted')
+
+    def __init__(self, graph, weighted):
+        self.graph = graph
+        self.weighted = weighted
+
+    def __len__(self):
+        return self.graph.num_v
+
+    def __getitem__(self, node):
+        ids = self.graph.neighbors(node).tolist()
+        if self.weighted:
+            return list(zip(ids, self.graph.neighbor_weights(node).tolist()))
+        return ids
+
+
+# positions (into indices/weights) of every edge out of rows, row after row, and
+# the number of edges of each row (np.repeat(rows, counts) = the row of each
+# position). an arange shifted by each row's start, no python loop. any indptr
+# works, eg the residual arcs grouped by tail in Max-Flow.py
+def row_positions(indptr, rows):
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    shifts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return shifts + np.arange(len(shifts), dtype=np.int64), counts
+
+# (neighbor, weight) entry of a list row, rather than a tuple node label
+def _is_pair(entry, nodes):
+    return (isinstance(entry, tuple) and len(entry) == 2
+            and isinstance(entry[1], (int, float, np.number)) and entry not in nodes)
+
+def _id_dtype(num_v):
+    # int32 halves the memory of indices, only go to int64 when ids need it
+    return np.int32 if num_v < 2**31 else np.int64
+
+
+if __name__ == '__main__':
+    adj = {
+        'U': {'V': 2, 'W': 5, 'X': 1},
+        'V': {'U': 2, 'X': 2, 'W': 3},
+        'W': {'V': 3, 'U': 5, 'X': 3, 'Y': 1, 'Z': 5},
+        'X': {'U': 1, 'V': 2, 'W': 3, 'Y': 1},
+        'Y': {'X': 1, 'W': 1, 'Z': 1},
+        'Z': {'W': 5, 'Y': 1}
+    }
+    g = CSRGraph.from_adjacency(adj)
+    print(g)
+    print(g.indptr, g.indices, g.weights)
+    print(list(g['W'].items()))
+
+    # grid cells as labels, they have to come back as the same cells
+    side = 3
+    grid = {(r, c): [(r + dr, c + dc) for dr, dc in ((0, 1), (1, 0), (0, -1), (-1, 0))
+                     if 0 <= r + dr < side and 0 <= c + dc < side]
+            for r in range(side) for c in range(side)}
+    g = CSRGraph.from_adjacency(grid)
+    assert g.num_v == side * side
+    assert {cell: sorted(g[cell]) for cell in g} == {cell: sorted(row) for cell, row in grid.items()}
+    assert set(g.weights.tolist()) == {1}
+    print(list(g[(1, 1)].items()))
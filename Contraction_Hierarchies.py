@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Contraction Hierarchies (CH):
+speed-up technique for point-to-point shortest paths on road-like graphs.
+pay once for preprocessing, then a query settles far fewer nodes than Dijkstra
+
+measured limits of this pure python version (weighted 4-neighbour grids, 200
+random pairs, against the early-exit Dijkstra of Dijkstra_Lazy.py):
+    V       build    query   settled   Dijkstra
+    2.5k       4s    0.7ms       128      2.7ms
+    10k       24s    2.5ms       287       14ms
+    40k      127s    5.6ms       675       51ms
+the build grows faster than V (dicts per node, a witness search per neighbour
+pair) and the settled count still grows with V on grids (the order is only the
+simple edge difference + contracted neighbours below). sub-millisecond queries
+on country-scale graphs (millions of nodes) are NOT reached here, that needs the
+contraction in compiled code and a better node order
+
+Preprocessing (contraction):
+put the nodes in some order of 'importance' and remove (contract) them one by one,
+least important first. when v is removed, every path u -> v -> w through it
+could get longer, so if u -> v -> w is the ONLY shortest way from u to w, add a
+shortcut edge u -> w with weight d(u,v) + d(v,w) (and remember v as its middle).
+to check, run a small Dijkstra from u that avoids v (witness search); if it
+finds w within d(u,v) + d(v,w), a witness path exists and no shortcut is needed.
+the witness search is bounded (settle_limit nodes), giving up only adds a shortcut
+that isn't strictly necessary, never a wrong one
+node order: edge difference (shortcuts added - edges removed) + number of
+contracted neighbors (spreads contraction out evenly). priorities are updated
+lazily: pop the best node, recompute its priority, contract it only if it is
+still the best, otherwise push it back
+rank[v] = position of v in the contraction order
+
+the augmented graph (original edges + shortcuts) is split in two by rank:
+    up   -> edges u -> w with rank[u] < rank[w], stored in row u
+    down -> edges u -> w with rank[u] > rank[w], stored REVERSED in row w
+both are CSRGraphs (see CSR_Graph.py) plus a middle[] column per edge (-1 for an
+original edge, the contracted node for a shortcut)
+
+Query:
+bidirectional Dijkstra where both sides only go UP in rank: forward from start
+over 'up', backward from end over 'down'. every shortest path in the augmented
+graph goes up then down, so the two searches meet at its highest node.
+mu = best df[x] + db[x] seen so far, a side stops once its PQ top is >= mu
+the path is then unpacked: a shortcut u -> w with middle v becomes u -> v -> w,
+repeated until only original edges are left (explicit stack, no recursion)
+gives the same distances and paths (up to ties) as find_shortest_path in
+Dijkstra_Lazy.py / Dijkstra_Eager.py
+
+On disk: a directory with the two CSRs (CSRGraph.save, .npy files), their middle
+columns and rank. load() memory-maps them, so starting a query service is instant
+"""
+import heapq
+import os
+import numpy as np
+from CSR_Graph import CSRGraph
+
+INF = float('infinity')
+
+class ContractionHierarchy:
+    def __init__(self, up, up_middle, down, down_middle, rank):
+        self.up, self.down = up, down
+        self.up_middle = np.asarray(up_middle)
+        self.down_middle = np.asarray(down_middle)
+        self.rank = np.asarray(rank)
+        self._views = tuple(_views(g, m) for g, m in ((up, self.up_middle), (down, self.down_middle)))
+        self.settled = 0 # nodes settled by the last query
+
+    # ---------------------------------------------------------- preprocessing
+    @classmethod
+    def build(cls, adj, settle_limit=200):
+        g = adj if isinstance(adj, CSRGraph) else CSRGraph.from_adjacency(adj)
+        n = g.num_v
+        # remaining graph as dicts: out[u][w] = (weight, middle), inc mirrors it
+        out = [dict() for _ in range(n)]
+        inc = [dict() for _ in range(n)]
+        src, dst, weights = g.edge_arrays()
+        for u, w, wt in zip(src.tolist(), dst.tolist(), weights.tolist()):
+            if u != w and wt < out[u].get(w, (INF,))[0]: # drop loops, keep cheapest parallel edge
+                out[u][w] = inc[w][u] = (wt, -1)
+
+        deleted = [0] * n
+        def priority(v):
+            shortcuts = len(_shortcuts(out, inc, v, settle_limit))
+            return shortcuts - len(out[v]) - len(inc[v]) + deleted[v]
+
+        pq = [(priority(v), v) for v in range(n)]
+        heapq.heapify(pq)
+        rank = np.zeros(n, dtype=np.int64)
+        up_edges, down_edges = [], [] # (row, col, weight, middle)
+        order = 0
+        while pq:
+            _, v = heapq.heappop(pq)
+            p = priority(v) # lazy update
+            if pq and p > pq[0][0]:
+                heapq.heappush(pq, (p, v))
+                continue
+            rank[v] = order
+            order += 1
+            # every neighbor still around is contracted later, ie ranks higher
+            for w, (wt, mid) in out[v].items():
+                up_edges.append((v, w, wt, mid))
+            for u, (wt, mid) in inc[v].items():
+                down_edges.append((v, u, wt, mid))
+            for u, w, wt in _shortcuts(out, inc, v, settle_limit):
+                if wt < out[u].get(w, (INF,))[0]:
+                    out[u][w] = inc[w][u] = (wt, v)
+            for w in out[v]:
+                del inc[w][v]
+                deleted[w] += 1
+            for u in inc[v]:
+                del out[u][v]
+                deleted[u] += 1
+            out[v], inc[v] = {}, {}
+
+        up, up_middle = _csr_with_middle(up_edges, n, g.labels)
+        down, down_middle = _csr_with_middle(down_edges, n, g.labels)
+        return cls(up, up_middle, down, down_middle, rank)
+
+    # ---------------------------------------------------------------- on disk
+    def save(self, directory):
+        self.up.save(os.path.join(directory, 'up'))
+        self.down.save(os.path.join(directory, 'down'))
+        np.save(os.path.join(directory, 'up_middle.npy'), self.up_middle)
+        np.save(os.path.join(directory, 'down_middle.npy'), self.down_middle)
+        np.save(os.path.join(directory, 'rank.npy'), self.rank)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        def arr(name):
+            return np.load(os.path.join(directory, name + '.npy'), mmap_mode=mmap_mode)
+        return cls(CSRGraph.load(os.path.join(directory, 'up'), mmap_mode), arr('up_middle'),
+                   CSRGraph.load(os.path.join(directory, 'down'), mmap_mode), arr('down_middle'),
+                   arr('rank'))
+
+    # ------------------------------------------------------------------ query
+    # (distance, path) between two labels, (inf, []) if end can't be reached
+    def query(self, start_node, end_node):
+        s, t = self.up.id_of(start_node), self.up.id_of(end_node)
+        dist = ({s: 0}, {t: 0})
+        prev = ({s: -1}, {t: -1})
+        pq = ([(0, s)], [(0, t)])
+        done = (set(), set())
+        mu, meet = (0, s) if s == t else (INF, -1)
+        self.settled = 0
+        while pq[0] or pq[1]:
+            # advance the side with the smaller PQ top, a side is finished once its top >= mu
+            tops = [q[0][0] if q and q[0][0] < mu else INF for q in pq]
+            if tops[0] == tops[1] == INF:
+                break
+            side = 0 if tops[0] <= tops[1] else 1
+            d, u = heapq.heappop(pq[side])
+            if u in done[side] or d > dist[side][u]:
+                continue
+            done[side].add(u)
+            self.settled += 1
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < mu:
+                mu, meet = d + other, u
+            indptr, indices, weights, _ = self._views[side]
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                nd = d + weights[i]
+                if nd < dist[side].get(v, INF):
+                    dist[side][v] = nd
+                    prev[side][v] = u
+                    heapq.heappush(pq[side], (nd, v))
+        if meet == -1:
+            return INF, []
+        # start .. meet along forward prev, meet .. end along backward prev
+        nodes = []
+        v = meet
+        while v != -1:
+            nodes.append(v)
+            v = prev[0][v]
+        nodes.reverse()
+        v = prev[1][meet]
+        while v != -1:
+            nodes.append(v)
+            v = prev[1][v]
+        path = [nodes[0]]
+        for a, b in zip(nodes, nodes[1:]):
+            path.extend(self._unpack(a, b))
+        return mu, [self.up.label_of(v) for v in path]
+
+    # same interface as Dijkstra_Lazy/Dijkstra_Eager
+    def find_shortest_path(self, start_node, end_node):
+        return self.query(start_node, end_node)[1]
+
+    # original nodes after a on the edge a -> b (b included), shortcuts expanded
+    def _unpack(self, a, b):
+        nodes = []
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            mid = self._middle(a, b)
+            if mid == -1:
+                nodes.append(b)
+            else:
+                stack.append((mid, b)) # a -> mid comes first, so it is pushed last
+                stack.append((a, mid))
+        return nodes
+
+    def _middle(self, a, b):
+        # a -> b lives in up row a if a ranks lower, otherwise in down row b
+        side, row, col = (0, a, b) if self.rank[a] < self.rank[b] else (1, b, a)
+        indptr, indices, weights, middle = self._views[side]
+        best, best_mid = INF, -1
+        for i in range(indptr[row], indptr[row + 1]):
+            if indices[i] == col and weights[i] < best:
+                best, best_mid = weights[i], middle[i]
+        return best_mid
+
+
+# shortcuts needed when v is contracted: [(u, w, weight)]
+def _shortcuts(out, inc, v, settle_limit):
+    shortcuts = []
+    for u, (wu, _) in inc[v].items():
+        targets = {w: wu + wv for w, (wv, _) in out[v].items() if w != u}
+        if not targets:
+            continue
+        witness = _witness_search(out, u, v, targets, max(targets.values()), settle_limit)
+        for w, via_v in targets.items():
+            if witness.get(w, INF) > via_v:
+                shortcuts.append((u, w, via_v))
+    return shortcuts
+
+# bounded Dijkstra from u in the remaining graph, skipping v
+def _witness_search(out, u, v, targets, limit, settle_limit):
+    dist = {u: 0}
+    pq = [(0, u)]
+    remaining = len(targets)
+    settled = 0
+    while pq and settled < settle_limit:
+        d, x = heapq.heappop(pq)
+        if d > dist[x]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        if x in targets:
+            remaining -= 1
+            if not remaining:
+                break
+        for y, (wt, _) in out[x].items():
+            if y == v:
+                continue
+            nd = d + wt
+            if nd < dist.get(y, INF):
+                dist[y] = nd
+                heapq.heappush(pq, (nd, y))
+    return dist
+
+def _csr_with_middle(edges, n, labels):
+    edges.sort(key=lambda e: e[0]) # stable, rows in order
+    rows = np.array([e[0] for e in edges], dtype=np.int64)
+    cols = np.array([e[1] for e in edges], dtype=np.int64)
+    weights = np.array([e[2] for e in edges], dtype=np.float64)
+    middle = np.array([e[3] for e in edges], dtype=np.int64)
+    return CSRGraph.from_arrays(rows, cols, weights, n, labels), middle
+
+def _views(g, middle):
+    return memoryview(g.indptr), memoryview(g.indices), memoryview(g.weights), memoryview(np.ascontiguousarray(middle))
+
+
+if __name__ == '__main__':
+    adj = {
+        'U': {'V': 2, 'W': 5, 'X': 1},
+        'V': {'U': 2, 'X': 2, 'W': 3},
+        'W': {'V': 3, 'U': 5, 'X': 3, 'Y': 1, 'Z': 5},
+        'X': {'U': 1, 'V': 2, 'W': 3, 'Y': 1},
+        'Y': {'X': 1, 'W': 1, 'Z': 1},
+        'Z': {'W': 5, 'Y': 1}
+    }
+    ch = ContractionHierarchy.build(adj)
+    print(ch.query('U', 'Z'))
+    print(ch.find_shortest_path('Z', 'V'))
@@ -28,25 +28,30 @@ topologically sort nodes
 find bridges and/or articulation points
 find augmenting paths in a flow network
 generate mazes
+
+adj can be any adjacency mapping, including a CSRGraph (see CSR_Graph.py)
+both classes run on the iterative engine in DFS_Iterative.py, so deep/path-like
+graphs don't hit the recursion limit
+for components of an edge stream that doesn't fit in memory, see Union_Find.py
 """
+from DFS_Iterative import IterativeDFS
 
 
 class DepthFirstSearchDIRECTED():
     def __init__(self, adj):
-        self.adj = adj #adjacency LIST of graph
-        self.visited = set() #visited vertices
+        self.engine = IterativeDFS(adj) #adjacency LIST of graph, or a CSRGraph
+        self.graph = self.engine.graph
+    #returns the nodes reached from node, in the order visited
+    #nodes visited by earlier calls are not visited again
     def dfs(self, node):
-        if node not in self.visited:
-            print(node)
-            self.visited.add(node)
-            for neighbor in self.adj[node]:
-                self.dfs(neighbor)
+        start = self.engine.visited_count
+        self.engine.run([self.graph.id_of(node)])
+        return [self.graph.label_of(v) for v in self.engine.preorder[start:self.engine.visited_count]]
 
 class DepthFirstSearchUNDIRECTED():
     def __init__(self, adj):
-        self.adj = adj #adjacency LIST of graph
-        self.visited = set() #visited vertices
-        self.component = []
+        self.engine = IterativeDFS(adj) #adjacency LIST of graph, or a CSRGraph
+        self.graph = self.engine.graph
         self.cc = []
         self.count = 0
     
@@ -55,23 +60,13 @@ class DepthFirstSearchUNDIRECTED():
     #do this by labeling each cc as a a different int
     #for all nodes in graph, do dfs.
     #go through all nodes in adj
+    #each dfs tree of the engine is one component
     def find_cc(self):
-          for node in self.adj:
-              #print('node' + node)
-              if node not in self.visited:
-                  self.component = []
-                  self.count += 1
-                  self.cc.append(self.dfs(node))
-          return self.count, self.cc    
-                  
-    def dfs(self, node):
-        self.visited.add(node)
-        self.component.append(node)
-        for neighbor in self.adj[node]:
-            if neighbor not in self.visited:
-                self.visited.add(neighbor)
-                self.dfs(neighbor) 
-        return self.component
+        self.engine.reset()
+        self.engine.run()
+        self.cc = [[self.graph.label_of(v) for v in tree] for tree in self.engine.trees()]
+        self.count = len(self.cc)
+        return self.count, self.cc
 '''
 graph:
     A
@@ -89,7 +84,7 @@ adj = {
 }
 
 #depth_first_search = DepthFirstSearchDIRECTED(adj)
-#depth_first_search.dfs('A')
+#print(depth_first_search.dfs('A'))
 
 dfsU = DepthFirstSearchUNDIRECTED(adj) #automatically starts at A since it is first in node set
 count, cc = dfsU.find_cc()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Iterative DFS engine, shared by DFS, Tarjan's SCC, bridges/articulation points,
+topological sort and the Eulerian connectivity check
+
+motivation:
+the recursive versions use one python frame per node on the current path, so a
+path-like graph with more than ~1000 nodes hits RecursionError, and raising the
+limit just moves the crash into the C stack
+
+how it works:
+the call stack is replaced with an explicit stack of node ids in a preallocated
+array. instead of a frame remembering 'which neighbor am I on', every node keeps
+a pointer into its CSR row (pos[node]). each step looks at the top node:
+    if it has edges left, take the next one and maybe push the neighbor (pre-visit)
+    otherwise pop it (post-visit, this is the 'recursive callback')
+a node is on the stack at most once, so the stack never needs more than V slots
+
+colors: WHITE = not seen, GRAY = on the stack, BLACK = finished
+edge classification (directed):
+    TREE    -> to a WHITE node, it becomes a child
+    BACK    -> to a GRAY node, ie an ancestor (cycle!)
+    FORWARD -> to a BLACK descendant (discovered after us)
+    CROSS   -> to a BLACK node in another branch/tree (discovered before us)
+undirected mode: every edge is stored twice, so the edge back to the tree parent
+is skipped once, and an edge to a BLACK node is the other side of a back edge
+that was already reported, so it is skipped as well. only TREE and BACK remain
+
+hooks (all optional, all get dense ids):
+    pre(node)              when node is discovered
+    post(node, parent)     when node is finished, parent -1 for roots
+    edge(u, v, kind)       for every non-tree edge and every tree edge
+state after run(): disc/finish times, parent, preorder and postorder arrays
+"""
+from array import array
+import numpy as np
+from CSR_Graph import CSRGraph
+
+WHITE, GRAY, BLACK = 0, 1, 2
+TREE, BACK, FORWARD, CROSS = 0, 1, 2, 3
+
+class IterativeDFS:
+    def __init__(self, graph, undirected=False):
+        self.graph = graph if isinstance(graph, CSRGraph) else CSRGraph.from_adjacency(graph)
+        self.undirected = undirected
+        self.reset()
+
+    def reset(self):
+        n = self.graph.num_v
+        self.color = bytearray(n)
+        self.disc = array('q', [-1]) * n
+        self.finish = array('q', [-1]) * n
+        self.parent = array('q', [-1]) * n
+        self.preorder = array('q', [0]) * n # first visited_count entries are used
+        self.postorder = array('q', [0]) * n # first finished_count entries are used
+        self.visited_count = 0
+        self.finished_count = 0
+        self.time = 0
+        self._pos = array('q', [0]) * n
+        self._stack = array('q', [0]) * n
+        self._skipped_parent = bytearray(n) if self.undirected else None
+
+    # roots -> ids to start from in order (already visited ones are skipped),
+    # None means every node. state carries over between runs until reset()
+    def run(self, roots=None, pre=None, post=None, edge=None):
+        indptr = memoryview(self.graph.indptr)
+        indices = memoryview(self.graph.indices)
+        color, disc, finish, parent = self.color, self.disc, self.finish, self.parent
+        preorder, postorder = self.preorder, self.postorder
+        pos, stack, skipped = self._pos, self._stack, self._skipped_parent
+        undirected = self.undirected
+        t, visited, finished = self.time, self.visited_count, self.finished_count
+        if roots is None:
+            roots = range(self.graph.num_v)
+
+        for root in roots:
+            if color[root]:
+                continue
+            color[root] = GRAY
+            disc[root] = t
+            t += 1
+            preorder[visited] = root
+            visited += 1
+            parent[root] = -1
+            pos[root] = indptr[root]
+            stack[0] = root
+            top = 0
+            if pre is not None:
+                pre(root)
+
+            while top >= 0:
+                u = stack[top]
+                p = pos[u]
+                if p < indptr[u + 1]:
+                    pos[u] = p + 1
+                    v = indices[p]
+                    c = color[v]
+                    if c == WHITE:
+                        if edge is not None:
+                            edge(u, v, TREE)
+                        color[v] = GRAY
+                        disc[v] = t
+                        t += 1
+                        preorder[visited] = v
+                        visited += 1
+                        parent[v] = u
+                        pos[v] = indptr[v]
+                        top += 1
+                        stack[top] = v
+                        if pre is not None:
+                            pre(v)
+                    elif undirected:
+                        if c == GRAY:
+                            if v == parent[u] and not skipped[u]:
+                                skipped[u] = 1 # the tree edge seen from below
+                            elif edge is not None:
+                                edge(u, v, BACK)
+                    elif edge is not None:
+                        if c == GRAY:
+                            edge(u, v, BACK)
+                        elif disc[u] < disc[v]:
+                            edge(u, v, FORWARD)
+                        else:
+                            edge(u, v, CROSS)
+                else:
+                    # out of edges: the 'return' of the recursive version
+                    color[u] = BLACK
+                    finish[u] = t
+                    t += 1
+                    postorder[finished] = u
+                    finished += 1
+                    top -= 1
+                    if post is not None:
+                        post(u, parent[u])
+
+        self.time, self.visited_count, self.finished_count = t, visited, finished
+        return self
+
+    # trees of the last runs as lists of ids, split where preorder hits a root
+    def trees(self):
+        pre = np.frombuffer(self.preorder, dtype=np.int64)[:self.visited_count]
+        starts = np.flatnonzero(np.frombuffer(self.parent, dtype=np.int64)[pre] == -1)
+        return [chunk.tolist() for chunk in np.split(pre, starts[1:])]
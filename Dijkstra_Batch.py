@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Batch shortest paths: many sources at once instead of one calculate_distances
+call per source
+
+distance_matrix(adj, sources, targets):
+many-to-many distances as one numpy matrix, row i = sources[i], column j =
+targets[j] (or every node if targets is None). every row is an independent
+Dijkstra, so rows are spread over a ProcessPoolExecutor.
+sharing the graph: the CSR arrays are written once to .npy files and every worker
+memory-maps them (np.load(mmap_mode='r')), so the OS shares one copy through the
+page cache instead of pickling the graph into every task. the result matrix is a
+memory-mapped .npy as well, workers write their rows straight into it and the
+tasks themselves only carry a few source ids.
+with targets given, a row stops as soon as all of its targets are settled
+pass out='file.npy' to keep the matrix on disk (rows x cols can be bigger than RAM)
+predecessors=True also returns prev[i][j], the node before targets[j] on the path
+from sources[i] (-1 = none), streamed to its own memory-mapped .npy (prev_out)
+
+nearest_facility(adj, facilities):
+multi-source Dijkstra, aka a virtual super-source connected to every facility
+with weight 0. one run gives every node its distance to the closest facility
+and which facility that is (owner), ie nearest-facility assignment / a Voronoi
+partition of the graph in a single pass
+"""
+import heapq
+import os
+import shutil
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from CSR_Graph import CSRGraph
+
+INF = float('infinity')
+
+# Dijkstra from several sources at once (all at distance 0) on dense ids
+# targets -> optional ids, stop once all of them are settled
+# returns dist (inf = unreachable), prev (-1 = none), owner (index into sources, -1 = none)
+def multi_source_arrays(g, sources, targets=None):
+    indptr = memoryview(g.indptr)
+    indices = memoryview(g.indices)
+    weights = memoryview(g.weights)
+    dist = array('d', [INF]) * g.num_v
+    prev = array('q', [-1]) * g.num_v
+    owner = array('q', [-1]) * g.num_v
+    pending = None
+    if targets is not None:
+        pending = bytearray(g.num_v)
+        for t in targets:
+            pending[t] = 1
+        remaining = sum(pending)
+    pq = []
+    for i, s in enumerate(sources):
+        if dist[s] > 0:
+            dist[s] = 0
+            owner[s] = i
+            pq.append((0.0, i, s))
+    heapq.heapify(pq)
+    tiebreak = len(pq)
+    while pq:
+        d, _, u = heapq.heappop(pq)
+        if d > dist[u]: # outdated pair
+            continue
+        if pending is not None and pending[u]:
+            pending[u] = 0
+            remaining -= 1
+            if not remaining:
+                break
+        o = owner[u]
+        for i in range(indptr[u], indptr[u + 1]):
+            v = indices[i]
+            nd = d + weights[i]
+            if nd < dist[v]:
+                dist[v] = nd
+                prev[v] = u
+                owner[v] = o
+                tiebreak += 1
+                heapq.heappush(pq, (nd, tiebreak, v))
+    return (np.frombuffer(dist, dtype=np.float64), np.frombuffer(prev, dtype=np.int64),
+            np.frombuffer(owner, dtype=np.int64))
+
+def nearest_facility(adj, facilities):
+    '''
+    facilities -> node labels
+    returns (dist, owner) arrays over the graph's dense ids:
+        dist[v]  -> distance from v's closest facility
+        owner[v] -> index into facilities of that facility (-1 = unreachable)
+    (for an undirected/symmetric graph that is also the distance TO the facility,
+     for a directed one pass adj.reverse() to get distances towards the facilities)
+    '''
+    g = adj if isinstance(adj, CSRGraph) else CSRGraph.from_adjacency(adj)
+    dist, _, owner = multi_source_arrays(g, [g.id_of(f) for f in facilities])
+    return dist, owner
+
+def distance_matrix(adj, sources, targets=None, workers=None, dtype=np.float64, out=None,
+                    predecessors=False, prev_out=None):
+    '''
+    sources, targets -> node labels (targets None = all nodes, in id order)
+    workers -> number of processes, None = os.cpu_count(), 1 = run in this process
+    out -> path of a .npy file to keep the result in (returned memory-mapped),
+           None = returned as an in-memory array
+    predecessors -> also return the prev matrix (dense ids), ie (matrix, prev)
+    prev_out -> like out, for the prev matrix
+    '''
+    g = adj if isinstance(adj, CSRGraph) else CSRGraph.from_adjacency(adj)
+    src = [g.id_of(s) for s in sources]
+    tgt = None if targets is None else np.array([g.id_of(t) for t in targets], dtype=np.int64)
+    shape = (len(src), g.num_v if tgt is None else len(tgt))
+    workers = workers or os.cpu_count() or 1
+
+    tmp = tempfile.mkdtemp(prefix='dijkstra_batch_')
+    try:
+        path = out if out is not None else os.path.join(tmp, 'matrix.npy')
+        matrix = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        prev = prev_path = None
+        if predecessors:
+            prev_path = prev_out if prev_out is not None else os.path.join(tmp, 'prev.npy')
+            prev = np.lib.format.open_memmap(prev_path, mode='w+', dtype=g.indices.dtype, shape=shape)
+        if workers == 1 or len(src) < 2:
+            _fill_rows(g, matrix, prev, tgt, list(enumerate(src)))
+        else:
+            graph_dir = os.path.join(tmp, 'graph')
+            g.save(graph_dir)
+            targets_path = None
+            if tgt is not None:
+                targets_path = os.path.join(tmp, 'targets.npy')
+                np.save(targets_path, tgt)
+            matrix.flush()
+            if prev is not None:
+                prev.flush()
+            rows = list(enumerate(src))
+            size = max(1, len(rows) // (workers * 4)) # a few chunks per worker for balance
+            chunks = [rows[i:i + size] for i in range(0, len(rows), size)]
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(graph_dir, path, targets_path, prev_path)) as pool:
+                for _ in pool.map(_worker_rows, chunks):
+                    pass
+        results = [_result(matrix, out)]
+        if prev is not None:
+            results.append(_result(prev, prev_out))
+        del matrix, prev
+        return results[0] if len(results) == 1 else tuple(results)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+# memory-mapped if it has a file of its own, otherwise read in before the temp dir goes away
+def _result(matrix, out):
+    if out is not None:
+        matrix.flush()
+        return matrix
+    return np.array(matrix)
+
+def _fill_rows(g, matrix, prev, targets, rows):
+    for row, s in rows:
+        dist, p, _ = multi_source_arrays(g, [s], None if targets is None else targets.tolist())
+        matrix[row] = dist if targets is None else dist[targets]
+        if prev is not None:
+            prev[row] = p if targets is None else p[targets]
+
+# worker process state: the memory-mapped graph, result matrices and targets
+_worker = {}
+
+def _init_worker(graph_dir, matrix_path, targets_path, prev_path=None):
+    _worker['graph'] = CSRGraph.load(graph_dir, mmap_mode='r')
+    _worker['matrix'] = np.load(matrix_path, mmap_mode='r+')
+    _worker['prev'] = None if prev_path is None else np.load(prev_path, mmap_mode='r+')
+    _worker['targets'] = None if targets_path is None else np.load(targets_path)
+
+def _worker_rows(rows):
+    _fill_rows(_worker['graph'], _worker['matrix'], _worker['prev'], _worker['targets'], rows)
+    _worker['matrix'].flush()
+    if _worker['prev'] is not None:
+        _worker['prev'].flush()
+    return len(rows)
+
+
+if __name__ == '__main__':
+    adj = {
+        'U': {'V': 2, 'W': 5, 'X': 1},
+        'V': {'U': 2, 'X': 2, 'W': 3},
+        'W': {'V': 3, 'U': 5, 'X': 3, 'Y': 1, 'Z': 5},
+        'X': {'U': 1, 'V': 2, 'W': 3, 'Y': 1},
+        'Y': {'X': 1, 'W': 1, 'Z': 1},
+        'Z': {'W': 5, 'Y': 1}
+    }
+    print(distance_matrix(adj, ['U', 'W', 'Z'], workers=2))
+    print(distance_matrix(adj, ['U', 'W', 'Z'], ['V', 'Y'], workers=1))
+    dist, owner = nearest_facility(adj, ['U', 'Z'])
+    print(dist, owner)
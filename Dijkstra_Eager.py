@@ -13,39 +13,92 @@ in our PQ. The eager version of Dijkstra's avoids duplicates and supports effici
 in O(log(n)) by using an Indexed Priority Queue
 
 Dijkstra's with heaped IPQ: O((E+V)log(V))
-[PQDict is heaped]
+[IndexedDaryHeap from Indexed_Priority_Queue.py, a d-ary heap over dense ids
+ backed by flat arrays, d-ary makes the many decrease_keys cheaper: O(log_d(V))]
+
+adj can also be a CSRGraph (see CSR_Graph.py) or a Dijkstra_Lazy.Graph, which
+keeps its CSRGraph between queries, same as the lazy version
+end_node stops the search once it is popped, same as the lazy version
+
+relaxing: on dense graphs rows are long, so the edges of a row are relaxed with
+one numpy comparison and only the neighbors that actually improve touch the IPQ.
+short rows use a plain loop, numpy's per-call overhead isn't worth it there
+on sparse graphs (few edges per node) the lazy version's heapq is implemented in
+C and wins, use this one for dense graphs (see benchmark_eager_vs_lazy)
 """
-from pqdict import PQDict
-
-def calculate_distance(adj, node):
-    dist = {node: float('infinity') for node in adj}
-    dist[node] = 0 # distance from starting node to itself is 0
-    prev = {node: None for node in adj}
-    ipq = PQDict()
-    ipq.additem(node, 0)
-    
-    while len(ipq) != 0:
-        current_node, current_dist = ipq.popitem()
-        try: #weird glitch, this fixes it though
-            if dist[current_node] < current_dist:
-                continue
-        except: return dist, prev
-        for neighbor, weight in adj[current_node].items():
-            distance = current_dist + weight
-            if distance < dist[neighbor]:
+from array import array
+import numpy as np
+from CSR_Graph import CSRGraph
+from Dijkstra_Lazy import Graph, as_csr, dijkstra_arrays
+from Indexed_Priority_Queue import IndexedDaryHeap
+
+def calculate_distance(adj, node, end_node=None):
+    g = as_csr(adj)
+    end = -1 if end_node is None else g.id_of(end_node)
+    dist, prev = eager_arrays(g, g.id_of(node), end)
+    labels = list(g)
+    return (dict(zip(labels, dist.tolist())),
+            {labels[i]: (None if p == -1 else labels[p]) for i, p in enumerate(prev.tolist())})
+
+# rows at least this long are relaxed with numpy
+VECTOR_ROW = 32
+
+# core on dense ids: dist (inf = unreachable), prev (-1 = none)
+def eager_arrays(g, source, end=-1, d=4):
+    n = g.num_v
+    dist = array('d', [float('infinity')]) * n
+    prev = array('q', [-1]) * n
+    dist_np = np.frombuffer(dist, dtype=np.float64) # same memory as dist
+    indptr = memoryview(g.indptr)
+    indices, weights = g.indices, g.weights
+    indices_v, weights_v = memoryview(indices), memoryview(weights)
+    ipq = IndexedDaryHeap(n, d)
+    dist[source] = 0 # distance from starting node to itself is 0
+    ipq.push(source, 0.0)
+
+    while len(ipq):
+        # every node is in the IPQ at most once, so what we pop is always current
+        # (no outdated pairs to skip, that is the point of the eager version)
+        current_node, current_dist = ipq.pop_min()
+        if current_node == end:
+            break
+        a, b = indptr[current_node], indptr[current_node + 1]
+        if b - a >= VECTOR_ROW:
+            neighbors = indices[a:b]
+            distances = current_dist + weights[a:b]
+            better = distances < dist_np[neighbors]
+            pairs = zip(neighbors[better].tolist(), distances[better].tolist())
+        else:
+            pairs = ((indices_v[i], current_dist + weights_v[i]) for i in range(a, b))
+        for neighbor, distance in pairs:
+            if distance < dist[neighbor]: # parallel edges can repeat a neighbor
                 prev[neighbor] = current_node
                 dist[neighbor] = distance
-                if neighbor in ipq: #this is the main difference between lazy and eager
-                    ipq.replace_key(neighbor, distance)
-                else:
-                    ipq.additem(neighbor, distance)
+                ipq.push_or_decrease(neighbor, distance) #this is the main difference between lazy and eager
+
+    return dist_np, np.frombuffer(prev, dtype=np.int64)
 
-    return dist, prev
+
+# eager (IPQ) vs lazy (heapq with duplicate pairs) on a random dense graph
+def benchmark_eager_vs_lazy(num_v=2000, density=0.5, seed=0):
+    import time
+    rng = np.random.default_rng(seed)
+    src, dst = np.nonzero(rng.random((num_v, num_v)) < density)
+    g = CSRGraph.from_arrays(src, dst, rng.random(len(src)) * 100, num_v)
+    t = time.perf_counter()
+    lazy, _ = dijkstra_arrays(g, 0)
+    t_lazy = time.perf_counter() - t
+    t = time.perf_counter()
+    eager, _ = eager_arrays(g, 0)
+    t_eager = time.perf_counter() - t
+    assert np.allclose(lazy, eager)
+    print("V=%d E=%d  lazy heapq: %.3fs  eager IPQ: %.3fs  (%.1fx)"
+          % (num_v, g.num_e, t_lazy, t_eager, t_lazy / t_eager))
 
 
 #same as lazy
 def find_shortest_path(adj, start_node, end_node):
-    dist, prev = calculate_distance(adj, start_node)
+    dist, prev = calculate_distance(adj, start_node, end_node)
     path = []
     #base case
     if dist[end_node] == float('infinity'): #means not connected to start_node
@@ -69,14 +122,19 @@ def return_path(prev, path, start_node, end_node):
         return_path(prev, path, end_node, prev[end_node])
         
 
-adj = {
-    'U': {'V': 2, 'W': 5, 'X': 1},
-    'V': {'U': 2, 'X': 2, 'W': 3},
-    'W': {'V': 3, 'U': 5, 'X': 3, 'Y': 1, 'Z': 5},
-    'X': {'U': 1, 'V': 2, 'W': 3, 'Y': 1},
-    'Y': {'X': 1, 'W': 1, 'Z': 1},
-    'Z': {'W': 5, 'Y': 1},
-    'A': {}
-}
-#U to Z is 0 to 5
-print(find_shortest_path(adj, 'U', 'Z'))
\ No newline at end of file
+if __name__ == '__main__':
+    adj = {
+        'U': {'V': 2, 'W': 5, 'X': 1},
+        'V': {'U': 2, 'X': 2, 'W': 3},
+        'W': {'V': 3, 'U': 5, 'X': 3, 'Y': 1, 'Z': 5},
+        'X': {'U': 1, 'V': 2, 'W': 3, 'Y': 1},
+        'Y': {'X': 1, 'W': 1, 'Z': 1},
+        'Z': {'W': 5, 'Y': 1},
+        'A': {}
+    }
+    #U to Z is 0 to 5
+    print(find_shortest_path(adj, 'U', 'Z'))
+    graph = Graph(adj)
+    print(find_shortest_path(graph, 'U', 'Z'), find_shortest_path(graph, 'U', 'V'))
+
+    benchmark_eager_vs_lazy(500, 0.5)
@@ -25,44 +25,156 @@ this implementation of Dijkstra is called lazy because we lazily delete key valu
 if a better path is present (ie the pair isn't on optimal path)
 
 notice, only returns distances, not path
+
+adj can also be a CSRGraph (see CSR_Graph.py): iterating it gives the nodes and
+adj[node].items() gives (neighbor, weight) just like the dict of dicts
+a plain dict is converted to a CSRGraph on every call, O(V + E). for repeated
+queries wrap it in a Graph, which keeps the CSRGraph until the next add_edge
+
+end_node: once end_node is popped its distance is final, so the search stops
+there instead of settling the whole graph (dist/prev are only final for nodes
+closer than end_node). for bidirectional and A* queries see Dijkstra_Query.py
+
+Implementation notes:
+the PQ holds (distance, tiebreak, node id) tuples. heapq compares tuples left to
+right, so distance MUST come first, otherwise nodes are popped by label and get
+settled out of order (and re-expanded, or even end up wrong). the tiebreak is an
+insertion counter so equal distances never fall through to comparing nodes.
+nodes are dense int ids of a CSRGraph (a dict adj is converted once), dist/prev
+are flat arrays instead of dicts
+
+Dial's algorithm (dial_distances):
+for small non-negative INTEGER weights (eg road speeds/minutes) the PQ can be
+replaced by buckets, bucket[d] holds the nodes with tentative distance d.
+scan the buckets in increasing d, every node found there is settled.
+a relaxation only ever lands in [d, d + C] where C is the max edge weight, so
+C + 1 buckets used circularly (bucket d % (C+1)) are enough.
+push and pop are O(1), total O(E + V + max distance) instead of O(E*log(V))
 """
 
 import heapq
+from array import array
+import numpy as np
+from CSR_Graph import CSRGraph
+
+class Graph:
+    def __init__(self, adj=None):
+        self.adj = {} if adj is None else adj # dict of dicts, like adj below
+        self.csr = None
+
+    def add_edge(self, a, b, weight):
+        self.adj.setdefault(a, {})[b] = weight
+        self.csr = None
+
+    def _csr(self):
+        if self.csr is None:
+            self.csr = CSRGraph.from_adjacency(self.adj)
+        return self.csr
+
+# the CSRGraph behind any adj the functions here take: a CSRGraph as is, a
+# Graph's cached one, a dict converted from scratch
+def as_csr(adj):
+    if isinstance(adj, CSRGraph):
+        return adj
+    if isinstance(adj, Graph):
+        return adj._csr()
+    return CSRGraph.from_adjacency(adj)
+
 # aka djikstras
-def calculate_distances(adj, node): # OPTIMIZATION: stop early by inputting end_node here**
-    dist = {node: float('infinity') for node in adj}
-    dist[node] = 0 # distance from starting node to itself is 0
-    prev = {node: None for node in adj}
-    pq = [(node, 0)]
-    while len(pq) > 0:
-        current_node, current_dist = heapq.heappop(pq)
+def calculate_distances(adj, node, end_node=None):
+    g = as_csr(adj)
+    end = -1 if end_node is None else g.id_of(end_node)
+    dist, prev = dijkstra_arrays(g, g.id_of(node), end)
+    return _as_dicts(g, dist, prev)
+
+# same as calculate_distances with buckets instead of a heap, weights must be
+# non-negative integers
+def dial_distances(adj, node, end_node=None):
+    g = as_csr(adj)
+    end = -1 if end_node is None else g.id_of(end_node)
+    dist, prev = dial_arrays(g, g.id_of(node), end)
+    return _as_dicts(g, dist, prev)
+
+# core on dense ids: dist (float array, inf = unreachable) and prev (-1 = none)
+def dijkstra_arrays(g, source, end=-1):
+    indptr = memoryview(g.indptr)
+    indices = memoryview(g.indices)
+    weights = memoryview(g.weights)
+    dist = array('d', [float('infinity')]) * g.num_v
+    prev = array('q', [-1]) * g.num_v
+    dist[source] = 0 # distance from starting node to itself is 0
+    tiebreak = 0
+    pq = [(0.0, tiebreak, source)]
+    while pq:
+        current_dist, _, current_node = heapq.heappop(pq)
         # Nodes can get added to the priority queue multiple times. I only
         # process a vertex the first time we remove it from the priority queue.
         if current_dist > dist[current_node]: #neat optimization that ignores 'outdated' nodes
-            continue        
-        for neighbor, weight in adj[current_node].items():
-            distance = current_dist + weight
+            continue
+        if current_node == end: # settled, so dist[end] can't improve
+            break
+        for i in range(indptr[current_node], indptr[current_node + 1]):
+            neighbor = indices[i]
+            distance = current_dist + weights[i]
             # Only consider new path if it's better than one already known (default pos. infinity)
             if distance < dist[neighbor]:
                 prev[neighbor] = current_node # index taken to get to neighbor***
                 dist[neighbor] = distance
-                heapq.heappush(pq, (neighbor, distance))
-        # if neighbor == end_node: return dist[e] ** to end distance early, works usually
-    return dist, prev
+                tiebreak += 1
+                heapq.heappush(pq, (distance, tiebreak, neighbor))
+    return np.frombuffer(dist, dtype=np.float64), np.frombuffer(prev, dtype=np.int64)
     # *** only space for one though, which is fine since you can see shortest path to get to index
     # and so on and so forth
 
-adj = {
-    'U': {'V': 2, 'W': 5, 'X': 1},
-    'V': {'U': 2, 'X': 2, 'W': 3},
-    'W': {'V': 3, 'U': 5, 'X': 3, 'Y': 1, 'Z': 5},
-    'X': {'U': 1, 'V': 2, 'W': 3, 'Y': 1},
-    'Y': {'X': 1, 'W': 1, 'Z': 1},
-    'Z': {'W': 5, 'Y': 1}
-}
+def dial_arrays(g, source, end=-1):
+    w = g.weights
+    if len(w) and (w.min() < 0 or (w != np.floor(w)).any()):
+        raise ValueError("Dial's algorithm needs non-negative integer weights")
+    int_weights = w.astype(np.int64)
+    indptr = memoryview(g.indptr)
+    indices = memoryview(g.indices)
+    weights = memoryview(int_weights)
+    nb = (int(int_weights.max()) if len(w) else 0) + 1 # C + 1 buckets
+    unreached = 2**62
+    dist = array('q', [unreached]) * g.num_v
+    prev = array('q', [-1]) * g.num_v
+    buckets = [[] for _ in range(nb)]
+    dist[source] = 0
+    buckets[0].append(source)
+    pending = 1 # entries in all buckets, outdated ones included
+    d = 0
+    while pending:
+        bucket = buckets[d % nb]
+        while bucket: # zero weight edges can refill the current bucket
+            u = bucket.pop()
+            pending -= 1
+            if dist[u] != d: # outdated, u was moved to a closer bucket
+                continue
+            if u == end:
+                pending = 0
+                break
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                nd = d + weights[i]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    buckets[nd % nb].append(v)
+                    pending += 1
+        d += 1
+    dist = np.frombuffer(dist, dtype=np.int64).astype(np.float64)
+    dist[dist == unreached] = np.inf
+    return dist, np.frombuffer(prev, dtype=np.int64)
+
+# back to the label -> value dicts: dist[label], prev[label] (None = no parent)
+def _as_dicts(g, dist, prev):
+    labels = list(g) # node labels in id order
+    dist_d = dict(zip(labels, dist.tolist()))
+    prev_d = {labels[i]: (None if p == -1 else labels[p]) for i, p in enumerate(prev.tolist())}
+    return dist_d, prev_d
 
 def find_shortest_path(adj, start_node, end_node):
-    dist, prev = calculate_distances(adj, start_node)
+    dist, prev = calculate_distances(adj, start_node, end_node)
     path = []
     #base case
     if dist[end_node] == float('infinity'): #means not connected t0 start_node
@@ -85,4 +197,21 @@ def return_path(prev, path, start_node, end_node):
         #print(path)
         return_path(prev, path, end_node, prev[end_node])
         
-print(find_shortest_path(adj, 'U', 'Z'))
\ No newline at end of file
+if __name__ == '__main__':
+    adj = {
+        'U': {'V': 2, 'W': 5, 'X': 1},
+        'V': {'U': 2, 'X': 2, 'W': 3},
+        'W': {'V': 3, 'U': 5, 'X': 3, 'Y': 1, 'Z': 5},
+        'X': {'U': 1, 'V': 2, 'W': 3, 'Y': 1},
+        'Y': {'X': 1, 'W': 1, 'Z': 1},
+        'Z': {'W': 5, 'Y': 1}
+    }
+
+    print(find_shortest_path(adj, 'U', 'Z'))
+    print(dial_distances(adj, 'U')[0])
+
+    # same graph, converted once for both queries, again after the new edge
+    graph = Graph(adj)
+    print(find_shortest_path(graph, 'U', 'Z'), find_shortest_path(graph, 'V', 'Z'))
+    graph.add_edge('U', 'Z', 1)
+    print(find_shortest_path(graph, 'U', 'Z'))
\ No newline at end of file
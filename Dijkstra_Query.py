@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Point-to-point (P2P) shortest path queries:
+Dijkstra_Lazy/Dijkstra_Eager solve SSSP, they settle every node reachable from the
+start. for a single start -> end query most of that work is wasted, so here are
+three ways to settle fewer nodes:
+
+Early exit:
+Dijkstra settles nodes in order of distance, so once end_node is popped from the
+PQ its distance is final and we can stop. everything farther than end is skipped
+
+Bidirectional:
+run one Dijkstra forward from start and one backward from end (over reversed
+edges), always advancing the side whose PQ top is smaller. every time an edge
+connects the two searches we get a candidate path length mu.
+stop as soon as top_forward + top_backward >= mu, since no path through unsettled
+nodes can beat mu anymore. on road-like graphs the two 'balls' of radius d/2
+hold far fewer nodes than one ball of radius d
+
+A*:
+Dijkstra with the PQ keyed by dist[node] + h(node), where h is a lower bound on
+the remaining distance to end (admissible heuristic), eg euclidean distance
+between node coordinates when edge weights are at least the straight-line
+distance. the search is pulled towards end instead of growing in every
+direction. h = 0 gives plain Dijkstra back
+if h is admissible but not consistent a node may be settled more than once,
+the lazy 'outdated pair' check handles that
+
+every query returns (distance, path, settled) where settled is how many nodes
+were popped and expanded (outdated PQ pairs don't count), so the gains can be
+measured. distance is infinity and path [] if end is unreachable
+
+the graph is converted to a CSRGraph once (see CSR_Graph.py) and each query only
+touches the nodes it reaches (dist/prev are dicts, not size V arrays), so a
+query costs nothing for the part of the graph it never sees
+"""
+import heapq
+import math
+from CSR_Graph import CSRGraph
+
+INF = float('infinity')
+
+class ShortestPathQuery:
+    def __init__(self, adj):
+        self.graph = adj if isinstance(adj, CSRGraph) else CSRGraph.from_adjacency(adj)
+        self.reverse = None # built on the first bidirectional query
+        self._views = _views(self.graph)
+
+    def early_exit(self, start_node, end_node):
+        g = self.graph
+        s, t = g.id_of(start_node), g.id_of(end_node)
+        indptr, indices, weights = self._views
+        dist = {s: 0}
+        prev = {s: -1}
+        pq = [(0, s)]
+        settled = 0
+        while pq:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]: # outdated pair
+                continue
+            settled += 1
+            if u == t:
+                return d, _path(g, prev, t), settled
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                nd = d + weights[i]
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(pq, (nd, v))
+        return INF, [], settled
+
+    def bidirectional(self, start_node, end_node):
+        g = self.graph
+        if self.reverse is None:
+            self.reverse = g.reverse()
+            self._reverse_views = _views(self.reverse)
+        s, t = g.id_of(start_node), g.id_of(end_node)
+        views = (self._views, self._reverse_views)
+        dist = ({s: 0}, {t: 0})
+        prev = ({s: -1}, {t: -1})
+        pq = ([(0, s)], [(0, t)])
+        done = (set(), set())
+        mu = 0 if s == t else INF
+        meet = (s, t) if s == t else None # edge joining the two searches
+        settled = 0
+        while pq[0] and pq[1]:
+            if pq[0][0][0] + pq[1][0][0] >= mu:
+                break
+            side = 0 if pq[0][0][0] <= pq[1][0][0] else 1
+            other = 1 - side
+            d, u = heapq.heappop(pq[side])
+            if d > dist[side][u] or u in done[side]:
+                continue
+            done[side].add(u)
+            settled += 1
+            indptr, indices, weights = views[side]
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                nd = d + weights[i]
+                if nd < dist[side].get(v, INF):
+                    dist[side][v] = nd
+                    prev[side][v] = u
+                    heapq.heappush(pq[side], (nd, v))
+                dv = dist[other].get(v)
+                if dv is not None and d + weights[i] + dv < mu:
+                    mu = d + weights[i] + dv
+                    meet = (u, v) if side == 0 else (v, u)
+        if meet is None:
+            return INF, [], settled
+        # start -> meet[0] forward, then meet[1] -> end along the backward tree
+        path = _path(g, prev[0], meet[0])
+        if meet[1] != meet[0]:
+            v = meet[1]
+            while v != -1:
+                path.append(g.label_of(v))
+                v = prev[1][v]
+        return mu, path, settled
+
+    # heuristic(node label) -> lower bound on distance from node to end_node
+    def astar(self, start_node, end_node, heuristic):
+        g = self.graph
+        s, t = g.id_of(start_node), g.id_of(end_node)
+        indptr, indices, weights = self._views
+        h = {} # heuristic is called once per node
+        def hval(v):
+            x = h.get(v)
+            if x is None:
+                x = h[v] = heuristic(g.label_of(v))
+            return x
+        dist = {s: 0}
+        prev = {s: -1}
+        pq = [(hval(s), 0, s)]
+        settled = 0
+        while pq:
+            _, d, u = heapq.heappop(pq)
+            if d > dist[u]: # outdated pair
+                continue
+            settled += 1
+            if u == t:
+                return d, _path(g, prev, t), settled
+            for i in range(indptr[u], indptr[u + 1]):
+                v = indices[i]
+                nd = d + weights[i]
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(pq, (nd + hval(v), nd, v))
+        return INF, [], settled
+
+
+# straight-line distance to end_node, coords -> {node: (x, y)}
+# admissible as long as no edge is shorter than the distance between its endpoints
+def euclidean_heuristic(coords, end_node, scale=1.0):
+    tx, ty = coords[end_node]
+    def h(node):
+        x, y = coords[node]
+        return scale * math.hypot(x - tx, y - ty)
+    return h
+
+def _views(g):
+    # memoryviews index straight to python ints/floats, cheaper than numpy scalars
+    return memoryview(g.indptr), memoryview(g.indices), memoryview(g.weights)
+
+def _path(g, prev, node):
+    path = []
+    while node != -1:
+        path.append(g.label_of(node))
+        node = prev[node]
+    return path[::-1]
+
+
+if __name__ == '__main__':
+    adj = {
+        'U': {'V': 2, 'W': 5, 'X': 1},
+        'V': {'U': 2, 'X': 2, 'W': 3},
+        'W': {'V': 3, 'U': 5, 'X': 3, 'Y': 1, 'Z': 5},
+        'X': {'U': 1, 'V': 2, 'W': 3, 'Y': 1},
+        'Y': {'X': 1, 'W': 1, 'Z': 1},
+        'Z': {'W': 5, 'Y': 1}
+    }
+    coords = {'U': (0, 0), 'V': (1, 1), 'W': (2, 1), 'X': (1, -0.5), 'Y': (2, -0.5), 'Z': (3, 0)}
+    q = ShortestPathQuery(adj)
+    print(q.early_exit('U', 'Z'))
+    print(q.bidirectional('U', 'Z'))
+    print(q.astar('U', 'Z', euclidean_heuristic(coords, 'Z', scale=0.5)))
@@ -36,6 +36,8 @@ nonzero degre belong to a single strongly connected component
 
 """
 from collections import defaultdict
+from CSR_Graph import CSRGraph
+from DFS_Iterative import IterativeDFS
 
 class UnDirectedGraph:
     def __init__(self, num_v):
@@ -96,12 +98,12 @@ class UnDirectedGraph:
         
         return True
             
+    # iterative DFS engine (DFS_Iterative.py), no recursion limit on long paths
     def dfs(self, node, visited):
-        # Current node is visited
-        visited[node] = True
-        for neighbor in self.adj[node]:
-            if visited[neighbor] == False:
-                self.dfs(neighbor, visited)
+        engine = IterativeDFS(CSRGraph.from_adjacency(self.adj, num_v=self.V)).run([node])
+        for i in engine.preorder[:engine.visited_count]:
+            # Current node is visited
+            visited[i] = True
         
         
 class DirectedGraph:
@@ -7,8 +7,9 @@ Created on Sun May 30 12:53:24 2021
 is an APSP (All Pairs Shortest Path) algorithm
 time complexity is O(V^3), ideal for graphs no more than a couple hundred nodes
 best way to represent graph is with an adjacency MATRIX
+(for big sparse graphs, or negative weights on a big graph, see Johnson_APSP.py)
 
-main idea: gradually build up all intermediate routes between i and j to find 
+main idea: gradually build up all intermediate routes between i and j to find
 optimal path
 
 explanation:
@@ -17,100 +18,256 @@ finds shortest path between i and j directly by adjacency matrix, then as it
 finds more paths between all nodes, if there exists a better path between
 i and j the optimal path updates.
 
+implementation:
+no globals, every function takes and returns its own dis/Next numpy matrices,
+so any number of graphs (of any size) can be worked on at once
+step k is one whole-matrix update instead of V^2 python iterations:
+    dis = min(dis, dis[:, k, None] + dis[None, k, :])
+ie row i gets dis[i][k] + (row k), and wherever that wins Next[i][j] = Next[i][k].
+the inner two loops run in C, the python loop is only over k
+
+floydWarshall_blocked: same result, cache blocked (tiled).
+the plain version streams the whole V x V matrix through memory for every k,
+once it doesn't fit in L2 every step is a trip to RAM. the blocked version
+splits the matrix into B x B tiles and, for every diagonal tile kk, runs the
+k's of kk in 3 phases:
+    1. the diagonal tile (kk, kk) on its own
+    2. the tiles in row kk and column kk, they only need tile (kk, kk)
+    3. every other tile (i, j), it only needs (i, kk) and (kk, j)
+so at any time only 3 tiles are touched and they stay in cache for all B k's
+
+incremental updates (the table stays fresh when a few edge weights change):
+decreaseEdges: after inserting/lowering edges (u, v, w), a new shortest path
+can be cut at every new edge's tail u into pieces u -> v ~> (next tail) that
+are the new edge plus an OLD shortest path. so first relax the tail rows,
+    dis[u][j] = min(dis[u][j], w + dis[v][j])
+then run the Floyd-Warshall k step with k = each distinct tail only.
+O(V^2) per distinct tail instead of O(V^3), one edge = one k step
+increaseEdge: a higher weight can only hurt pairs with a shortest path through
+u -> v, ie dis[i][u] + old + dis[v][j] == dis[i][j]. if there are none nothing
+changes. if only a few rows have such pairs (and weights are positive) those
+rows are recomputed with a dense Dijkstra, O(V^2) each; otherwise (too many
+rows, or 0/negative weights) the whole table is recomputed
 """
+import numpy as np
+
+INF = 10**7
 
 # Initializing the distance and
 # Next array
-def initialise(V):
-    global dis, Next
- 
-    for i in range(V):
-        for j in range(V):
-            dis[i][j] = graph[i][j]
- 
-            # No edge between node
-            # i and j
-            if (graph[i][j] == INF):
-                Next[i][j] = -1
-            else:
-                Next[i][j] = j
- 
+# graph -> V x V matrix (nested lists or ndarray), INF (or anything >= INF,
+# or float('inf')) = no edge
+def initialise(graph):
+    dis = np.array(graph, dtype=np.float64)
+    # No edge between node
+    # i and j
+    no_edge = dis >= INF
+    dis[no_edge] = np.inf
+    Next = np.empty(dis.shape, dtype=_next_dtype(len(dis)))
+    Next[:] = np.arange(len(dis))[None, :]
+    Next[no_edge] = -1
+    return dis, Next
+
 # Function construct the shotest
 # path between u and v
-def constructPath(u, v):
-    global graph, Next
-     
+def constructPath(Next, u, v):
     # If there's no path between
     # node u and v, simply return
     # an empty array
     if (Next[u][v] == -1):
-        return {}
- 
+        return []
+
     # Storing the path in a vector
     path = [u]
     while (u != v):
-        u = Next[u][v]
+        u = int(Next[u][v])
         path.append(u)
- 
+
     return path
- 
+
 # Standard Floyd Warshall Algorithm
 # with little modification Now if we find
 # that dis[i][j] > dis[i][k] + dis[k][j]
 # then we modify next[i][j] = next[i][k]
-def floydWarshall(V):
-    global dist, Next
+# updates dis and Next in place (and returns them)
+def floydWarshall(dis, Next):
+    V = len(dis)
+    candidate = np.empty_like(dis)
+    better = np.empty(dis.shape, dtype=bool)
     for k in range(V):
-        for i in range(V):
-            for j in range(V):
-                 
-                # We cannot travel through
-                # edge that doesn't exist
-                if (dis[i][k] == INF or dis[k][j] == INF):
-                    continue
-                if (dis[i][j] > dis[i][k] + dis[k][j]):
-                    dis[i][j] = dis[i][k] + dis[k][j]
-                    Next[i][j] = Next[i][k]
- 
+        # an edge that doesn't exist is inf, and inf + anything never wins
+        np.add(dis[:, k, None], dis[None, k, :], out=candidate)
+        np.less(candidate, dis, out=better)
+        if better.any():
+            np.copyto(dis, candidate, where=better)
+            np.copyto(Next, Next[:, k, None], where=better)
+    return dis, Next
+
+# cache blocked version, block = tile side (256 x 256 float64 = 512KB)
+def floydWarshall_blocked(dis, Next, block=256):
+    V = len(dis)
+    tiles = [slice(t, min(t + block, V)) for t in range(0, V, block)]
+    for kk in tiles:
+        _relax_tile(dis, Next, kk, kk, kk)
+        for t in tiles:
+            if t != kk:
+                _relax_tile(dis, Next, kk, t, kk) # row kk
+                _relax_tile(dis, Next, t, kk, kk) # column kk
+        for i in tiles:
+            if i == kk:
+                continue
+            for j in tiles:
+                if j != kk:
+                    _relax_tile(dis, Next, i, j, kk)
+    return dis, Next
+
+# runs the k's of ks over the tile (rows, cols), in place
+def _relax_tile(dis, Next, rows, cols, ks):
+    d = dis[rows, cols]
+    n = Next[rows, cols]
+    candidate = np.empty_like(d)
+    better = np.empty(d.shape, dtype=bool)
+    for k in range(ks.start, ks.stop):
+        np.add(dis[rows, k, None], dis[None, k, cols], out=candidate)
+        np.less(candidate, d, out=better)
+        if better.any(): # late in the run most tiles are already final
+            np.copyto(d, candidate, where=better)
+            np.copyto(n, Next[rows, k, None], where=better)
+
+# edges -> iterable of (u, v, w) with w <= graph[u][v], ie new edges or lower weights
+# updates graph, dis and Next in place. w >= INF is still no edge, nothing to relax
+def decreaseEdges(graph, dis, Next, edges):
+    tails = []
+    for u, v, w in edges:
+        if w > graph[u][v]:
+            raise ValueError("weight of %d -> %d goes up, use increaseEdge" % (u, v))
+        graph[u][v] = w
+        if w >= INF:
+            continue
+        # tail row first: u -> v and then v's old shortest paths
+        candidate = w + dis[v]
+        better = candidate < dis[u]
+        if better.any():
+            dis[u, better] = candidate[better]
+            Next[u, better] = v
+            tails.append(u)
+    if dis[tails, tails].min(initial=0) < 0:
+        raise ValueError("negative cycle, the table is no longer valid")
+    for k in dict.fromkeys(tails): # distinct tails, in order
+        candidate = dis[:, k, None] + dis[None, k, :]
+        better = candidate < dis
+        np.copyto(dis, candidate, where=better)
+        np.copyto(Next, Next[:, k, None], where=better)
+    if np.diagonal(dis).min(initial=0) < 0:
+        raise ValueError("negative cycle, the table is no longer valid")
+    return dis, Next
+
+def decreaseEdge(graph, dis, Next, u, v, w):
+    return decreaseEdges(graph, dis, Next, [(u, v, w)])
+
+# w >= graph[u][v], w = INF removes the edge. updates graph, dis and Next in place
+# max_rows -> fraction of rows that may be recomputed one by one before it is
+# cheaper to recompute everything. returns what was done: 'none', 'rows' or 'full'
+def increaseEdge(graph, dis, Next, u, v, w, max_rows=0.25):
+    old = graph[u][v]
+    if w < old:
+        raise ValueError("weight of %d -> %d goes down, use decreaseEdge" % (u, v))
+    graph[u][v] = w
+    if old >= INF or w == old:
+        return 'none'
+    # pairs with a shortest path through u -> v (ties included, with some slack for rounding)
+    through = dis[:, u, None] + old + dis[None, v, :]
+    affected = through <= dis + 1e-9 * np.maximum(1, np.abs(dis))
+    rows = np.nonzero(affected.any(axis=1))[0]
+    if not len(rows):
+        return 'none'
+    weights, _ = initialise(graph)
+    off_diagonal = ~np.eye(len(weights), dtype=bool)
+    if len(rows) <= max_rows * len(dis) and (weights[off_diagonal] > 0).all():
+        for i in rows:
+            dis[i], Next[i] = _dijkstraRow(weights, i)
+        return 'rows'
+    dis[:], Next[:] = initialise(graph)
+    floydWarshall_blocked(dis, Next)
+    return 'full'
+
+def updateEdge(graph, dis, Next, u, v, w, max_rows=0.25):
+    if w >= INF and graph[u][v] >= INF: # no edge before or after
+        graph[u][v] = w
+        return 'none'
+    if w <= graph[u][v]:
+        decreaseEdge(graph, dis, Next, u, v, w)
+        return 'decrease'
+    return increaseEdge(graph, dis, Next, u, v, w, max_rows)
+
+# one row of the table from scratch: dense O(V^2) Dijkstra over the weight
+# matrix, hop[j] = first node after s on the way to j (ie Next[s][j])
+def _dijkstraRow(weights, s):
+    V = len(weights)
+    dist = np.full(V, np.inf)
+    hop = np.full(V, -1, dtype=np.int64)
+    done = np.zeros(V, dtype=bool)
+    dist[s] = 0
+    hop[s] = s
+    for _ in range(V):
+        x = int(np.argmin(np.where(done, np.inf, dist)))
+        if done[x] or dist[x] == np.inf:
+            break
+        done[x] = True
+        candidate = dist[x] + weights[x]
+        better = (candidate < dist) & ~done
+        dist[better] = candidate[better]
+        hop[better] = np.nonzero(better)[0] if x == s else hop[x]
+    return dist, hop
+
+def _next_dtype(V):
+    # node ids fit in int32 for anything that fits in memory as a V x V matrix
+    return np.int32 if V < 2**31 else np.int64
+
 # Print the shortest path
 def printPath(path):
     n = len(path)
     for i in range(n - 1):
         print(path[i], end=" -> ")
     print (path[n - 1])
- 
-
-MAXM,INF = 100,10**7
-dis = [[-1 for i in range(MAXM)] for i in range(MAXM)]
-Next = [[-1 for i in range(MAXM)] for i in range(MAXM)]
- 
-V = 4
-graph = [ [ 0, 3, INF, 7 ],
-        [ 8, 0, 2, INF ],
-        [ 5, INF, 0, 1 ],
-        [ 2, INF, INF, 0 ] ]
- 
-# Function to initialise the
-# distance and Next array
-initialise(V)
- 
-# Calling Floyd Warshall Algorithm,
-# this will update the shortest
-# distance as well as Next array
-floydWarshall(V)
-path = []
- 
-# Path from node 1 to 3
-print("Shortest path from 1 to 3: ", end = "")
-path = constructPath(1, 3)
-printPath(path)
- 
-# Path from node 0 to 2
-print("Shortest path from 0 to 2: ", end = "")
-path = constructPath(0, 2)
-printPath(path)
- 
-# Path from node 3 to 2
-print("Shortest path from 3 to 2: ", end = "")
-path = constructPath(3, 2)
-printPath(path)
\ No newline at end of file
+
+
+if __name__ == '__main__':
+    graph = [ [ 0, 3, INF, 7 ],
+            [ 8, 0, 2, INF ],
+            [ 5, INF, 0, 1 ],
+            [ 2, INF, INF, 0 ] ]
+
+    # Function to initialise the
+    # distance and Next array
+    dis, Next = initialise(graph)
+
+    # Calling Floyd Warshall Algorithm,
+    # this will update the shortest
+    # distance as well as Next array
+    floydWarshall(dis, Next)
+    path = []
+
+    # Path from node 1 to 3
+    print("Shortest path from 1 to 3: ", end = "")
+    path = constructPath(Next, 1, 3)
+    printPath(path)
+
+    # Path from node 0 to 2
+    print("Shortest path from 0 to 2: ", end = "")
+    path = constructPath(Next, 0, 2)
+    printPath(path)
+
+    # Path from node 3 to 2
+    print("Shortest path from 3 to 2: ", end = "")
+    path = constructPath(Next, 3, 2)
+    printPath(path)
+
+    # edge 3 -> 2 with weight 1 shows up, then 0 -> 1 gets more expensive
+    weights = np.array(graph, dtype=np.float64)
+    decreaseEdge(weights, dis, Next, 3, 2, 1)
+    print("Shortest path from 3 to 2: ", end = "")
+    printPath(constructPath(Next, 3, 2))
+    increaseEdge(weights, dis, Next, 0, 1, 9)
+    print("Shortest path from 0 to 2: ", end = "")
+    printPath(constructPath(Next, 0, 2))
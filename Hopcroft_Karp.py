@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Hopcroft-Karp: maximum matching in a bipartite graph in O(E*V^1/2)
+
+Max-Flow.py gets the same answer with a source -> left -> right -> sink network
+of unit capacities, but pays for a generic residual graph (4 arcs per edge,
+capacities, twin arcs). Hopcroft-Karp works on the bipartite graph itself:
+
+a matched edge is used by at most one left and one right vertex. an augmenting
+path starts at a free left vertex, alternates unmatched edge (left -> right)
+and matched edge (right -> left), and ends at a free right vertex. flipping it
+matches one more pair
+one phase:
+    1: BFS from all free left vertices at once, over the alternating paths,
+       dist[u] = layer of left vertex u, stop at the first layer that reaches
+       a free right vertex
+    2: DFS from every free left vertex along the layers (dist goes up by one),
+       flipping each path found. the paths are vertex disjoint, a left vertex
+       that leads nowhere is dropped for the rest of the phase
+    REPEAT until the BFS finds no free right vertex
+only O(V^1/2) phases are ever needed
+the DFS keeps its path on an explicit stack (no recursion limit) and one
+current-edge pointer per left vertex, so a phase is O(E)
+the BFS is numpy, a whole layer per step, and a backward pass over its layers
+drops every vertex that can't reach a free right vertex before the DFS starts
+(late phases have big layers and only a handful of paths, without it the DFS
+spends most of its time in dead ends)
+
+warm start: a greedy pass (every left vertex takes its first free neighbour)
+usually matches most vertices before the first phase, the phases then only fix
+up the rest
+
+input: the left -> right adjacency as CSR arrays (see CSR_Graph.py), row u of
+(indptr, indices) = the right vertices next to left vertex u, right vertices
+numbered 0..num_right-1 on their own
+output: match_left[u] = right partner of u, match_right[v] = left partner of v,
+-1 = unmatched (numpy arrays)
+
+König: in a bipartite graph the size of a maximum matching is the size of a
+minimum vertex cover. with Z = the vertices reachable from free left vertices
+over alternating paths, (left vertices not in Z) + (right vertices in Z) is one
+"""
+import importlib
+import time
+import numpy as np
+from CSR_Graph import CSRGraph, row_positions
+
+def greedy_matching(indptr, indices, num_right):
+    indptr, indices = _lists(indptr, indices)
+    num_left = len(indptr) - 1
+    match_left = [-1] * num_left
+    match_right = [-1] * num_right
+    for u in range(num_left):
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            if match_right[v] == -1:
+                match_left[u] = v
+                match_right[v] = u
+                break
+    return np.array(match_left, dtype=np.int64), np.array(match_right, dtype=np.int64)
+
+def hopcroft_karp(indptr, indices, num_right, warm_start=True, stats=None):
+    '''
+    indptr, indices -> left -> right adjacency (CSR), or pass a CSRGraph as
+                       indptr and leave indices None (rows = left vertices)
+    warm_start -> start from greedy_matching instead of the empty matching
+    stats -> optional dict, gets 'phases' and 'augmentations'
+    returns (match_left, match_right)
+    '''
+    if isinstance(indptr, CSRGraph):
+        indptr, indices = indptr.indptr, indptr.indices
+    indptr_np = np.asarray(indptr, dtype=np.int64)
+    indices_np = np.asarray(indices, dtype=np.int64)
+    indptr, indices = _lists(indptr, indices)
+    num_left = len(indptr) - 1
+    if warm_start:
+        match_left, match_right = (m.tolist() for m in greedy_matching(indptr, indices, num_right))
+    else:
+        match_left, match_right = [-1] * num_left, [-1] * num_right
+    phases = augmentations = 0
+    ptr = [0] * num_left
+    while True:
+        dist, free_layer = _layers(indptr_np, indices_np, np.array(match_left, dtype=np.int64),
+                                   np.array(match_right, dtype=np.int64))
+        if free_layer == -1:
+            break
+        phases += 1
+        # DFS along the layers, one augmenting path per free left vertex at most
+        ptr[:] = indptr[:-1]
+        dead = num_left + 1 # no layer is that high
+        for root in range(num_left):
+            if match_left[root] != -1 or dist[root] != 0:
+                continue
+            stack = [root]
+            while stack:
+                u = stack[-1]
+                e, end = ptr[u], indptr[u + 1]
+                if dist[u] == free_layer:
+                    # last layer, only a free right vertex will do
+                    while e < end and match_right[indices[e]] != -1:
+                        e += 1
+                    w = -1
+                else:
+                    next_layer = dist[u] + 1
+                    while e < end:
+                        w = match_right[indices[e]]
+                        if w != -1 and dist[w] == next_layer:
+                            break
+                        e += 1
+                ptr[u] = e
+                if e == end:
+                    dist[u] = dead # dead end for this phase
+                    stack.pop()
+                    if stack:
+                        ptr[stack[-1]] += 1
+                    continue
+                if w != -1:
+                    stack.append(w)
+                    continue
+                # free right vertex: flip the path
+                for x in stack:
+                    v = indices[ptr[x]]
+                    match_left[x] = v
+                    match_right[v] = x
+                augmentations += 1
+                break
+    if stats is not None:
+        stats['phases'] = phases
+        stats['augmentations'] = augmentations
+    return np.array(match_left, dtype=np.int64), np.array(match_right, dtype=np.int64)
+
+def min_vertex_cover(indptr, indices, match_left, match_right):
+    '''
+    König's minimum vertex cover from a maximum matching
+    returns (left_cover, right_cover) bool arrays, as many True as matched pairs
+    '''
+    if isinstance(indptr, CSRGraph):
+        indptr, indices = indptr.indptr, indptr.indices
+    indptr, indices = _lists(indptr, indices)
+    match_right = np.asarray(match_right).tolist()
+    num_left, num_right = len(indptr) - 1, len(match_right)
+    seen_left = bytearray(num_left)
+    seen_right = bytearray(num_right)
+    queue = [u for u in range(num_left) if match_left[u] == -1]
+    for u in queue:
+        seen_left[u] = 1
+    # alternating: any edge left -> right, the matched edge right -> left
+    for u in queue:
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            if not seen_right[v]:
+                seen_right[v] = 1
+                w = match_right[v]
+                if w != -1 and not seen_left[w]:
+                    seen_left[w] = 1
+                    queue.append(w)
+    left_cover = np.frombuffer(bytes(seen_left), dtype=np.uint8) == 0
+    right_cover = np.frombuffer(bytes(seen_right), dtype=np.uint8) == 1
+    return left_cover, right_cover
+
+# BFS layers over the alternating paths from all free left vertices, one numpy
+# step per layer: the edges of the whole frontier, their right vertices, the left
+# partners of those. stops at the first layer with a free right vertex next to it
+# then a backward pass over the same layers keeps only the left vertices that
+# still lead to a free right vertex, the rest get the 'not reached' dist so the
+# DFS never walks into them
+# returns (dist as a list, num_left + 1 = not reached, that layer or -1 if none)
+def _layers(indptr, indices, match_left, match_right):
+    num_left = len(indptr) - 1
+    dead = num_left + 1
+    dist = np.full(num_left, dead, dtype=np.int64)
+    frontier = np.nonzero(match_left == -1)[0]
+    dist[frontier] = 0
+    frontiers = []
+    while len(frontier):
+        frontiers.append(frontier)
+        rows, partners = _frontier_edges(indptr, indices, match_right, frontier)
+        if (partners == -1).any():
+            break
+        partners = np.unique(partners)
+        frontier = partners[dist[partners] == dead]
+        dist[frontier] = len(frontiers)
+    else:
+        return dist.tolist(), -1
+    free_layer = len(frontiers) - 1
+    useful = np.zeros(num_left, dtype=bool)
+    useful[rows[partners == -1]] = True
+    for frontier in reversed(frontiers[:-1]):
+        rows, partners = _frontier_edges(indptr, indices, match_right, frontier)
+        ok = partners != -1
+        rows, partners = rows[ok], partners[ok]
+        useful[rows[useful[partners] & (dist[partners] == dist[rows] + 1)]] = True
+    dist[~useful] = dead
+    return dist.tolist(), free_layer
+
+# (left vertex, left partner of the right end or -1) for every edge out of frontier
+def _frontier_edges(indptr, indices, match_right, frontier):
+    positions, counts = row_positions(indptr, frontier)
+    partners = match_right[indices[positions]]
+    return np.repeat(frontier, counts), partners
+
+# (from a CSRGraph or numpy) lists, the loops above index them one item at a time
+def _lists(indptr, indices):
+    if not isinstance(indptr, list):
+        indptr = np.asarray(indptr).tolist()
+    if not isinstance(indices, list):
+        indices = np.asarray(indices).tolist()
+    return indptr, indices
+
+# ------------------------------------------------------------------ benchmark
+
+# random left -> right adjacency, degree neighbours per left vertex (CSR arrays)
+def random_bipartite(num_left, num_right, degree=3, seed=0):
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, num_right, size=num_left * degree)
+    indptr = np.arange(0, num_left * degree + 1, degree)
+    return indptr, indices
+
+def benchmark(num_left, num_right, degree=3, seed=0):
+    '''
+    Hopcroft-Karp (with and without the greedy start) against IterativeDinic
+    from Max-Flow.py on the same source -> left -> right -> sink network
+    returns {name: (matching size, seconds)}
+    '''
+    MaxFlow = importlib.import_module('Max-Flow')
+    indptr, indices = random_bipartite(num_left, num_right, degree, seed)
+    results = {}
+    for warm in (True, False):
+        start = time.perf_counter()
+        match_left, _ = hopcroft_karp(indptr, indices, num_right, warm_start=warm)
+        results['hopcroft-karp' + (' (greedy start)' if warm else '')] = (
+            int((match_left != -1).sum()), time.perf_counter() - start)
+    start = time.perf_counter()
+    s, t = num_left + num_right, num_left + num_right + 1
+    left = np.repeat(np.arange(num_left), np.diff(indptr))
+    src = np.concatenate((np.full(num_left, s), left, num_left + np.arange(num_right)))
+    dst = np.concatenate((np.arange(num_left), num_left + indices, np.full(num_right, t)))
+    dinic = MaxFlow.IterativeDinic.from_arrays(num_left + num_right + 2, src, dst, np.ones(len(src), dtype=np.int64))
+    results['iterative dinic'] = (dinic.max_flow(s, t), time.perf_counter() - start)
+    return results
+
+
+if __name__ == '__main__':
+    # left 0..2, right 0..2: 0 - {0, 1}, 1 - {0}, 2 - {1, 2}
+    indptr = [0, 2, 3, 5]
+    indices = [0, 1, 0, 1, 2]
+    match_left, match_right = hopcroft_karp(indptr, indices, 3)
+    print(match_left, match_right)
+    print(min_vertex_cover(indptr, indices, match_left, match_right))
+
+    for name, (size, seconds) in benchmark(100000, 100000).items():
+        print("%-30s matched %d in %.2fs" % (name, size, seconds))
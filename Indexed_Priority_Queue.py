@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Indexed Priority Queue (IPQ):
+a min PQ over the keys 0..n-1 (dense node ids) that, on top of push and pop,
+can look up and update the value of a key that is already in the queue.
+that is what the eager versions of Dijkstra's and Prim's need: every node sits
+in the PQ at most once and its entry is updated (decrease_key) when a better
+distance/edge shows up, instead of inserting a duplicate like the lazy versions
+
+storage, no python object per entry:
+    values[key]  -> array('d'), the priority of each key
+    heap[i]      -> array('q'), the key at heap position i
+    pos[key]     -> array('q'), where key sits in heap (-1 = not in the PQ)
+pos is what makes it 'indexed': contains is O(1) and decrease_key knows where
+to start sifting without searching the heap
+
+d-ary heap:
+each node has d children instead of 2, so the tree is log_d(n) deep.
+decrease_key (sift up) only compares with parents, so it gets cheaper as d grows
+pop_min (sift down) has to look at d children per level, so it gets more expensive
+dijkstra/prim do far more decrease_keys than pops on dense graphs, d = 4 is a
+good default
+    push, decrease_key -> O(log_d(n))
+    pop_min            -> O(d * log_d(n))
+    contains, peek     -> O(1)
+"""
+from array import array
+
+
+class IndexedDaryHeap:
+    def __init__(self, n, d=4):
+        if d < 2:
+            raise ValueError("d must be at least 2")
+        self.d = d
+        self.size = 0
+        self.values = array('d', [0.0]) * n
+        self.heap = array('q', [0]) * n
+        self.pos = array('q', [-1]) * n
+
+    def __len__(self):
+        return self.size
+
+    def contains(self, key):
+        return self.pos[key] != -1
+
+    __contains__ = contains
+
+    def value_of(self, key):
+        return self.values[key]
+
+    def peek(self):
+        return self.heap[0], self.values[self.heap[0]]
+
+    def push(self, key, value):
+        if self.pos[key] != -1:
+            raise KeyError("key %d already in the PQ, use decrease_key" % key)
+        i = self.size
+        self.size += 1
+        self.values[key] = value
+        self.heap[i] = key
+        self.pos[key] = i
+        self._sift_up(i)
+
+    def decrease_key(self, key, value):
+        # only moves towards the root, ignores values that aren't smaller
+        if value < self.values[key]:
+            self.values[key] = value
+            self._sift_up(self.pos[key])
+
+    # push if absent, decrease_key if present; True if the value changed
+    def push_or_decrease(self, key, value):
+        if self.pos[key] == -1:
+            self.push(key, value)
+            return True
+        if value < self.values[key]:
+            self.values[key] = value
+            self._sift_up(self.pos[key])
+            return True
+        return False
+
+    def pop_min(self):
+        if not self.size:
+            raise IndexError("pop from an empty PQ")
+        heap, pos = self.heap, self.pos
+        key = heap[0]
+        self.size -= 1
+        last = heap[self.size]
+        pos[key] = -1
+        if self.size:
+            heap[0] = last
+            pos[last] = 0
+            self._sift_down(0)
+        return key, self.values[key]
+
+    # hole-based sifts: move the hole instead of swapping at every level
+    def _sift_up(self, i):
+        heap, pos, values, d = self.heap, self.pos, self.values, self.d
+        key = heap[i]
+        value = values[key]
+        while i:
+            parent = (i - 1) // d
+            pkey = heap[parent]
+            if values[pkey] <= value:
+                break
+            heap[i] = pkey
+            pos[pkey] = i
+            i = parent
+        heap[i] = key
+        pos[key] = i
+
+    def _sift_down(self, i):
+        heap, pos, values, d, size = self.heap, self.pos, self.values, self.d, self.size
+        key = heap[i]
+        value = values[key]
+        while True:
+            first = d * i + 1
+            if first >= size:
+                break
+            # smallest of the (up to) d children
+            best = first
+            best_value = values[heap[first]]
+            for c in range(first + 1, min(first + d, size)):
+                cv = values[heap[c]]
+                if cv < best_value:
+                    best, best_value = c, cv
+            if best_value >= value:
+                break
+            ckey = heap[best]
+            heap[i] = ckey
+            pos[ckey] = i
+            i = best
+        heap[i] = key
+        pos[key] = i
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Johnson's algorithm:
+APSP (All Pairs Shortest Path) for SPARSE graphs that may have negative edge
+weights (but no negative cycles). O(V*E*log(V)) instead of Floyd-Warshall's O(V^3),
+so on 50k nodes with a few edges each it is the only one that finishes
+
+explanation:
+Dijkstra's is fast but fails with negative weights, so first make every weight
+non-negative without changing which paths are shortest:
+    add a virtual node q with a 0 edge to every node, run Bellman-Ford from q
+    (see Bellman-Ford.py) and let h[v] = dist from q to v
+    new weight w'(u, v) = w(u, v) + h[u] - h[v] >= 0
+(h[v] <= h[u] + w(u, v) because it's a shortest distance, so w' can't go negative)
+every path u -> v changes by the same h[u] - h[v], so shortest paths stay
+shortest, and d(u, v) = d'(u, v) - h[u] + h[v]
+then run Dijkstra from every node on w'
+a negative cycle makes Bellman-Ford fail and there is no answer (ValueError)
+
+implementation:
+the V Dijkstra runs are independent, they go through Dijkstra_Batch.distance_matrix,
+ie a process pool over the memory-mapped CSR arrays writing rows straight into
+a memory-mapped .npy, so V^2 distances never exist as python floats.
+the Dijkstra runs go BACKWARDS, from every target v over the reversed graph:
+that run's row is the whole column v of the answer, and its prev[u] is the node
+AFTER u on the way to v, ie Next[u][v] in Floyd-Warshall.py's constructPath
+convention (Next[u][v] = -1 no path, Next[v][v] = v). all paths into v then come
+from one tree, so walking Next never loops, even over 0 weight cycles.
+the files hold those target-major rows and are returned transposed (.T views,
+no copy), so dis[u][v] / Next[u][v] read the usual way round
+"""
+import importlib
+import numpy as np
+from CSR_Graph import CSRGraph
+from Dijkstra_Batch import distance_matrix
+
+BellmanFord = importlib.import_module('Bellman-Ford')
+
+INF = float('infinity')
+
+# h for the reweighting: Bellman-Ford from a virtual node with a 0 edge to every node
+def potentials(g):
+    n = g.num_v
+    src, dst, weights = g.edge_arrays()
+    with_q = CSRGraph.from_arrays(np.concatenate((src, np.full(n, n))),
+                                  np.concatenate((dst, np.arange(n))),
+                                  np.concatenate((weights, np.zeros(n))), n + 1)
+    bf = BellmanFord.Graph.from_csr(with_q)
+    h, _ = bf.BF(n)
+    if bf.negative_cycle is not None:
+        raise ValueError("negative cycle through nodes %s, no shortest paths" % bf.negative_cycle)
+    return h[:n]
+
+def reweight(g, h):
+    src, dst, weights = g.edge_arrays()
+    # >= 0 in exact arithmetic, clip the rounding noise so Dijkstra stays valid
+    new = np.maximum(weights + h[src] - h[dst], 0.0)
+    return CSRGraph.from_arrays(src, dst, new, g.num_v, g.labels)
+
+def johnson(adj, workers=None, dtype=np.float64, out=None, next_out=None, chunk=1024):
+    '''
+    adj -> dict adjacency (see CSR_Graph.from_adjacency) or a CSRGraph
+    workers, dtype -> as in Dijkstra_Batch.distance_matrix
+    out, next_out -> .npy paths to keep dis / Next on disk (memory-mapped),
+                     None = in-memory arrays
+    chunk -> rows per step when undoing the reweighting, bounds the memory used
+    returns (dis, Next) over the dense ids, dis[u][v] = INF if v can't be reached
+    '''
+    g = adj if isinstance(adj, CSRGraph) else CSRGraph.from_adjacency(adj)
+    n = g.num_v
+    h = potentials(g)
+    backward = reweight(g, h).reverse()
+    dis_t, next_t = distance_matrix(backward, list(backward), workers=workers, dtype=dtype,
+                                    out=out, predecessors=True, prev_out=next_out)
+    # row v holds d'(u, v) for every u: d(u, v) = d'(u, v) - h[u] + h[v]
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        dis_t[start:stop] += h[start:stop, None] - h[None, :]
+        ids = np.arange(start, stop)
+        next_t[ids, ids] = ids # Next[v][v] = v
+    for matrix, path in ((dis_t, out), (next_t, next_out)):
+        if path is not None:
+            matrix.flush()
+    return dis_t.T, next_t.T
+
+# same walk as Floyd-Warshall.py's constructPath, over a Next from johnson
+def construct_path(Next, u, v):
+    if Next[u][v] == -1:
+        return []
+    path = [u]
+    while u != v:
+        u = int(Next[u][v])
+        path.append(u)
+    return path
+
+
+if __name__ == '__main__':
+    adj = {
+        0: {1: 3, 3: 7},
+        1: {0: 8, 2: -2},
+        2: {0: 5, 3: 1},
+        3: {0: 2}
+    }
+    dis, Next = johnson(adj, workers=2)
+    print(dis)
+    print(construct_path(Next, 1, 3))
+    print(construct_path(Next, 0, 2))
+    print(construct_path(Next, 3, 2))
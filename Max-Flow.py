@@ -14,6 +14,7 @@ pass through the network from source to sink under all constrains
 Dinic's Algorithm:
 Strongly polynomical maximum flow algorithm with runtime of O(E*V^2). However,
 on bipartite graphs it has runtime of O(EV^1/2).
+(plain bipartite matching is faster without the flow network, see Hopcroft_Karp.py)
 Idea: to guide augmenting paths from s -> t using a level graph ie always progressing
 'towards' the general direction of the sink in levels.
 Levels of graph are obtained from BFS from the source. Edge is only part of level graph
@@ -26,47 +27,156 @@ as a detour iff necessary.
    to calculate max flow.
 REPEAT
 
+IterativeDinic: the same algorithm for big networks (hundreds of thousands of
+edges, eg bipartite assignment): residual arcs in flat arrays instead of a
+[to, rev, cap, flow] list per edge, and the blocking-flow DFS on an explicit
+stack instead of one recursive call per path edge
+
+Min cut and flow decomposition (min_cut / edge_flows / flow_decomposition):
+after a max flow, the vertices still reachable from the source over arcs with
+residual capacity left are the source side of a minimum cut, and the edges from
+that side to the other are exactly the saturated cut edges (max-flow min-cut).
+a flow decomposes into at most E source -> sink paths plus cycles: walk from the
+source along edges that still carry flow, take the bottleneck off every edge of
+the path (or of the cycle, if the walk comes back to a vertex it has seen) and
+repeat. every walk zeroes at least one edge
+all of it comes back as numpy arrays indexed by edge id (add_edge order), a
+decomposition is CSR-like: path p uses edges[indptr[p]:indptr[p+1]] and carries
+amount[p]
+
+Warm start (Dinic.set_capacity / add_edge after max_flow):
+the flow already in self.adj stays feasible when a capacity goes up or an edge
+is added, so calling max_flow again only augments the difference. lowering a
+capacity below the edge's flow f to c leaves f - c too much flow arriving at
+the tail a and too little at the head b. that is repaired first by sending
+f - c from a to b in the residual graph: on other routes if there are any,
+otherwise back through the source and sink (a temporary source -> sink arc,
+ie taking flow off s ~> a and b ~> t paths).
+then max_flow re-augments whatever can still get through
+
+SparseFlowNetwork: several sources and sinks without the V x V matrix
+FlowNetwork._normalizeGraph needs. the virtual source and sink are just two more
+vertex ids (num_v, num_v + 1) and their edges are appended after the input
+edges, so nothing is copied or reshaped and edge ids stay the input order.
+the virtual edges get a capacity no flow can reach (sum of all capacities + 1),
+they are never saturated and a min cut only ever has input edges
+
 """
-from collections import defaultdict
+from array import array
+from collections import defaultdict, deque
+import numpy as np
+from CSR_Graph import CSRGraph, row_positions
 class Dinic: 
     def __init__(self, num_v):
         self.lvl = [0] * num_v # level
         self.ptr = [0] * num_v # start | residual edge?
         self.q = [0] * num_v # augmenting path
         self.adj = defaultdict(list)
+        self.edges = [] # (a, position in adj[a]) of every add_edge, for the outputs
+        self.augmentations = 0
     # vertex closest to source, vertex closest to sink and flow capacity
     # through that edge, residual edge capacity
+    # returns the edge id (see edge_flows / set_capacity)
     def add_edge(self, a, b, c, rcap=0):
+        self.edges.append((a, len(self.adj[a])))
         self.adj[a].append([b, len(self.adj[b]), c, 0])
         self.adj[b].append([a, len(self.adj[a])-1, rcap, 0])
+        return len(self.edges) - 1
+
+    # residual edges from a CSRGraph (see CSR_Graph.py), weights are capacities
+    @classmethod
+    def from_csr(cls, csr):
+        return cls.from_arrays(csr.num_v, *csr.edge_arrays())
+
+    # edge columns, like PushRelabel's constructor. the level graph shifts the
+    # residuals (>> shift), so capacities have to be integers
+    @classmethod
+    def from_arrays(cls, num_v, src, dst, cap):
+        cap = np.asarray(cap)
+        if not np.all(cap == np.round(cap)):
+            raise ValueError("Dinic needs integer capacities, use IterativeDinic")
+        d = cls(num_v)
+        for a, b, c in zip(np.asarray(src).tolist(), np.asarray(dst).tolist(), cap.astype(np.int64).tolist()):
+            d.add_edge(a, b, c)
+        return d
         
     # calculate flow that reaches sink
+    # starts from the flow already in self.adj (0 on a new instance), so after
+    # set_capacity / add_edge it only augments the difference. returns the total
     def max_flow(self, source, sink):
-        flow =  0
-        self.q[0] = source
+        self.source, self.sink = source, sink
         for l in range(31):  # noqa: E741  l = 30 maybe faster for random data
             while True:
-                self.lvl = [0] * len(self.q)
-                self.ptr = [0] * len(self.q)
-                qi = 0
-                qe = 1
-                self.lvl[source] = 1
-                while qi < qe and not self.lvl[sink]:
-                    node = self.q[qi]
-                    qi += 1
-                    for edge in self.adj[node]:
-                        if not self.lvl[edge[0]] and (edge[2] - edge[3]) >> (30 - l):
-                            self.q[qe] = edge[0]
-                            qe += 1
-                            self.lvl[edge[0]] = self.lvl[node] + 1
+                self._levels(source, sink, 30 - l)
                 p = self.dfs(source, sink, float('inf'))
                 while p:
-                    flow += p
+                    self.augmentations += 1
                     p = self.dfs(source, sink, float('inf'))
                 
                 if not self.lvl[sink]:
                     break
-        return flow
+        return self.flow_value()
+
+    # BFS level graph over edges with residual >> shift, resets ptr
+    def _levels(self, source, sink, shift):
+        self.lvl = [0] * len(self.q)
+        self.ptr = [0] * len(self.q)
+        self.q[0] = source
+        qi = 0
+        qe = 1
+        self.lvl[source] = 1
+        while qi < qe and not self.lvl[sink]:
+            node = self.q[qi]
+            qi += 1
+            for edge in self.adj[node]:
+                if not self.lvl[edge[0]] and (edge[2] - edge[3]) >> shift:
+                    self.q[qe] = edge[0]
+                    qe += 1
+                    self.lvl[edge[0]] = self.lvl[node] + 1
+
+    # net flow out of the source
+    def flow_value(self):
+        return sum(edge[3] for edge in self.adj[self.source])
+
+    # sends up to limit from a to b over residual edges, returns how much got through
+    def _augment(self, a, b, limit):
+        sent = 0
+        while sent < limit:
+            self._levels(a, b, 0)
+            if not self.lvl[b]:
+                break
+            p = self.dfs(a, b, limit - sent)
+            while p:
+                sent += p
+                p = self.dfs(a, b, limit - sent)
+        return sent
+
+    def set_capacity(self, edge_id, c):
+        '''
+        new capacity for an added edge, keeps the flow feasible (see the
+        docstring at the top). call max_flow(source, sink) again afterwards to
+        get the new maximum, only the difference is augmented
+        '''
+        a, i = self.edges[edge_id]
+        edge = self.adj[a][i]
+        b = edge[0]
+        over = edge[3] - c
+        edge[2] = c
+        if over <= 0 or a == b: # a self loop never carries flow
+            return
+        # take the overflow off the edge: a is left with `over` too much, b short of it
+        edge[3] = c
+        self.adj[b][edge[1]][3] = -c
+        over -= self._augment(a, b, over)
+        if over:
+            # whatever has no other route goes back via the terminals
+            # (never needs more than the overflow)
+            source, sink = self.source, self.sink
+            self.add_edge(source, sink, over)
+            self._augment(a, b, over)
+            self.edges.pop()
+            self.adj[source].pop()
+            self.adj[sink].pop()
     
     def dfs(self, node, sink, flow):
         if node == sink or not flow:
@@ -84,37 +194,287 @@ class Dinic:
             self.ptr[node] = self.ptr[node] + 1
         return 0
 
+    # flow on every added edge, in add_edge order (read off self.adj)
+    def edge_flows(self):
+        return np.array([self.adj[a][i][3] for a, i in self.edges])
+
+    def _edge_columns(self):
+        src = np.array([a for a, _ in self.edges], dtype=np.int64)
+        dst = np.array([self.adj[a][i][0] for a, i in self.edges], dtype=np.int64)
+        return src, dst
+
+    # (source side as a bool array, ids of the cut edges) after max_flow
+    def min_cut(self):
+        side = np.zeros(len(self.lvl), dtype=bool)
+        side[self.source] = True
+        stack = [self.source]
+        while stack:
+            node = stack.pop()
+            for edge in self.adj[node]:
+                if not side[edge[0]] and edge[2] - edge[3] > 0:
+                    side[edge[0]] = True
+                    stack.append(edge[0])
+        src, dst = self._edge_columns()
+        return side, np.nonzero(side[src] & ~side[dst])[0]
+
+    # (paths, cycles), each (indptr, edge ids, amount), see decompose_flow
+    def flow_decomposition(self):
+        src, dst = self._edge_columns()
+        return decompose_flow(len(self.lvl), src, dst, self.edge_flows(), self.source, self.sink)
+
+
+class _ResidualOutputs:
+    '''
+    min cut and flow decomposition for the engines that keep residual arrays
+    (IterativeDinic, PushRelabel): indptr/to/res per arc, src/dst per edge
+    '''
+    def min_cut(self):
+        src = np.asarray(self.src, dtype=np.int64)
+        dst = np.asarray(self.dst, dtype=np.int64)
+        side = _source_side(self.num_v, self.indptr, self.to, self.res, self.source)
+        return side, np.nonzero(side[src] & ~side[dst])[0]
+
+    def flow_decomposition(self):
+        return decompose_flow(self.num_v, np.asarray(self.src, dtype=np.int64),
+                              np.asarray(self.dst, dtype=np.int64), self.edge_flows(),
+                              self.source, self.sink)
+
+
+class IterativeDinic(_ResidualOutputs):
+    '''
+    same algorithm and api as Dinic (add_edge, from_csr, max_flow), without the
+    recursion and without a python list per edge:
+    edges are appended to parallel columns (src, dst, cap, rcap) and turned into
+    the residual arrays of _residual_arrays (CSR by tail, twin per arc) when
+    max_flow runs. lvl/ptr/queue are allocated once and reset in place.
+    blocking flow: an explicit stack of arcs from the source. advance along an
+    admissible arc (lvl goes up by one, residual left), retreat when a vertex has
+    none left (its lvl is zeroed so nobody tries it again this phase), and on
+    reaching the sink augment by the bottleneck and back up only to the tail of
+    the first saturated arc. ptr[v] (current arc) only moves forward within a
+    phase, so every arc is skipped at most once per phase
+    scaling=True keeps the capacity scaling of Dinic.max_flow (its l loop): the
+    phases first only use arcs with residual >= delta, delta = 2^k .. 1
+    '''
+    def __init__(self, num_v):
+        self.num_v = num_v
+        self.src = array('q')
+        self.dst = array('q')
+        self.cap = array('q') # becomes array('d') once a capacity isn't an int
+        self.rcap = array('q')
+        self.res = None # residual per arc after max_flow
+        self.phases = self.augmentations = 0
+
+    # returns the edge id (see edge_flows), like Dinic.add_edge
+    def add_edge(self, a, b, c, rcap=0):
+        if self.cap.typecode == 'q' and not (isinstance(c, (int, np.integer)) and isinstance(rcap, (int, np.integer))):
+            self.cap = array('d', self.cap)
+            self.rcap = array('d', self.rcap)
+        self.src.append(a)
+        self.dst.append(b)
+        self.cap.append(c)
+        self.rcap.append(rcap)
+        return len(self.src) - 1
+
+    @classmethod
+    def from_csr(cls, csr):
+        return cls.from_arrays(csr.num_v, *csr.edge_arrays())
+
+    # edge columns (src[i] -> dst[i], capacity cap[i]), like PushRelabel's constructor
+    @classmethod
+    def from_arrays(cls, num_v, src, dst, cap):
+        d = cls(num_v)
+        src, dst, cap = np.asarray(src), np.asarray(dst), np.asarray(cap)
+        d.src = array('q', src.astype(np.int64).tobytes())
+        d.dst = array('q', dst.astype(np.int64).tobytes())
+        integral = bool(np.all(cap == np.round(cap)))
+        d.cap = array('q', cap.astype(np.int64).tobytes()) if integral else array('d', cap.astype(np.float64).tobytes())
+        d.rcap = array(d.cap.typecode, bytes(len(d.cap) * d.cap.itemsize))
+        return d
+
+    def _build(self):
+        self.indptr, self.to, self.twin, arc_cap, self.arc_of = _residual_arrays(
+            self.num_v, np.frombuffer(self.src, dtype=np.int64), np.frombuffer(self.dst, dtype=np.int64),
+            np.array(self.cap), np.array(self.rcap))
+        self.arc_cap = arc_cap
+        self.res = arc_cap.tolist()
+
+    def max_flow(self, source, sink, scaling=False):
+        self.source, self.sink = source, sink
+        self._build()
+        n = self.num_v
+        deltas = [0]
+        if scaling:
+            top = max(self.cap, default=0)
+            delta = 1
+            while delta * 2 <= top:
+                delta *= 2
+            deltas = []
+            while delta >= 1:
+                deltas.append(delta)
+                delta //= 2
+            if self.cap.typecode == 'd':
+                deltas.append(0) # non-integer leftovers below 1
+        self._zeros = [0] * n
+        self.lvl = [0] * n
+        self.ptr = [0] * n
+        self.q = [0] * n
+        self.phases = self.augmentations = 0
+        flow = 0
+        if source == sink:
+            return flow
+        for delta in deltas:
+            while self._levels(source, sink, delta):
+                self.phases += 1
+                flow += self._blocking_flow(source, sink, delta)
+        return flow
+
+    # BFS levels over arcs with residual > 0 (and >= delta), True if the sink got one
+    def _levels(self, source, sink, delta):
+        indptr, to, res, lvl, q = self.indptr, self.to, self.res, self.lvl, self.q
+        lvl[:] = self._zeros
+        self.ptr[:] = indptr[:-1]
+        lvl[source] = 1
+        q[0] = source
+        qi, qe = 0, 1
+        while qi < qe and not lvl[sink]:
+            node = q[qi]
+            qi += 1
+            next_lvl = lvl[node] + 1
+            for e in range(indptr[node], indptr[node + 1]):
+                r = res[e]
+                if r and r >= delta and not lvl[to[e]]:
+                    lvl[to[e]] = next_lvl
+                    q[qe] = to[e]
+                    qe += 1
+        return lvl[sink] != 0
+
+    def _blocking_flow(self, source, sink, delta):
+        indptr, to, twin, res, lvl, ptr = self.indptr, self.to, self.twin, self.res, self.lvl, self.ptr
+        total = 0
+        stack = [] # arcs of the current path from the source
+        v = source
+        while True:
+            if v == sink:
+                # augment by the bottleneck, then back up to the first saturated arc
+                p = min(res[e] for e in stack)
+                cut = -1
+                for i, e in enumerate(stack):
+                    res[e] -= p
+                    res[twin[e]] += p
+                    if cut == -1 and not res[e]:
+                        cut = i
+                total += p
+                self.augmentations += 1
+                del stack[cut:] # the bottleneck arc itself is always left at exactly 0
+                v = to[stack[-1]] if stack else source
+                continue
+            e = ptr[v]
+            end = indptr[v + 1]
+            want = lvl[v] + 1
+            while e < end:
+                r = res[e]
+                if r and r >= delta and lvl[to[e]] == want:
+                    break
+                e += 1
+            ptr[v] = e
+            if e < end:
+                stack.append(e)
+                v = to[e]
+                continue
+            # dead end: retreat
+            lvl[v] = 0
+            if v == source:
+                return total
+            e = stack.pop()
+            v = to[twin[e]]
+            ptr[v] += 1
+
+    # flow on every added edge, in add_edge order
+    def edge_flows(self):
+        res = np.asarray(self.res)
+        return self.arc_cap[self.arc_of] - res[self.arc_of]
 
-# Here we make a graphs with 10 vertex(source and sink includes)
-graph = Dinic(10)
-source = 0
-sink = 9
-"""
-Now we add the vertices next to the font in the font with 1 capacity in this edge
-(source -> source vertices)
-"""
-for vertex in range(1, 5):
-    graph.add_edge(source, vertex, 1)
-"""
-We will do the same thing for the vertices near the sink, but from vertex to sink
-(sink vertices -> sink)
-"""
-for vertex in range(5, 9):
-    graph.add_edge(vertex, sink, 1)
-"""
-Finally we add the verices near the sink to the vertices near the source.
-(source vertices -> sink vertices)
-"""
-for vertex in range(1, 5):
-    graph.add_edge(vertex, vertex + 4, 1)
- 
-# Now we can know what the maximum flow(source -> sink) is
-print(graph.max_flow(source, sink))
 
 '''-----------------------------------------------------------------------------
 Edmonds-Karp: Nearly identical to Ford-Fulkerson
+Ford-Fulkerson augments along any s -> t path in the residual graph,
+Edmonds-Karp always takes a SHORTEST one (BFS), which bounds the number of
+augmentations by O(V*E) whatever the capacities, O(V*E^2) overall.
+Dinic does the same shortest-path augmenting, but all paths of one length per
+BFS (blocking flow), that's the whole difference
 
+EdmondsKarp below works on the residual arrays of _residual_arrays (see the
+Push-Relabel section), one BFS per augmenting path
+
+Executors: FlowNetwork runs anything derived from MaximumFlowAlgorithmExecutor:
+    PushRelabelExecutor        -> relabel-to-front on the V x V matrices
+    EdmondsKarpExecutor        -> EdmondsKarp
+    DinicExecutor              -> Dinic (recursive, integer capacities)
+    IterativeDinicExecutor     -> IterativeDinic
+    SparsePushRelabelExecutor  -> PushRelabel
+    AutoMaximumFlowExecutor    -> PushRelabel or IterativeDinic, by density and
+                                  capacities (choose_engine, see Max_Flow_Benchmark.py)
 '''
+class EdmondsKarp(_ResidualOutputs):
+    def __init__(self, num_v, src, dst, cap):
+        self.num_v = num_v
+        self.src = np.asarray(src, dtype=np.int64)
+        self.dst = np.asarray(dst, dtype=np.int64)
+        self.indptr, self.to, self.twin, self.cap, self.arc_of = _residual_arrays(num_v, src, dst, cap)
+        self.res = None # residual capacities after max_flow
+        self.augmentations = 0
+
+    @classmethod
+    def from_arrays(cls, num_v, src, dst, cap):
+        return cls(num_v, src, dst, cap)
+
+    def max_flow(self, source, sink):
+        self.source, self.sink = source, sink
+        indptr, to, twin = self.indptr, self.to, self.twin
+        self.res = res = self.cap.tolist()
+        self.augmentations = 0
+        flow = 0
+        if source == sink:
+            return flow
+        parent = [-1] * self.num_v # arc the BFS came in by
+        while True:
+            for v in range(self.num_v):
+                parent[v] = -1
+            parent[source] = -2
+            queue = [source]
+            for v in queue:
+                for e in range(indptr[v], indptr[v + 1]):
+                    w = to[e]
+                    if parent[w] == -1 and res[e] > 0:
+                        parent[w] = e
+                        queue.append(w)
+                if parent[sink] != -1:
+                    break
+            if parent[sink] == -1:
+                return flow
+            # bottleneck, walking back from the sink
+            p = float('inf')
+            v = sink
+            while v != source:
+                e = parent[v]
+                p = min(p, res[e])
+                v = to[twin[e]]
+            v = sink
+            while v != source:
+                e = parent[v]
+                res[e] -= p
+                res[twin[e]] += p
+                v = to[twin[e]]
+            flow += p
+            self.augmentations += 1
+
+    # flow on every input edge, in input order
+    def edge_flows(self):
+        res = np.asarray(self.res)
+        return self.cap[self.arc_of] - res[self.arc_of]
+
+
 class FlowNetwork:
     def __init__(self, graph, sources, sinks):
         self.sourceIndex = None
@@ -127,9 +487,9 @@ class FlowNetwork:
  
     # make only one source and one sink
     def _normalizeGraph(self, sources, sinks):
-        if sources is int:
+        if isinstance(sources, int):
             sources = [sources]
-        if sinks is int:
+        if isinstance(sinks, int):
             sinks = [sinks]
  
         if len(sources) == 0 or len(sinks) == 0:
@@ -172,6 +532,15 @@ class FlowNetwork:
  
     def setMaximumFlowAlgorithm(self, Algorithm):
         self.maximumFlowAlgorithm = Algorithm(self)
+
+    # both run the algorithm first if needed, see MaximumFlowAlgorithmExecutor
+    def findMinimumCut(self):
+        self.findMaximumFlow()
+        return self.maximumFlowAlgorithm.getMinimumCut()
+
+    def findFlowDecomposition(self):
+        self.findMaximumFlow()
+        return self.maximumFlowAlgorithm.getFlowDecomposition()
  
  
 class FlowNetworkAlgorithmExecutor:
@@ -206,6 +575,17 @@ class MaximumFlowAlgorithmExecutor(FlowNetworkAlgorithmExecutor):
             raise Exception("You should execute algorithm before using its result!")
  
         return self.maximumFlow
+
+    # every executor also has, like _algorithm, its own:
+    # getEdgeFlows() -> (src, dst, flow) arrays, one entry per edge of the network
+    # getMinimumCut() -> (source side bool array, ids of the cut edges into them)
+
+    # (paths, cycles), edge ids index getEdgeFlows' arrays, see decompose_flow
+    def getFlowDecomposition(self):
+        if not self.executed:
+            raise Exception("You should execute algorithm before using its result!")
+        src, dst, flow = self.getEdgeFlows()
+        return decompose_flow(self.verticesCount, src, dst, flow, self.sourceIndex, self.sinkIndex)
  
  
 class PushRelabelExecutor(MaximumFlowAlgorithmExecutor):
@@ -285,24 +665,957 @@ class PushRelabelExecutor(MaximumFlowAlgorithmExecutor):
  
         if minHeight is not None:
             self.heights[vertexIndex] = minHeight + 1
- 
-entrances = [0]
-exits = [3]
-# graph = [
-#     [0, 0, 4, 6, 0, 0],
-#     [0, 0, 5, 2, 0, 0],
-#     [0, 0, 0, 0, 4, 4],
-#     [0, 0, 0, 0, 6, 6],
-#     [0, 0, 0, 0, 0, 0],
-#     [0, 0, 0, 0, 0, 0],
-# ]
-graph = [[0, 7, 0, 0], [0, 0, 6, 0], [0, 0, 0, 8], [9, 0, 0, 0]]
- 
-# prepare our network
-flowNetwork = FlowNetwork(graph, entrances, exits)
-# set algorithm
-flowNetwork.setMaximumFlowAlgorithm(PushRelabelExecutor)
-# and calculate
-maximumFlow = flowNetwork.findMaximumFlow()
- 
-print(f"maximum flow is {maximumFlow}")
\ No newline at end of file
+
+    # read off the preflow matrix (a proper flow once relabel-to-front is done)
+    def getEdgeFlows(self):
+        if not self.executed:
+            raise Exception("You should execute algorithm before using its result!")
+        graph = np.asarray(self.graph)
+        src, dst = np.nonzero(graph)
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+        preflow = np.asarray(self.preflow)
+        # preflow[i][j] is the net flow i -> j, it sits on the i -> j edge
+        return src, dst, np.minimum(np.maximum(preflow[src, dst], 0), graph[src, dst])
+
+    def getMinimumCut(self):
+        if not self.executed:
+            raise Exception("You should execute algorithm before using its result!")
+        residual = np.asarray(self.graph) - np.asarray(self.preflow) > 0
+        side = np.zeros(self.verticesCount, dtype=bool)
+        side[self.sourceIndex] = True
+        frontier = np.array([self.sourceIndex])
+        while len(frontier):
+            reached = residual[frontier].any(axis=0) & ~side
+            side |= reached
+            frontier = np.nonzero(reached)[0]
+        src, dst, _ = self.getEdgeFlows()
+        return side, np.nonzero(side[src] & ~side[dst])[0]
+
+'''-----------------------------------------------------------------------------
+Push-Relabel on residual adjacency arrays (highest-label, global relabel, gap)
+
+PushRelabelExecutor above keeps V x V preflow/graph matrices and scans all V
+columns per vertex, so it stops at a few thousand nodes. PushRelabel works on
+the edges only:
+
+residual arrays, CSR by tail (see _residual_arrays):
+    indptr[v]..indptr[v+1] -> the arcs out of v
+    to[e]   -> head of arc e
+    twin[e] -> the reverse arc of e (every edge a -> b, c is an arc a -> b with
+               capacity c plus an arc b -> a with capacity 0)
+    res[e]  -> residual capacity, pushing p along e is res[e] -= p, res[twin[e]] += p
+    arc_of[i] -> the forward arc of input edge i
+a vertex is active when it has excess (more flow in than out) and is neither
+source nor sink. d[v] is a lower bound on the residual distance from v to the
+sink, flow is only pushed downhill (d[v] == d[w] + 1)
+
+highest-label: always discharge an active vertex with the largest d. active
+vertices sit in buckets[d], so picking the next one is O(1) amortized
+global relabel: every so often set d to the exact residual distance to the sink
+(BFS from the sink over reversed residual arcs). the local relabels drift far
+below the true distances and this is what keeps the number of pushes down
+gap: if no vertex is left at some height h < V, nothing above h can reach the
+sink anymore, lift them all to V straight away (vertices at every height are
+kept in doubly linked lists so this costs only the lifted vertices)
+
+phase 1 ends with the max flow value as excess at the sink (and a min cut), the
+leftover excess then goes back to the source (phase 2, same loop towards the
+source with heights from V up), leaving a proper flow on every edge
+'''
+class PushRelabel(_ResidualOutputs):
+    def __init__(self, num_v, src, dst, cap):
+        self.num_v = num_v
+        self.src = np.asarray(src, dtype=np.int64)
+        self.dst = np.asarray(dst, dtype=np.int64)
+        self.indptr, self.to, self.twin, self.cap, self.arc_of = _residual_arrays(num_v, src, dst, cap)
+        self.res = None # residual capacities after max_flow
+        self.pushes = self.relabels = self.global_relabels = 0
+
+    @classmethod
+    def from_arrays(cls, num_v, src, dst, cap):
+        return cls(num_v, src, dst, cap)
+
+    # dense capacity matrix, like FlowNetwork's graph
+    @classmethod
+    def from_matrix(cls, matrix):
+        return cls(*_matrix_edges(matrix))
+
+    # relabel_freq -> global relabel after about relabel_freq * V + E work
+    def max_flow(self, source, sink, relabel_freq=6):
+        n = self.num_v
+        self.source, self.sink = source, sink
+        indptr, to, twin = self.indptr, self.to, self.twin
+        res = self.cap.tolist()
+        self.res = res
+        self.d = [0] * n
+        self.excess = ex = [0] * n
+        self.pushes = self.relabels = self.global_relabels = 0
+        if source == sink:
+            return 0
+        # saturate everything out of the source
+        for e in range(indptr[source], indptr[source + 1]):
+            c = res[e]
+            if c > 0:
+                res[e] = 0
+                res[twin[e]] += c
+                ex[to[e]] += c
+                ex[source] -= c
+        self._discharge_all(source, sink, source, sink, 0, n, relabel_freq)
+        flow = ex[sink]
+        # phase 2: excess stuck below the cut goes back to the source
+        self._discharge_all(source, sink, sink, source, n, 2 * n, relabel_freq)
+        return flow
+
+    def _discharge_all(self, source, sink, s, t, base, limit, relabel_freq):
+        '''
+        highest-label loop towards t, heights in [base, limit), limit = given up
+        the gap heuristic only makes sense in phase 1 (base 0)
+        '''
+        n = self.num_v
+        indptr, to, twin, res, d, ex = self.indptr, self.to, self.twin, self.res, self.d, self.excess
+        m = len(to)
+        use_gap = base == 0
+        cur = indptr[:-1]
+        buckets = [[] for _ in range(limit - base + 1)]
+        # all vertices by height (for the gap), doubly linked: heads[h], nxt, prv
+        # top[0] = highest height that may have linked vertices
+        heads = [-1] * (n + 1)
+        nxt = [-1] * n
+        prv = [-1] * n
+        top = [0]
+
+        def global_relabel():
+            self.global_relabels += 1
+            for v in range(n):
+                d[v] = limit
+            d[t] = base
+            queue = [t]
+            for w in queue: # BFS backwards: arc u -> w is twin of an arc w -> u
+                dw = d[w] + 1
+                for e in range(indptr[w], indptr[w + 1]):
+                    u = to[e]
+                    if d[u] == limit and res[twin[e]] > 0 and u != s:
+                        d[u] = dw
+                        queue.append(u)
+            d[s] = limit
+            for b in buckets:
+                b.clear()
+            highest = -1
+            if use_gap:
+                for h in range(n + 1):
+                    heads[h] = -1
+                top[0] = 0
+            for u in queue:
+                if u == t:
+                    continue
+                h = d[u] - base
+                if ex[u] > 0:
+                    buckets[h].append(u)
+                    highest = max(highest, h)
+                if use_gap:
+                    link(u, d[u])
+            return highest
+
+        def link(u, h):
+            if h > top[0]:
+                top[0] = h
+            nxt[u] = heads[h]
+            prv[u] = -1
+            if heads[h] != -1:
+                prv[heads[h]] = u
+            heads[h] = u
+
+        def unlink(u, h):
+            if prv[u] != -1:
+                nxt[prv[u]] = nxt[u]
+            else:
+                heads[h] = nxt[u]
+            if nxt[u] != -1:
+                prv[nxt[u]] = prv[u]
+
+        highest = global_relabel()
+        work = 0
+        threshold = relabel_freq * n + m
+        while highest >= 0:
+            bucket = buckets[highest]
+            if not bucket:
+                highest -= 1
+                continue
+            v = bucket.pop()
+            if d[v] - base != highest or ex[v] <= 0:
+                continue # lifted by a gap, or already emptied
+            # discharge v
+            dv = d[v]
+            e = cur[v]
+            end = indptr[v + 1]
+            while ex[v] > 0:
+                if e == end:
+                    # relabel: 1 + lowest neighbor over residual arcs
+                    self.relabels += 1
+                    work += 12 + end - indptr[v]
+                    low = limit
+                    for a in range(indptr[v], end):
+                        if res[a] > 0 and d[to[a]] < low:
+                            low = d[to[a]]
+                            e = a
+                    old = dv
+                    dv = low + 1 if low < limit else limit
+                    if use_gap:
+                        unlink(v, old)
+                        if heads[old] == -1 and old < n:
+                            # gap at old: nothing above it reaches the sink
+                            for h in range(old + 1, top[0] + 1):
+                                u = heads[h]
+                                while u != -1:
+                                    d[u] = n
+                                    u = nxt[u]
+                                heads[h] = -1
+                            top[0] = old - 1
+                            dv = n
+                        elif dv < n:
+                            link(v, dv)
+                    d[v] = dv
+                    if dv >= limit:
+                        break
+                    continue
+                w = to[e]
+                if res[e] > 0 and dv == d[w] + 1:
+                    p = ex[v] if ex[v] < res[e] else res[e]
+                    res[e] -= p
+                    res[twin[e]] += p
+                    ex[v] -= p
+                    if ex[w] == 0 and w != s and w != t:
+                        buckets[d[w] - base].append(w)
+                        if d[w] - base > highest: # v may have been relabeled above highest
+                            highest = d[w] - base
+                    ex[w] += p
+                    self.pushes += 1
+                else:
+                    e += 1
+            cur[v] = e if e < end else indptr[v]
+            if work > threshold:
+                work = 0
+                highest = global_relabel()
+                cur = indptr[:-1]
+
+    # flow on every input edge, in input order (cap - residual of its forward arc)
+    def edge_flows(self):
+        res = np.asarray(self.res)
+        return self.cap[self.arc_of] - res[self.arc_of]
+
+
+# (num_v, src, dst, cap) of the nonzero entries of a capacity matrix, loops dropped
+def _matrix_edges(matrix):
+    mat = np.asarray(matrix)
+    src, dst = np.nonzero(mat)
+    keep = src != dst
+    return len(mat), src[keep], dst[keep], mat[src[keep], dst[keep]]
+
+# edges (src[i] -> dst[i], capacity cap[i]) as residual arcs grouped by tail
+# rcap -> capacity of the reverse arcs (like Dinic.add_edge), default 0
+# returns indptr, to, twin (lists, the inner loops index them one at a time),
+# cap (numpy, per arc) and arc_of (numpy, input edge -> forward arc)
+def _residual_arrays(num_v, src, dst, cap, rcap=None):
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    cap = np.asarray(cap)
+    m = len(src)
+    tails = np.concatenate((src, dst))
+    heads = np.concatenate((dst, src))
+    caps = np.concatenate((cap, np.zeros(m, dtype=cap.dtype) if rcap is None else np.asarray(rcap, dtype=cap.dtype)))
+    order = np.argsort(tails, kind='stable')
+    position = np.empty(2 * m, dtype=np.int64)
+    position[order] = np.arange(2 * m)
+    partner = np.concatenate((np.arange(m, 2 * m), np.arange(m))) # arc i <-> arc i + m
+    indptr = np.zeros(num_v + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=num_v), out=indptr[1:])
+    twin = position[partner][order]
+    return indptr.tolist(), heads[order].tolist(), twin.tolist(), caps[order], position[:m]
+
+
+# bool mask of the vertices reachable from source over arcs with residual left
+def _source_side(num_v, indptr, to, res, source):
+    side = bytearray(num_v)
+    side[source] = 1
+    stack = [source]
+    while stack:
+        v = stack.pop()
+        for e in range(indptr[v], indptr[v + 1]):
+            if res[e] > 0 and not side[to[e]]:
+                side[to[e]] = 1
+                stack.append(to[e])
+    return np.frombuffer(bytes(side), dtype=np.uint8).astype(bool)
+
+def decompose_flow(num_v, src, dst, flow, source, sink):
+    '''
+    splits a flow (flow[i] on edge src[i] -> dst[i]) into source -> sink paths and
+    cycles. returns (paths, cycles), each (indptr, edges, amount) numpy arrays:
+    path p is edges[indptr[p]:indptr[p+1]] in order and carries amount[p]
+    leftovers that don't balance (float rounding) are dropped at dead ends
+    '''
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    flow = np.asarray(flow)
+    order = np.argsort(src, kind='stable')
+    order = order[flow[order] > 0]
+    out_edges = order.tolist() # edges with flow, grouped by tail
+    ptr = np.searchsorted(src[order], np.arange(num_v)).tolist()
+    end = np.searchsorted(src[order], np.arange(num_v), side='right').tolist()
+    left = flow.tolist()
+    src_l, dst_l = src.tolist(), dst.tolist()
+    found = ([[0], [], []], [[0], [], []]) # (indptr, edges, amount) for paths, cycles
+
+    def next_edge(v):
+        i = ptr[v]
+        while i < end[v] and left[out_edges[i]] <= 0:
+            i += 1
+        ptr[v] = i
+        return out_edges[i] if i < end[v] else -1
+
+    def take(kind, edges):
+        amount = min(left[e] for e in edges)
+        for e in edges:
+            left[e] -= amount
+        indptr, ids, amounts = found[kind]
+        ids.extend(edges)
+        indptr.append(len(ids))
+        amounts.append(amount)
+
+    def walk(start, to_sink):
+        # one walk from start, peels off every cycle it closes; False once start is dry
+        walk_edges = []
+        pos = {start: 0}
+        v = start
+        while True:
+            if to_sink and v == sink and walk_edges:
+                take(0, walk_edges)
+                return True
+            e = next_edge(v)
+            if e == -1:
+                if not walk_edges:
+                    return False
+                e = walk_edges.pop() # dead end, drop what is left on the way in
+                left[e] = 0
+                del pos[v]
+                v = src_l[e]
+                continue
+            w = dst_l[e]
+            walk_edges.append(e)
+            if w in pos:
+                i = pos[w]
+                cycle = walk_edges[i:]
+                take(1, cycle)
+                for c in cycle[:-1]:
+                    del pos[dst_l[c]]
+                del walk_edges[i:]
+                v = w
+                if not to_sink and not walk_edges:
+                    return True
+                continue
+            pos[w] = len(walk_edges)
+            v = w
+
+    if source != sink:
+        while walk(source, True):
+            pass
+    for v in range(num_v): # whatever is left is circulation
+        while walk(v, False):
+            pass
+    return tuple((np.array(indptr, dtype=np.int64), np.array(ids, dtype=np.int64), np.array(amounts))
+                 for indptr, ids, amounts in found)
+
+
+class EngineExecutor(MaximumFlowAlgorithmExecutor):
+    '''
+    one of the array engines behind the FlowNetwork plug-in point, eg
+        flowNetwork.setMaximumFlowAlgorithm(SparsePushRelabelExecutor)
+    subclasses only set Engine (anything with from_arrays and max_flow)
+    '''
+    Engine = None
+
+    def _algorithm(self):
+        self.engine = self._engine_for(*_matrix_edges(self.graph))
+        self.maximumFlow = self.engine.max_flow(self.sourceIndex, self.sinkIndex)
+
+    def _engine_for(self, num_v, src, dst, cap):
+        return self.Engine.from_arrays(num_v, src, dst, cap)
+
+    def getEdgeFlows(self):
+        if not self.executed:
+            raise Exception("You should execute algorithm before using its result!")
+        return self.engine.src, self.engine.dst, self.engine.edge_flows()
+
+    def getMinimumCut(self):
+        if not self.executed:
+            raise Exception("You should execute algorithm before using its result!")
+        return self.engine.min_cut()
+
+
+class SparsePushRelabelExecutor(EngineExecutor):
+    Engine = PushRelabel
+
+
+class EdmondsKarpExecutor(EngineExecutor):
+    Engine = EdmondsKarp
+
+
+class DinicExecutor(EngineExecutor):
+    Engine = Dinic
+
+    def getEdgeFlows(self):
+        if not self.executed:
+            raise Exception("You should execute algorithm before using its result!")
+        src, dst = self.engine._edge_columns()
+        return src, dst, self.engine.edge_flows()
+
+
+class IterativeDinicExecutor(EngineExecutor):
+    Engine = IterativeDinic
+
+
+# engine for a network of num_v vertices with capacities cap (one per edge)
+# measured with Max_Flow_Benchmark.py: the iterative Dinic wins on unit
+# capacities (matchings, O(sqrt(V)) phases) and on dense graphs (E >= V^2/4,
+# few short phases over long adjacency rows, 2x at V = 800), push-relabel on
+# everything sparse (grids ~1.4x, layered about even). Edmonds-Karp never wins
+def choose_engine(num_v, cap):
+    cap = np.asarray(cap)
+    if (cap == 1).all() or len(cap) >= num_v * num_v / 4:
+        return IterativeDinic
+    return PushRelabel
+
+
+class AutoMaximumFlowExecutor(EngineExecutor):
+    def _engine_for(self, num_v, src, dst, cap):
+        return choose_engine(num_v, cap).from_arrays(num_v, src, dst, cap)
+
+
+
+class SparseFlowNetwork:
+    '''
+    edges -> (src, dst, capacity) triples, or a (src, dst, cap) tuple of arrays
+    sources, sinks -> a vertex id or a list of them
+    with one source and one sink they are used as they are, otherwise a virtual
+    terminal is added on that side (see the docstring at the top)
+    engines: anything with from_arrays(num_v, src, dst, cap) and
+    max_flow(source, sink), ie PushRelabel and IterativeDinic
+    '''
+    def __init__(self, num_v, edges, sources, sinks):
+        if isinstance(edges, tuple) and len(edges) == 3 and np.ndim(edges[0]) == 1:
+            src, dst, cap = (np.asarray(col) for col in edges)
+        else:
+            triples = list(edges)
+            src = np.array([e[0] for e in triples], dtype=np.int64)
+            dst = np.array([e[1] for e in triples], dtype=np.int64)
+            cap = np.array([e[2] for e in triples])
+        if isinstance(sources, int):
+            sources = [sources]
+        if isinstance(sinks, int):
+            sinks = [sinks]
+        sources = np.unique(np.asarray(sources, dtype=np.int64))
+        sinks = np.unique(np.asarray(sinks, dtype=np.int64))
+        if not len(sources) or not len(sinks):
+            raise ValueError("need at least one source and one sink")
+        if np.intersect1d(sources, sinks).size:
+            raise ValueError("a vertex can't be both a source and a sink")
+        self.input_v, self.input_e = num_v, len(src)
+        self.num_v = num_v
+        unlimited = cap.sum() + 1 if len(cap) else 1
+        extra_src, extra_dst = [src], [dst]
+        if len(sources) > 1:
+            self.source = self.num_v
+            self.num_v += 1
+            extra_src.append(np.full(len(sources), self.source))
+            extra_dst.append(sources)
+        else:
+            self.source = int(sources[0])
+        if len(sinks) > 1:
+            self.sink = self.num_v
+            self.num_v += 1
+            extra_src.append(sinks)
+            extra_dst.append(np.full(len(sinks), self.sink))
+        else:
+            self.sink = int(sinks[0])
+        self.src = np.concatenate(extra_src).astype(np.int64)
+        self.dst = np.concatenate(extra_dst).astype(np.int64)
+        self.cap = np.concatenate((cap, np.full(len(self.src) - len(src), unlimited, dtype=cap.dtype)))
+        self.engine = None
+
+    def max_flow(self, Engine=None, **options):
+        '''
+        Engine -> PushRelabel (default), IterativeDinic, EdmondsKarp or 'auto'
+        (choose_engine), options go to its max_flow
+        the engine stays in self.engine for its counters
+        '''
+        Engine = PushRelabel if Engine is None else Engine
+        if Engine == 'auto':
+            Engine = choose_engine(self.num_v, self.cap)
+        self.engine = Engine.from_arrays(self.num_v, self.src, self.dst, self.cap)
+        return self.engine.max_flow(self.source, self.sink, **options)
+
+    # flow on the input edges, in input order
+    def edge_flows(self):
+        return self.engine.edge_flows()[:self.input_e]
+
+    # (source side over the input vertices, ids of the cut edges)
+    def min_cut(self):
+        side, cut = self.engine.min_cut()
+        return side[:self.input_v], cut
+
+    # (paths, cycles) as in decompose_flow, paths run from a source to a sink
+    # over input edges only (the virtual first/last edges are dropped)
+    def flow_decomposition(self):
+        found = decompose_flow(self.num_v, self.src, self.dst, self.engine.edge_flows(),
+                               self.source, self.sink)
+        kept = []
+        for indptr, edges, amount in found:
+            keep = edges < self.input_e
+            before = np.concatenate(([0], np.cumsum(keep)))
+            kept.append((before[indptr], edges[keep], amount))
+        return tuple(kept)
+
+
+'''-----------------------------------------------------------------------------
+Min-cost flow: every edge has a capacity AND a cost per unit of flow, find the
+maximum flow (or a given amount) that costs the least
+
+MinCostFlow keeps the add_edge(a, b, capacity, cost) columns of IterativeDinic
+plus a cost column. the residual arcs are the same (_residual_arrays), a
+reverse arc costs -cost: sending flow back refunds it
+
+successive shortest paths (default):
+always augment along a CHEAPEST residual path from source to sink. costs can be
+negative, so first potentials h: Johnson_APSP.potentials (a negative cost
+cycle is a ValueError). then, as there, reduced costs c(u, v) + h[u] - h[v]
+are >= 0 on every residual arc and each shortest path search runs on them
+(numpy rounds over the improved vertices, nothing past the sink's distance is
+expanded). after it h[v] += min(dist[v], dist[sink]) keeps them >= 0, and every
+arc on a shortest path now has reduced cost 0.
+the search is label-correcting, not Dijkstra: a heap in python settles one
+vertex per step, the numpy rounds relax thousands of arcs per call and win
+(with reduced costs >= 0 they still stop after few rounds)
+so instead of one path per search, augment along every path of 0 reduced cost
+arcs (DFS with current-arc pointers, like a Dinic blocking flow) until none is
+left, then the next search. on unit-ish capacities that is a handful of
+searches instead of one per unit of flow
+
+cost scaling (scaling=True, integer costs):
+first any maximum flow (PushRelabel), then make it cheapest without changing
+its value (a min-cost circulation on its residual graph, Goldberg-Tarjan).
+prices p, reduced cost c(u, v) + p[u] - p[v], the flow is eps-optimal when no
+residual arc has reduced cost below -eps. with costs multiplied by V + 1, 1-optimal
+means optimal. start with eps = max cost, then per round eps /= 4 and refine:
+saturate every residual arc with negative reduced cost (that leaves excess at
+some vertices, deficits at others) and push-relabel the excess away along arcs
+with negative reduced cost, relabel(v) = p[v] <- max(p[w] - c(v, w)) - eps.
+O(log(V*C)) rounds, no shortest path searches at all. a negative cycle is
+simply cancelled here (saturated), not refused
+global price update (like PushRelabel's global relabel): at the start of a
+refine and after every V relabels, lower all prices at once by the eps steps
+each vertex is away from a deficit (see _price_update). without it the local
+relabels crawl, 3-4 times as many of them
+
+limit -> send at most that much (a virtual vertex in front of the source with a
+single edge of that capacity)
+self loops never carry flow
+'''
+class MinCostFlow:
+    def __init__(self, num_v):
+        self.num_v = num_v
+        self.src = array('q')
+        self.dst = array('q')
+        self.cap = array('q') # both become array('d') once a value isn't an int
+        self.cost = array('q')
+        self.res = None # residual per arc after min_cost_flow
+        self.searches = self.augmentations = self.relabels = 0
+
+    # returns the edge id (see edge_flows)
+    def add_edge(self, a, b, c, cost):
+        self.cap = _widen(self.cap, c)
+        self.cost = _widen(self.cost, cost)
+        self.src.append(a)
+        self.dst.append(b)
+        self.cap.append(c)
+        self.cost.append(cost)
+        return len(self.src) - 1
+
+    @classmethod
+    def from_arrays(cls, num_v, src, dst, cap, cost):
+        m = cls(num_v)
+        m.src = array('q', np.asarray(src).astype(np.int64).tobytes())
+        m.dst = array('q', np.asarray(dst).astype(np.int64).tobytes())
+        m.cap, m.cost = (_column(values) for values in (cap, cost))
+        return m
+
+    def _build(self, source, limit):
+        n = self.num_v
+        src = np.frombuffer(self.src, dtype=np.int64)
+        dst = np.frombuffer(self.dst, dtype=np.int64)
+        cap = np.where(src == dst, 0, np.array(self.cap)) # loops carry nothing
+        cost = np.array(self.cost)
+        if limit is not None:
+            src, dst = np.append(src, n), np.append(dst, source)
+            cap, cost = np.append(cap, limit), np.append(cost, 0)
+            source, n = n, n + 1
+        self.n = n
+        self.indptr, self.to, self.twin, self.arc_cap, self.arc_of = _residual_arrays(n, src, dst, cap)
+        arc_cost = np.zeros(len(self.arc_cap), dtype=cost.dtype)
+        arc_cost[self.arc_of] = cost
+        arc_cost[np.asarray(self.twin, dtype=np.int64)[self.arc_of]] = -cost
+        self.arc_cost = arc_cost
+        self.res = self.arc_cap.tolist()
+        self._columns = src, dst, cap, cost
+        return source
+
+    def min_cost_flow(self, source, sink, limit=None, scaling=False):
+        '''
+        returns (flow, cost): the maximum flow from source to sink (or limit, if
+        less is possible) at the least total cost. per-edge flows: edge_flows()
+        '''
+        self.searches = self.augmentations = self.relabels = 0
+        start = self._build(source, limit)
+        if source == sink:
+            self.res = self.arc_cap.tolist()
+            return 0, 0
+        if scaling:
+            if self.arc_cost.dtype.kind == 'f':
+                raise ValueError("cost scaling needs integer costs")
+            flow = self._cost_scaling(start, sink)
+        else:
+            flow = self._successive_shortest_paths(start, sink)
+        cost = self.edge_flows() @ np.array(self.cost)
+        return flow, cost.item()
+
+    # flow on every added edge, in add_edge order
+    def edge_flows(self):
+        res = np.asarray(self.res)
+        return (self.arc_cap[self.arc_of] - res[self.arc_of])[:len(self.src)]
+
+    # h for the reduced costs (0 if no cost is negative): Johnson_APSP.potentials,
+    # ie Bellman-Ford from a virtual vertex, so a negative cycle ANYWHERE is
+    # found (shortest paths would never cancel it). imported here, plain max flow
+    # doesn't need Johnson_APSP (and its Dijkstra_Batch process pool)
+    def _potentials(self):
+        from Johnson_APSP import potentials
+        src, dst, cap, cost = self._columns
+        if not len(cost) or cost.min() >= 0:
+            return np.zeros(self.n)
+        keep = cap > 0
+        g = CSRGraph.from_arrays(src[keep], dst[keep], cost[keep].astype(np.float64), self.n)
+        try:
+            return potentials(g)
+        except ValueError as error:
+            raise ValueError("%s, use scaling=True" % error) from None
+
+    def _successive_shortest_paths(self, source, sink):
+        n = self.n
+        indptr = np.asarray(self.indptr, dtype=np.int64)
+        to = np.asarray(self.to, dtype=np.int64)
+        twin = np.asarray(self.twin, dtype=np.int64)
+        tails = np.repeat(np.arange(n), np.diff(indptr))
+        cost = self.arc_cost.astype(np.float64)
+        res = self.arc_cap.copy()
+        h = np.array(self._potentials(), dtype=np.float64)
+        # reduced costs this close to 0 count as 0 with float costs
+        tol = 0 if self.arc_cost.dtype.kind != 'f' else 1e-9 * (1 + float(np.abs(cost).max(initial=0)))
+        arcs = (indptr, to, twin, tails, cost)
+        cost_list = cost.tolist()
+        flow = 0
+        while True:
+            self.searches += 1
+            dist = _reduced_distances(arcs, res, h, source, sink)
+            if dist[sink] == np.inf:
+                break
+            # h[v] += min(dist[v], dist[sink]): reduced costs stay >= 0 and are 0 on every shortest path
+            h += np.minimum(dist, dist[sink])
+            useful = _zero_cost_reach(arcs, res, h, sink, tol)
+            flow += self._zero_cost_paths(source, sink, res, h.tolist(), cost_list, useful, tol)
+        self.res = res.tolist()
+        return flow
+
+    # augments along paths of 0 reduced cost arcs inside useful until there are
+    # none, returns the amount. res is the numpy column, updated in place
+    def _zero_cost_paths(self, source, sink, res, h, cost, useful, tol):
+        indptr, to, twin = self.indptr, self.to, self.twin
+        ptr = {}
+        dead = set()
+        total = 0
+        stack = [] # arcs of the current path
+        on_path = {source}
+        v = source
+        while True:
+            if v == sink:
+                p = min(res[e] for e in stack)
+                cut = -1
+                for i, e in enumerate(stack):
+                    res[e] -= p
+                    res[twin[e]] += p
+                    if cut == -1 and not res[e]:
+                        cut = i
+                total += p
+                self.augmentations += 1
+                for e in stack[cut:]:
+                    on_path.discard(to[e])
+                del stack[cut:]
+                v = to[stack[-1]] if stack else source
+                continue
+            e = ptr.get(v, indptr[v])
+            end = indptr[v + 1]
+            hv = h[v]
+            while e < end:
+                w = to[e]
+                if useful[w] and w not in dead and w not in on_path and res[e] > 0 and cost[e] + hv - h[w] <= tol:
+                    break
+                e += 1
+            ptr[v] = e
+            if e < end:
+                stack.append(e)
+                on_path.add(to[e])
+                v = to[e]
+                continue
+            # dead end
+            dead.add(v)
+            if v == source:
+                return total.item() if hasattr(total, 'item') else total
+            e = stack.pop()
+            on_path.discard(v)
+            v = to[twin[e]]
+            ptr[v] += 1
+
+    def _cost_scaling(self, source, sink, alpha=4):
+        n, indptr, to, twin = self.n, self.indptr, self.to, self.twin
+        src, dst, cap, _ = self._columns
+        engine = PushRelabel(n, src, dst, cap) # same arrays, same arc order
+        flow = engine.max_flow(source, sink)
+        self.res = res = engine.res
+        c = (self.arc_cost.astype(object) * (n + 1)).tolist() # python ints, no overflow
+        eps = max((abs(x) for x in c), default=0)
+        p = [0] * n
+        excess = [0] * n
+        # price updates run in int64, skip them if the prices could overflow it
+        arcs = None
+        if eps * (4 * n + 4) < 2**62:
+            arcs = (np.asarray(indptr, dtype=np.int64), np.asarray(to, dtype=np.int64),
+                    np.asarray(twin, dtype=np.int64), np.array(c, dtype=np.int64))
+        while eps > 1:
+            eps = max(1, eps // alpha)
+            # saturate every residual arc with negative reduced cost
+            for u in range(n):
+                pu = p[u]
+                for e in range(indptr[u], indptr[u + 1]):
+                    r = res[e]
+                    if r > 0 and c[e] + pu - p[to[e]] < 0:
+                        res[e] = 0
+                        res[twin[e]] += r
+                        excess[u] -= r
+                        excess[to[e]] += r
+            if arcs is not None:
+                p = _price_update(arcs, res, p, excess, eps)
+            active = deque(v for v in range(n) if excess[v] > 0)
+            cur = indptr[:-1]
+            relabels = 0
+            while active:
+                if relabels > n and arcs is not None:
+                    relabels = 0
+                    p = _price_update(arcs, res, p, excess, eps)
+                    cur = indptr[:-1]
+                v = active.popleft()
+                e, end = cur[v], indptr[v + 1]
+                pv = p[v]
+                while excess[v] > 0:
+                    if e == end:
+                        # relabel: just enough to make the cheapest arc admissible
+                        self.relabels += 1
+                        relabels += 1
+                        best = None
+                        for a in range(indptr[v], end):
+                            if res[a] > 0:
+                                x = p[to[a]] - c[a]
+                                if best is None or x > best:
+                                    best = x
+                        pv = p[v] = best - eps
+                        e = indptr[v]
+                        continue
+                    w = to[e]
+                    if res[e] > 0 and c[e] + pv - p[w] < 0:
+                        q = excess[v] if excess[v] < res[e] else res[e]
+                        res[e] -= q
+                        res[twin[e]] += q
+                        excess[v] -= q
+                        if excess[w] <= 0 < excess[w] + q:
+                            active.append(w)
+                        excess[w] += q
+                    else:
+                        e += 1
+                cur[v] = e
+        return flow
+
+
+# global price update of cost scaling: d[x] = fewest eps steps x has to come down
+# by before it has an admissible path to a vertex with a deficit (backward from
+# the deficits, an arc x -> w of reduced cost rc counts floor(rc / eps) + 1,
+# capped at n + 1, any shorter length is still safe), then p[x] -= eps * d[x].
+# every residual arc stays eps-optimal and the excess sees a way down at once,
+# instead of one relabel at a time
+def _price_update(arcs, res, p, excess, eps):
+    indptr, to, twin, c = arcs
+    n = len(p)
+    res = np.array(res)
+    p = np.array(p, dtype=np.int64)
+    unreached = n * (n + 2)
+    d = np.full(n, unreached, dtype=np.int64)
+    active = np.flatnonzero(np.array(excess) < 0)
+    d[active] = 0
+    flag = np.zeros(n, dtype=bool)
+    while len(active):
+        out = row_positions(indptr, active)[0] # w -> x, its twin is x -> w
+        back = twin[out]
+        ok = res[back] > 0
+        back, x = back[ok], to[out[ok]]
+        w = to[back]
+        length = np.minimum((c[back] + p[x] - p[w]) // eps + 1, n + 1)
+        nd = d[w] + length
+        better = nd < d[x]
+        x, nd = x[better], nd[better]
+        np.minimum.at(d, x, nd)
+        flag[x] = True
+        active = np.flatnonzero(flag)
+        flag[active] = False
+    reached = d < unreached
+    if reached.any():
+        d[~reached] = d[reached].max()
+    return (p - eps * d).tolist()
+
+
+# shortest distances from source on reduced costs (>= 0) over arcs with res > 0,
+# in rounds like Bellman-Ford.py's active set: a round relaxes the out-arcs of
+# every vertex that improved in the previous one, all at once with np.minimum.at.
+# vertices at or beyond the sink's distance can't improve it and aren't expanded
+def _reduced_distances(arcs, res, h, source, sink):
+    indptr, to, _, tails, cost = arcs
+    dist = np.full(len(h), np.inf)
+    dist[source] = 0
+    active = np.array([source])
+    flag = np.zeros(len(h), dtype=bool) # improved this round (cheaper than np.unique)
+    while len(active):
+        out = row_positions(indptr, active)[0]
+        out = out[res[out] > 0]
+        u, w = tails[out], to[out]
+        nd = dist[u] + cost[out] + h[u] - h[w]
+        better = nd < dist[w]
+        w, nd = w[better], nd[better]
+        np.minimum.at(dist, w, nd)
+        flag[w] = True
+        flag[sink] = False
+        active = np.flatnonzero(flag)
+        flag[active] = False
+        active = active[dist[active] < dist[sink]]
+    return dist
+
+# bool mask of the vertices with a path of 0 reduced cost arcs to the sink,
+# BFS backwards (arc u -> v is the twin of an arc v -> u), a layer per step
+def _zero_cost_reach(arcs, res, h, sink, tol):
+    indptr, to, twin, _, cost = arcs
+    useful = np.zeros(len(h), dtype=bool)
+    useful[sink] = True
+    frontier = np.array([sink])
+    while len(frontier):
+        out = row_positions(indptr, frontier)[0]
+        into = twin[out] # u -> v
+        u, v = to[out], to[into]
+        ok = (res[into] > 0) & ~useful[u] & (cost[into] + h[u] - h[v] <= tol)
+        frontier = np.unique(u[ok])
+        useful[frontier] = True
+    return useful.tolist()
+
+# array('q') column that switches to array('d') once a value isn't an int
+def _widen(column, value):
+    if column.typecode == 'q' and not isinstance(value, (int, np.integer)):
+        return array('d', column)
+    return column
+
+def _column(values):
+    values = np.asarray(values)
+    if values.size and not np.all(values == np.round(values)):
+        return array('d', values.astype(np.float64).tobytes())
+    return array('q', values.astype(np.int64).tobytes())
+
+
+if __name__ == '__main__':
+    # Here we make a graphs with 10 vertex(source and sink includes)
+    graph = Dinic(10)
+    source = 0
+    sink = 9
+    """
+    Now we add the vertices next to the font in the font with 1 capacity in this edge
+    (source -> source vertices)
+    """
+    for vertex in range(1, 5):
+        graph.add_edge(source, vertex, 1)
+    """
+    We will do the same thing for the vertices near the sink, but from vertex to sink
+    (sink vertices -> sink)
+    """
+    for vertex in range(5, 9):
+        graph.add_edge(vertex, sink, 1)
+    """
+    Finally we add the verices near the sink to the vertices near the source.
+    (source vertices -> sink vertices)
+    """
+    for vertex in range(1, 5):
+        graph.add_edge(vertex, vertex + 4, 1)
+
+    # Now we can know what the maximum flow(source -> sink) is
+    print(graph.max_flow(source, sink))
+
+    # warm start: 1 -> 5 closes, 1 -> 6 opens, only the difference is re-solved
+    graph.set_capacity(8, 0)
+    graph.add_edge(1, 6, 1)
+    print(graph.max_flow(source, sink))
+
+    entrances = [0]
+    exits = [3]
+    # graph = [
+    #     [0, 0, 4, 6, 0, 0],
+    #     [0, 0, 5, 2, 0, 0],
+    #     [0, 0, 0, 0, 4, 4],
+    #     [0, 0, 0, 0, 6, 6],
+    #     [0, 0, 0, 0, 0, 0],
+    #     [0, 0, 0, 0, 0, 0],
+    # ]
+    graph = [[0, 7, 0, 0], [0, 0, 6, 0], [0, 0, 0, 8], [9, 0, 0, 0]]
+
+    # prepare our network
+    flowNetwork = FlowNetwork(graph, entrances, exits)
+    # set algorithm
+    flowNetwork.setMaximumFlowAlgorithm(PushRelabelExecutor)
+    # and calculate
+    maximumFlow = flowNetwork.findMaximumFlow()
+
+    print(f"maximum flow is {maximumFlow}")
+
+    # same network on the sparse engine
+    flowNetwork = FlowNetwork(graph, entrances, exits)
+    flowNetwork.setMaximumFlowAlgorithm(SparsePushRelabelExecutor)
+    print(f"maximum flow is {flowNetwork.findMaximumFlow()}")
+    print(flowNetwork.findMinimumCut())
+    print(flowNetwork.findFlowDecomposition())
+
+    # two sources, two sinks, no matrix
+    network = SparseFlowNetwork(6, [(0, 2, 4), (0, 3, 6), (1, 2, 5), (1, 3, 2),
+                                    (2, 4, 4), (2, 5, 4), (3, 4, 6), (3, 5, 6)], [0, 1], [4, 5])
+    print(network.max_flow(), network.max_flow(IterativeDinic), network.max_flow('auto'))
+
+    # min-cost flow: 0 -> 3 over two routes, the cheap one fills up first
+    mcf = MinCostFlow(4)
+    for a, b, c, cost in ((0, 1, 2, 1), (1, 3, 2, 1), (0, 2, 3, 2), (2, 3, 3, 3), (1, 2, 1, 0)):
+        mcf.add_edge(a, b, c, cost)
+    print(mcf.min_cost_flow(0, 3), mcf.edge_flows())
+    print(mcf.min_cost_flow(0, 3, limit=3), mcf.min_cost_flow(0, 3, scaling=True))
+
+    # every executor on the same network
+    for Executor in (EdmondsKarpExecutor, DinicExecutor, IterativeDinicExecutor, AutoMaximumFlowExecutor):
+        flowNetwork = FlowNetwork(graph, entrances, exits)
+        flowNetwork.setMaximumFlowAlgorithm(Executor)
+        print(f"{Executor.__name__}: maximum flow is {flowNetwork.findMaximumFlow()}")
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark for the max-flow executors in Max-Flow.py
+
+every executor runs behind FlowNetwork (setMaximumFlowAlgorithm) on generated
+networks of four families:
+    layered   -> source, L layers of W vertices, random edges between
+                 consecutive layers only, sink. long augmenting paths
+    bipartite -> unit capacity matching: source -> left -> right -> sink
+    grid      -> side x side 4-neighbour grid with random capacities, the source
+                 feeds the left column, the right column drains to the sink
+    dense     -> random graph, every ordered pair is an edge with probability p
+reported per run: time, the executor's work counter (augmentations for
+Edmonds-Karp/Dinic, pushes for push-relabel, - if it has none) and peak python
+memory (tracemalloc, measured in a second run so it doesn't slow the timed one)
+executors above their vertex limit (LIMITS) are skipped: the dense push-relabel
+scans V columns per step and Dinic recurses once per path edge
+
+run it as a script for the default table, or call benchmark() / run()
+"""
+import importlib
+import time
+import tracemalloc
+import numpy as np
+
+MaxFlow = importlib.import_module('Max-Flow')
+
+EXECUTORS = {
+    'edmonds-karp': MaxFlow.EdmondsKarpExecutor,
+    'dinic': MaxFlow.DinicExecutor,
+    'iterative dinic': MaxFlow.IterativeDinicExecutor,
+    'push-relabel (dense)': MaxFlow.PushRelabelExecutor,
+    'push-relabel': MaxFlow.SparsePushRelabelExecutor,
+    'auto': MaxFlow.AutoMaximumFlowExecutor,
+}
+
+# largest number of vertices an executor is run on
+LIMITS = {
+    'dinic': 900, # recursion depth
+    'push-relabel (dense)': 300,
+}
+
+# --------------------------------------------------------------- generators
+# every generator returns (capacity matrix, source, sink), matrix as numpy ints
+
+def layered(layers, width, degree=3, max_cap=100, seed=0):
+    rng = np.random.default_rng(seed)
+    n = layers * width + 2
+    s, t = n - 2, n - 1
+    mat = np.zeros((n, n), dtype=np.int64)
+    mat[s, :width] = max_cap * degree
+    mat[(layers - 1) * width:layers * width, t] = max_cap * degree
+    for layer in range(layers - 1):
+        first = layer * width
+        for v in range(first, first + width):
+            heads = first + width + rng.choice(width, size=min(degree, width), replace=False)
+            mat[v, heads] = rng.integers(1, max_cap, size=len(heads))
+    return mat, s, t
+
+def bipartite(left, right, degree=3, seed=0):
+    rng = np.random.default_rng(seed)
+    n = left + right + 2
+    s, t = n - 2, n - 1
+    mat = np.zeros((n, n), dtype=np.int64)
+    mat[s, :left] = 1
+    mat[left:left + right, t] = 1
+    for v in range(left):
+        heads = left + rng.choice(right, size=min(degree, right), replace=False)
+        mat[v, heads] = 1
+    return mat, s, t
+
+def grid(side, max_cap=100, seed=0):
+    rng = np.random.default_rng(seed)
+    n = side * side + 2
+    s, t = n - 2, n - 1
+    mat = np.zeros((n, n), dtype=np.int64)
+    ids = np.arange(side * side).reshape(side, side)
+    for a, b in ((ids[:, :-1], ids[:, 1:]), (ids[:-1, :], ids[1:, :])):
+        a, b = a.ravel(), b.ravel()
+        mat[a, b] = rng.integers(1, max_cap, size=len(a))
+        mat[b, a] = rng.integers(1, max_cap, size=len(a))
+    mat[s, ids[:, 0]] = max_cap * 4
+    mat[ids[:, -1], t] = max_cap * 4
+    return mat, s, t
+
+def dense(n, p=0.5, max_cap=100, seed=0):
+    rng = np.random.default_rng(seed)
+    mat = np.where(rng.random((n, n)) < p, rng.integers(1, max_cap, size=(n, n)), 0)
+    np.fill_diagonal(mat, 0)
+    return mat, 0, n - 1
+
+# (family, generator, kwargs) for the default table
+FAMILIES = [
+    ('layered', layered, dict(layers=20, width=20)),
+    ('layered', layered, dict(layers=40, width=50)),
+    ('bipartite', bipartite, dict(left=100, right=100)),
+    ('bipartite', bipartite, dict(left=1000, right=1000)),
+    ('grid', grid, dict(side=15)),
+    ('grid', grid, dict(side=40)),
+    ('dense', dense, dict(n=100)),
+    ('dense', dense, dict(n=400)),
+]
+
+# ------------------------------------------------------------------- runs
+
+# work counter of an executor after it ran
+def _work(executor):
+    engine = getattr(executor, 'engine', executor)
+    for name in ('augmentations', 'pushes'):
+        if hasattr(engine, name):
+            return getattr(engine, name)
+    return None
+
+def run(Executor, mat, s, t, memory=True):
+    '''
+    one executor on one network, returns a dict:
+    flow, time (seconds), work (counter or None), peak (bytes or None)
+    '''
+    def once(trace):
+        network = MaxFlow.FlowNetwork(mat.tolist(), [s], [t])
+        network.setMaximumFlowAlgorithm(Executor)
+        if trace: # only what the algorithm allocates, not the input matrix
+            tracemalloc.start()
+        start = time.perf_counter()
+        flow = network.findMaximumFlow()
+        seconds = time.perf_counter() - start
+        peak = None
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return flow, seconds, peak, network.maximumFlowAlgorithm
+    flow, seconds, _, executor = once(False)
+    result = {'flow': flow, 'time': seconds, 'work': _work(executor), 'peak': None}
+    if memory:
+        result['peak'] = once(True)[2]
+    return result
+
+def benchmark(families=None, executors=None, memory=True, verbose=True):
+    '''
+    families -> list of (name, generator, kwargs), default FAMILIES
+    executors -> dict name -> executor class, default EXECUTORS
+    returns a list of rows (family, kwargs, V, E, executor name, run() dict or None if skipped)
+    and checks that every executor got the same flow
+    '''
+    families = FAMILIES if families is None else families
+    executors = EXECUTORS if executors is None else executors
+    rows = []
+    if verbose:
+        print("%-10s %-24s %6s %8s  %-22s %10s %10s %10s" % ('family', 'size', 'V', 'E', 'executor', 'time (s)', 'work', 'peak (MB)'))
+    for family, generator, kwargs in families:
+        mat, s, t = generator(**kwargs)
+        V, E = len(mat), int(np.count_nonzero(mat))
+        flows = set()
+        for name, Executor in executors.items():
+            result = None
+            if V <= LIMITS.get(name, V):
+                result = run(Executor, mat, s, t, memory)
+                flows.add(result['flow'])
+            rows.append((family, kwargs, V, E, name, result))
+            if verbose:
+                size = ','.join('%s=%s' % kv for kv in kwargs.items())
+                if result is None:
+                    print("%-10s %-24s %6d %8d  %-22s %10s" % (family, size, V, E, name, 'skipped'))
+                else:
+                    work = '-' if result['work'] is None else result['work']
+                    peak = '-' if result['peak'] is None else '%.1f' % (result['peak'] / 2**20)
+                    print("%-10s %-24s %6d %8d  %-22s %10.3f %10s %10s" % (family, size, V, E, name, result['time'], work, peak))
+        if len(flows) > 1:
+            raise AssertionError("executors disagree on %s %s: %s" % (family, kwargs, flows))
+    return rows
+
+
+if __name__ == '__main__':
+    benchmark()
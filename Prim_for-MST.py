@@ -65,10 +65,24 @@ note: if node to node has cheaper path going through another node, we update tha
     e.g. going from 0 to 5 has cost 7, but going from 0 to 2 to 5 has cost 6, then
     update 0 to 5 as having cost 6
 
+output: (mstCost, mstEdges), mstEdges = [(u, v, weight), ...] in the order the
+nodes joined the tree, u already in the tree. parent[v] = u is remembered
+whenever the (v, e) pair of v gets a cheaper edge, so the edges come for free.
+a disconnected graph gives the MST of start's component only (fewer than V - 1
+edges), run it again from a node that isn't in it for the next one
 
+Dense version (dense_prim): on an adjacency matrix with E ~ V^2 even the IPQ is
+O(V^2 * logV), while the plain array version is O(V^2): keep best[v] = cheapest
+edge from the tree to v for every node, each step takes the argmin of best
+over the nodes outside the tree and relaxes with the new node's row,
+    best = min(best, matrix[v])
+both are one numpy call over V entries, so only the V steps run in python
 """
 from collections import defaultdict
-import heapq
+from array import array
+import time
+import numpy as np
+from Indexed_Priority_Queue import IndexedDaryHeap
 
 class Graph:
     def __init__(self, num_v):
@@ -78,43 +92,112 @@ class Graph:
     def addEdge(self, a, b, weight):
         self.adj[a].append((b,weight))
         self.adj[b].append((a,weight))
+
+    # run straight on an undirected CSRGraph (see CSR_Graph.py, directed=False)
+    @classmethod
+    def from_csr(cls, csr):
+        g = cls(csr.num_v)
+        g.adj = csr.weighted_rows
+        return g
         
         
     # O(E*logV) function
-    # correct cost, now path?
-    def eager_prim(self):
-        start = mstCost = 0
-        visited = {start}
-        minHeap = []
-        mst = {start}
-        for neighbor, weight in self.adj[start]:
-            heapq.heappush(minHeap,(neighbor, weight))
-        while len(visited) < self.V + 1 and minHeap:
-            next_node, cost = heapq.heappop(minHeap)
-            if next_node not in visited:
-                visited.add(next_node)
-                mstCost += cost
-                mst.add(next_node)
-                for next_, next_cost in self.adj[next_node]:
-                    if next_ not in visited:
-                        heapq.heappush(minHeap, (next_, next_cost))
-        return mstCost
-      
-
-graph = Graph(9)
-graph.addEdge(0, 1, 4)
-graph.addEdge(0, 7, 8)
-graph.addEdge(1, 2, 8)
-graph.addEdge(1, 7, 11)
-graph.addEdge(2, 3, 7)
-graph.addEdge(2, 8, 2)
-graph.addEdge(2, 5, 4)
-graph.addEdge(3, 4, 9)
-graph.addEdge(3, 5, 14)
-graph.addEdge(4, 5, 10)
-graph.addEdge(5, 6, 2)
-graph.addEdge(6, 7, 1)
-graph.addEdge(6, 8, 6)
-graph.addEdge(7, 8, 7)
-mstCost = graph.eager_prim()
-print(mstCost)
+    # eager: IPQ (Indexed_Priority_Queue.py) holds one (node, cheapest edge weight
+    # into the tree) pair per node, keyed by the weight, relaxing an edge is a
+    # decrease_key. returns (mstCost, mstEdges)
+    def eager_prim(self, start=0):
+        mstCost = 0
+        mstEdges = []
+        visited = bytearray(self.V)
+        parent = array('q', [-1]) * self.V
+        ipq = IndexedDaryHeap(self.V)
+        ipq.push(start, 0)
+        while len(ipq):
+            next_node, cost = ipq.pop_min()
+            visited[next_node] = 1
+            mstCost += cost
+            if next_node != start:
+                mstEdges.append((parent[next_node], next_node, cost))
+            for next_, next_cost in self.adj[next_node]:
+                if not visited[next_] and ipq.push_or_decrease(next_, next_cost):
+                    parent[next_] = next_node
+        return mstCost, mstEdges
+
+
+# O(V^2) Prim on a dense V x V matrix (nested lists or ndarray), same output as
+# Graph.eager_prim. entries in missing are not edges and the diagonal is skipped
+# (like CSRGraph.from_matrix), matrix[a][b] or matrix[b][a] alone is enough
+def dense_prim(matrix, start=0, missing=(0,)):
+    mat = np.array(matrix, dtype=np.float64)
+    n = len(mat)
+    mat[np.isin(mat, np.asarray(missing, dtype=np.float64))] = np.inf
+    np.fill_diagonal(mat, np.inf)
+    mat = np.minimum(mat, mat.T) # undirected
+    best = np.full(n, np.inf) # cheapest edge from the tree, inf once in the tree
+    parent = np.full(n, -1, dtype=np.int64)
+    outside = np.ones(n, dtype=bool)
+    better = np.empty(n, dtype=bool)
+    best[start] = 0
+    mstCost = 0
+    mstEdges = []
+    for _ in range(n):
+        v = int(np.argmin(best))
+        cost = best[v].item()
+        if cost == np.inf:
+            break # the rest isn't connected to start
+        mstCost += cost
+        if v != start:
+            mstEdges.append((int(parent[v]), v, cost))
+        outside[v] = False
+        best[v] = np.inf
+        np.less(mat[v], best, out=better)
+        better &= outside
+        best[better] = mat[v, better]
+        parent[better] = v
+    return mstCost, mstEdges
+
+# random dense graph: both versions on the same V x V matrix (every pair an edge
+# with probability p), returns {name: (mstCost, seconds)}
+def benchmark(n, p=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    mat = np.triu(np.where(rng.random((n, n)) < p, rng.integers(1, 1000, size=(n, n)), 0), 1)
+    results = {}
+    graph = Graph(n) # built before the clock starts, only the algorithms are timed
+    for a, b in zip(*np.nonzero(mat)):
+        graph.addEdge(int(a), int(b), int(mat[a, b]))
+    start = time.perf_counter()
+    results['eager (IPQ)'] = (graph.eager_prim()[0], time.perf_counter() - start)
+    start = time.perf_counter()
+    results['dense (numpy)'] = (dense_prim(mat)[0], time.perf_counter() - start)
+    return results
+
+
+if __name__ == '__main__':
+    graph = Graph(9)
+    graph.addEdge(0, 1, 4)
+    graph.addEdge(0, 7, 8)
+    graph.addEdge(1, 2, 8)
+    graph.addEdge(1, 7, 11)
+    graph.addEdge(2, 3, 7)
+    graph.addEdge(2, 8, 2)
+    graph.addEdge(2, 5, 4)
+    graph.addEdge(3, 4, 9)
+    graph.addEdge(3, 5, 14)
+    graph.addEdge(4, 5, 10)
+    graph.addEdge(5, 6, 2)
+    graph.addEdge(6, 7, 1)
+    graph.addEdge(6, 8, 6)
+    graph.addEdge(7, 8, 7)
+    mstCost, mstEdges = graph.eager_prim()
+    print(mstCost)
+    print(mstEdges)
+
+    # same graph as a matrix
+    matrix = [[0] * 9 for _ in range(9)]
+    for a in graph.adj:
+        for b, weight in graph.adj[a]:
+            matrix[a][b] = weight
+    print(dense_prim(matrix))
+
+    for name, (cost, seconds) in benchmark(2000).items():
+        print("%-15s cost %d in %.2fs" % (name, cost, seconds))
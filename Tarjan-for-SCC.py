@@ -30,70 +30,87 @@ since there is no path from one SCC to another, do it again and again
 use an adj list but DIRECTED graph, so when we add an edge we only add it once
 """
 from collections import defaultdict
+from array import array
+from CSR_Graph import CSRGraph
+from DFS_Iterative import IterativeDFS, TREE
 
 class Graph:
     def __init__(self, num_v):
         self.V = num_v
         self.adj = defaultdict(list)
-        self.id = 0
+        self.csr = None
     
     def add_edge(self, a, b):
         self.adj[a].append(b)
+        self.csr = None
+
+    # run straight on a CSRGraph (see CSR_Graph.py), node ids are the csr's dense ids
+    @classmethod
+    def from_csr(cls, csr):
+        g = cls(csr.num_v)
+        g.csr = csr
+        g.adj = csr.rows
+        return g
+
+    def _csr(self):
+        if self.csr is None:
+            self.csr = CSRGraph.from_adjacency(self.adj, num_v=self.V)
+        return self.csr
         
     '''
-    node -> vertex to be visited next
+    runs on the iterative DFS engine (DFS_Iterative.py), the recursive dfs is
+    split into its hooks:
+    pre  -> initializing, push node on the seen stack
+    edge -> a non-tree edge to a node still on the stack (Case 2)
+    post -> the 'callback': pop an SCC if node started one, then hand the
+            low-link value to the parent (Case 1)
+
     disc[] -> stores discovery id's of visited vertices
     low[] -> low-link value aka earliest possible id reachable by node by whatever path
     stack -> stack of vertices, if part of SCC, pop them. Makes life easy
     stackMember[] -> index array for fast verification whether node is in stack
+    returns list of SCCs, each a list of nodes
     '''
-    
-    def dfs(self, node, low, disc, stackMember, stack):
-        # initializing
-        disc[node] = self.id
-        low[node] = self.id
-        self.id += 1
-        stackMember[node] = True
-        stack.append(node)
-        
-        # iterate through all neighbors of node
-        for neighbor in self.adj[node]:
-            # if not visited, dfs it aka recur over it
-            if disc[neighbor] == -1:
-                self.dfs(neighbor, low, disc, stackMember, stack)
-                # Check if the subtree rooted with neighbor has a connection to
-                # one of the ancestors of node ie for propogation of low-link value
-                # Case 1
-                low[node] = min(low[node], low[neighbor])
-            
-            elif stackMember[neighbor] == True:
-                # Case 2
-                # update low-link value of node iff neighbor is still in stack
-                # uses fact that no SCC can be connected to each other, if it were connected
-                # it would still be in stack
-                low[node] = min(low[node], disc[neighbor])
-        
-        w = -1 #stores stack extracted vertices
-        if low[node] == disc[node]:
-            # then the head/source node has been discovered
-            # all nodes on that path are part of SCC, remove from stack etc
-            while w != node:
-                w = stack.pop()
-                print(w)
-                stackMember[w] = False
-
-            print("")
-
-            
     def find_SCC(self):
-        disc = [-1] * self.V
-        low = [-1] * self.V
-        stackMember = [False] * self.V
+        engine = IterativeDFS(self._csr())
+        disc = engine.disc
+        low = array('q', [-1]) * self.V
+        stackMember = bytearray(self.V)
         stack = []
-        
-        for i in range(self.V):
-            if disc[i] == -1:
-                self.dfs(i, low, disc, stackMember, stack)
+        sccs = []
+
+        def pre(node):
+            low[node] = disc[node]
+            stackMember[node] = 1
+            stack.append(node)
+
+        def edge(node, neighbor, kind):
+            # Case 2
+            # update low-link value of node iff neighbor is still in stack
+            # uses fact that no SCC can be connected to each other, if it were connected
+            # it would still be in stack
+            if kind != TREE and stackMember[neighbor] and disc[neighbor] < low[node]:
+                low[node] = disc[neighbor]
+
+        def post(node, parent):
+            if low[node] == disc[node]:
+                # then the head/source node has been discovered
+                # all nodes on that path are part of SCC, remove from stack etc
+                scc = []
+                w = -1 #stores stack extracted vertices
+                while w != node:
+                    w = stack.pop()
+                    stackMember[w] = 0
+                    scc.append(w)
+                sccs.append(scc)
+            # Case 1
+            # the subtree rooted with node may have a connection to one of the
+            # ancestors of parent ie propogation of low-link value
+            if parent != -1 and low[node] < low[parent]:
+                low[parent] = low[node]
+
+        engine.run(pre=pre, post=post, edge=edge)
+        return sccs
                 
 g1 = Graph(5)
 g1.add_edge(1, 0)
@@ -102,4 +119,6 @@ g1.add_edge(2, 1)
 g1.add_edge(0, 3)
 g1.add_edge(3, 4)
 print("SSC in graph ")
-g1.find_SCC()
\ No newline at end of file
+for scc in g1.find_SCC():
+    print(*scc, sep='\n')
+    print("")
\ No newline at end of file
@@ -51,35 +51,26 @@ A to B to D      so D is in list
      C is in list(nowhere else to go)  
 A is in list (nowhere else to go)
 now reverse the list or make it a stack
+
+Implementation: the DFS runs on the iterative engine (DFS_Iterative.py) so long
+dependency chains don't hit the recursion limit. the engine's postorder is
+exactly 'add node on the callback', so the list comes straight out of it,
+each node after everything it points to (same convention as before)
+a cycle shows up as an edge u -> v where v finished after u (a back edge)
 """
-#adj is adjacency LIST
+import numpy as np
+from DFS_Iterative import IterativeDFS
+
+#adj is adjacency LIST, or a CSRGraph
 def TS(adj):
-    visited = []
-    for node in adj:
-        if node not in visited:
-            visitedNodes = []
-            visitedNodes = dfs(adj, visitedNodes, node)
-            '''
-            visited nodes in the path of nodes, the first is the root of the path
-            hence it should be last in list, but here it is first (and the only one added) since
-            the list will be reversed
-            **output if visited.append(visitedNodes) is
-            [['F'], ['E', 'F'], ['D'], ['C', 'F'], ['B', 'D', 'E', 'F'], ['A', 'B', 'D', 'E', 'F', 'C']]
-            notice, the first node in the above list is correct
-            **outpt if visited.append(visitedNodes[0]) is
-            ['F', 'E', 'D', 'C', 'B', 'A']
-            
-            '''
-            visited.append(visitedNodes[0])
-    return visited[::-1]      
-            
-def dfs(adj, visitedNodes, node):
-    if node not in visitedNodes:
-        visitedNodes.append(node)
-        for neighbor in adj[node]:
-            dfs(adj, visitedNodes, neighbor)
-    return visitedNodes
-#is O(V+E) since I pass the visitedNodes list so it's returning a full branch at a time
+    engine = IterativeDFS(adj).run()
+    g = engine.graph
+    finish = np.frombuffer(engine.finish, dtype=np.int64)
+    src, dst, _ = g.edge_arrays()
+    if (finish[src] <= finish[dst]).any():
+        raise ValueError("graph has a cycle, no topological ordering")
+    return [g.label_of(v) for v in engine.postorder[:engine.finished_count]]
+#O(V+E), every node is pushed and popped once and every edge looked at once
 
 adj = {
     'A' : ['B','C'],
@@ -89,6 +80,6 @@ adj = {
     'E' : ['F'],
     'F' : [],
 }
-#expected output is something like: F,E,D,B,C,A or F,E,D,C,B,A
+#expected output is something like: F,E,D,B,C,A or D,F,E,B,C,A
 topologically_sorted = TS(adj)
 print(topologically_sorted)
\ No newline at end of file
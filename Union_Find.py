@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Union-Find aka Disjoint Set:
+keeps track of elements split into disjoint groups, with two operations
+    find(a)     -> which group is a in (the group's root/representative)
+    union(a, b) -> merge the groups of a and b
+
+Connected components with union-find:
+every edge a-b is just union(a, b). after all edges, nodes with the same root are
+in the same component. unlike a DFS this doesn't need the whole adjacency list
+in memory, edges can be fed one at a time (eg straight from a log file) and
+connected(a, b) / component_count() can be asked at any point in between
+memory: one parent slot + one rank byte per node, nothing per edge
+
+two optimizations make each operation nearly O(1) (inverse Ackermann, a(n) <= 4
+for any n that fits in memory):
+union by rank: hang the shorter tree under the taller one, so trees stay shallow
+path compression: while finding the root, point nodes further up the path
+    (path halving: every node on the path skips to its grandparent, done in a
+     loop so no recursion)
+
+nodes can be any hashable labels, they get dense ids in order of first
+appearance. if num_v is given, nodes are taken to already be ids 0..num_v-1 and
+no label dict is kept
+"""
+from array import array
+
+
+class DisjointSet:
+    def __init__(self, num_v=None):
+        self.parent = array('q', range(num_v or 0))
+        self.rank = bytearray(num_v or 0)
+        self.count = num_v or 0 # number of components
+        self.index = None if num_v is not None else {} # label -> id
+        self.labels = None if num_v is not None else []
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _id(self, label):
+        if self.index is None:
+            return label
+        i = self.index.get(label)
+        if i is None:
+            # first time we see this node, it starts as its own component
+            i = self.index[label] = len(self.parent)
+            self.labels.append(label)
+            self.parent.append(i)
+            self.rank.append(0)
+            self.count += 1
+        return i
+
+    def add_node(self, label):
+        self._id(label)
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]] # path halving
+            i = parent[i]
+        return i
+
+    # returns True if a and b were in different components
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        rank = self.rank
+        if rank[ra] < rank[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        if rank[ra] == rank[rb]:
+            rank[ra] += 1
+        self.count -= 1
+        return True
+
+    # label-level api, this is what the streaming ingest uses
+    def add_edge(self, a, b):
+        return self.union(self._id(a), self._id(b))
+
+    def add_edges(self, edges):
+        # any iterable of (a, b, ...) pairs, extra columns (weights) are ignored
+        for edge in edges:
+            self.add_edge(edge[0], edge[1])
+        return self
+
+    def add_edges_from_file(self, path, sep=None, comment='#', as_int=False):
+        '''
+        one edge per line: "a b" (anything after the second column is ignored)
+        the file is read line by line, so it can be bigger than RAM
+        as_int -> convert the labels with int(), eg for numbered logs
+        '''
+        with open(path) as f:
+            for line in f:
+                if not line.strip() or line.startswith(comment):
+                    continue
+                cols = line.split(sep)
+                a, b = cols[0].strip(), cols[1].strip()
+                if as_int:
+                    a, b = int(a), int(b)
+                self.add_edge(a, b)
+        return self
+
+    def connected(self, a, b):
+        if self.index is not None and (a not in self.index or b not in self.index):
+            return a == b
+        return self.find(self._id(a)) == self.find(self._id(b))
+
+    def component_count(self):
+        return self.count
+
+    # same shape as DepthFirstSearchUNDIRECTED.find_cc: (count, [[nodes], ...])
+    # components come in order of their first node, nodes in order of first appearance
+    def components(self):
+        groups = {}
+        for i in range(len(self.parent)):
+            groups.setdefault(self.find(i), []).append(i if self.labels is None else self.labels[i])
+        return self.count, list(groups.values())
+
+
+if __name__ == '__main__':
+    '''
+    graph:
+        A
+       BC
+      DEF
+    '''
+    adj = {
+        'A' : ['B','C'],
+        'B' : ['D', 'E'],
+        'C' : ['F'],
+        'D' : [],
+        'E' : ['F'],
+        'F' : [],
+        'G': []
+    }
+    ds = DisjointSet()
+    for node in adj:
+        ds.add_node(node)
+        for neighbor in adj[node]:
+            ds.add_edge(node, neighbor)
+    print(ds.connected('D', 'F'), ds.connected('A', 'G'))
+    print(ds.components())